@@ -0,0 +1,355 @@
+"""
+Benchmarks für den Mastermind-Service.
+
+Aufruf (im Verzeichnis backend/mastermind):
+    python benchmark.py load --workers 1 2 4 --requests 200 --concurrency 16
+    python benchmark.py engines --requests 200 --max-rounds 5
+    python benchmark.py engines --pins 6 --colors 10 --no-duplicates --engines auto mip mip-fresh
+    python benchmark.py strategies --games 200 --strategies first minimax partitions expected
+    python benchmark.py sessions --games 2000 --workers 1
+    python benchmark.py startup --workers 1 2 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random as rnd
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+import numpy as np
+
+from jobs import JobPool, choose_engine, next_move, session_step, warm_up
+from sessions import SessionStore
+from mastermind import NUM_COLORS, NUM_PINS
+
+
+def quiet(fn, *args, **kwargs):
+    """Führt fn aus und verwirft dabei die Konsolenausgabe von HiGHS (schreibt direkt auf fd 1)."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        os.dup2(saved, 1)
+        os.close(devnull)
+        os.close(saved)
+
+
+def summarize(name: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    print(f"{name:<28} n={len(samples):<4} mean={statistics.mean(samples)*1000:8.2f} ms  "
+          f"p50={statistics.median(samples)*1000:8.2f} ms  p95={p95*1000:8.2f} ms")
+
+
+def feedback(secret: list, guess: list) -> tuple:
+    """Rote Pins (richtige Farbe an richtiger Position) und weiße Pins (richtige Farbe, falsche Position)."""
+    red = sum(s == g for s, g in zip(secret, guess))
+    common = sum((Counter(secret) & Counter(guess)).values())
+    return red, common - red
+
+
+def random_code(pins: int, colors: int, duplicates: bool = True) -> list:
+    return [rnd.randrange(colors) for _ in range(pins)] if duplicates else rnd.sample(range(colors), pins)
+
+
+def random_history(rounds: int, pins: int = NUM_PINS, colors: int = NUM_COLORS, duplicates: bool = True) -> tuple:
+    """Zufälliger Spielverlauf als (C, G, B) wie ihn der Endpunkt an den Solver übergibt."""
+    secret = random_code(pins, colors, duplicates)
+    C, G, B = [], [], []
+    for _ in range(rounds):
+        guess = random_code(pins, colors, duplicates)
+        red, white = feedback(secret, guess)
+        C.append([[1 if c == color else 0 for c in range(colors)] for color in guess])
+        G.append(red)
+        B.append(white)
+    return np.array(C), G, B
+
+
+def consistent(move: list, history: tuple) -> bool:
+    """Würde move auf jeden bisherigen Zug genau das erhaltene Feedback geben?"""
+    C, G, B = history
+    return all(feedback(move, list(guess.argmax(axis=1))) == (red, white) for guess, red, white in zip(C, G, B))
+
+
+def bench_engines(args):
+    """
+    Latenz und Konsistenz je Engine für eine Konfiguration. "mip-fresh" baut das Modellgerüst
+    für jede Anfrage neu auf, wie vor der Wiederverwendung je Konfiguration.
+    """
+    from mastermind import mastermind_model
+
+    config = (args.pins, args.colors, args.duplicates)
+    histories = [random_history(rnd.randint(1, args.max_rounds), *config) for _ in range(args.requests)]
+    warm_up()
+    for engine in args.engines:
+        latencies, inconsistent = [], 0
+        for history in histories:
+            if engine == "mip-fresh":
+                mastermind_model.cache_clear()
+            start = time.perf_counter()
+            move = quiet(next_move, *history, engine.removesuffix("-fresh"), args.strategy, *config)
+            latencies.append(time.perf_counter() - start)
+            inconsistent += move is None or not consistent(move, history)
+        if engine == "auto":
+            engine = f"auto ({choose_engine(engine, *config)})"
+        summarize(f"Engine {engine}", latencies)
+        print(f"{'':<28} inkonsistente Züge: {inconsistent}/{len(histories)}")
+
+
+def bench_strategies(args):
+    from strategies import next_guess
+
+    secrets = [random_code(args.pins, args.colors, args.duplicates) for _ in range(args.games)]
+    for strategy in args.strategies:
+        rounds, latencies = [], []
+        for secret in secrets:
+            guesses, reds, whites = [], [], []
+            while True:
+                start = time.perf_counter()
+                guess = next_guess(guesses, reds, whites, args.pins, args.colors, strategy, args.duplicates)
+                latencies.append(time.perf_counter() - start)
+                red, white = feedback(secret, guess)
+                guesses.append(guess)
+                reds.append(red)
+                whites.append(white)
+                if red == args.pins:
+                    break
+            rounds.append(len(guesses))
+        summarize(f"{strategy} Zeit je Zug", latencies)
+        print(f"{'':<28} Züge im Mittel {statistics.mean(rounds):.3f}, höchstens {max(rounds)}")
+
+
+def one_hot(guesses: list) -> np.ndarray:
+    return np.array([[[1 if c == color else 0 for c in range(NUM_COLORS)] for color in guess] for guess in guesses])
+
+
+async def _play_stateless(job_pool: JobPool, secret: list, strategy: str) -> int:
+    """Ein Spiel über den zustandslosen Pfad: jeder Zug schickt den ganzen Verlauf."""
+    guesses, reds, whites = [], [], []
+    while True:
+        C = one_hot(guesses) if guesses else np.empty(0)
+        guess = await job_pool.run(next_move, C, reds, whites, "enumeration", strategy)
+        guesses.append(guess)
+        red, white = feedback(secret, guess)
+        if red == NUM_PINS:
+            return len(guesses)
+        reds.append(red)
+        whites.append(white)
+
+
+async def _play_session(job_pool: JobPool, store: SessionStore, secret: list, strategy: str, inline: bool) -> int:
+    """Ein Spiel mit Zustand: je Zug nur das neue Feedback und die verbleibenden Kandidaten."""
+    session = store.create(NUM_PINS, NUM_COLORS, strategy)
+    while True:
+        args = (session.pins, session.colors, session.strategy, session.candidates,
+                session.guesses, session.reds, session.whites)
+        if inline:
+            candidates, guess = session_step(*args)
+        else:
+            candidates, guess = await job_pool.run(session_step, *args)
+        store.update(session, candidates)
+        session.guesses.append(guess)
+        red, white = feedback(secret, guess)
+        if red == NUM_PINS:
+            store.delete(session.id)
+            return len(session.guesses)
+        session.reds.append(red)
+        session.whites.append(white)
+
+
+def bench_sessions(args):
+    secrets = [[rnd.randrange(NUM_COLORS) for _ in range(NUM_PINS)] for _ in range(args.games)]
+    warm_up()
+    for workers in args.workers:
+        job_pool = JobPool(workers=workers, max_pending=args.games, timeout=600)
+        quiet(job_pool.start)
+        try:
+            for mode in ("stateless", "sessions", "sessions-inline"):
+                store = SessionStore(max_sessions=args.games)
+
+                async def play_all():
+                    if mode == "stateless":
+                        return await asyncio.gather(*(_play_stateless(job_pool, s, args.strategy) for s in secrets))
+                    inline = mode == "sessions-inline"
+                    return await asyncio.gather(*(_play_session(job_pool, store, s, args.strategy, inline)
+                                                  for s in secrets))
+
+                start = time.perf_counter()
+                rounds = asyncio.run(play_all())
+                elapsed = time.perf_counter() - start
+                print(f"{workers} Worker {mode:<16} {len(secrets)} Spiele gleichzeitig in {elapsed:.2f} s, "
+                      f"{sum(rounds) / elapsed:.0f} Züge/s, Züge im Mittel {statistics.mean(rounds):.2f}")
+        finally:
+            job_pool.stop()
+
+
+async def _drive(job_pool: JobPool, histories: list, concurrency: int) -> list:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(history):
+        async with limit:
+            start = time.perf_counter()
+            await job_pool.run(next_move, *history)
+            return time.perf_counter() - start
+
+    return await asyncio.gather(*(one(history) for history in histories))
+
+
+def bench_load(args):
+    histories = [random_history(rnd.randint(1, args.max_rounds)) for _ in range(args.requests)]
+    for workers in args.workers:
+        job_pool = JobPool(workers=workers, max_pending=args.concurrency, timeout=300)
+        quiet(job_pool.start)
+        try:
+            start = time.perf_counter()
+            # Die Worker schreiben auf dasselbe fd 1, daher während des gesamten Laufs umleiten
+            latencies = quiet(asyncio.run, _drive(job_pool, histories, args.concurrency))
+            elapsed = time.perf_counter() - start
+        finally:
+            job_pool.stop()
+        summarize(f"{workers} Worker Latenz", latencies)
+        print(f"{'':<28} {len(histories) / elapsed:.1f} Anfragen/s")
+
+
+def _request(url: str, body=None, timeout: float = 60.0) -> int:
+    """HTTP-POST mit JSON (GET ohne body); Rückgabe: Statuscode."""
+    data = None if body is None else json.dumps(body).encode()
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def _wait_for(url: str, server: subprocess.Popen, timeout: float = 120.0) -> int:
+    """Fragt url ab, bis der Server mit einem Status unter 500 antwortet (503 heißt: noch nicht bereit)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            status = _request(url, timeout=5.0)
+            if status < 500:
+                return status
+        except OSError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def _moves(history: tuple) -> list:
+    """Ein Spielverlauf (C, G, B) im Format des Endpunkts submit_feedback_next_move."""
+    C, G, B = history
+    return [{"colors": [int(c) for c in guess.argmax(axis=1)], "feedback": {"redPins": red, "whitePins": white}}
+            for guess, red, white in zip(C, G, B)]
+
+
+def bench_startup(args):
+    """
+    Kaltstart des Servers (uvicorn im Unterprozess): Zeit bis der Port antwortet (/health/live),
+    bis /health/ready und Latenz der ersten und der zweiten Anfrage je Art (anderer Spielverlauf).
+    """
+    rnd.seed(args.seed)
+    requests = [
+        ("erster Zug", "/mastermind/first_move", [None, None]),
+        ("Spiel mit Zustand", "/mastermind/sessions", [{}, {}]),
+    ]
+    for engine in ("enumeration", "mip"):
+        requests.append((f"nächster Zug {engine}", "/mastermind/submit_feedback_next_move",
+                         [{"moves": _moves(random_history(2)), "engine": engine} for _ in range(2)]))
+
+    for workers in args.workers:
+        env = {**os.environ, "JOB_WORKERS": str(workers)}
+        timings = {}
+        for _ in range(args.repeat):
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                port = sock.getsockname()[1]
+            url = f"http://127.0.0.1:{port}"
+            start = time.perf_counter()
+            server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+                                      env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                _wait_for(url + "/health/live", server)
+                timings.setdefault("Port offen (live)", []).append(time.perf_counter() - start)
+                _wait_for(url + "/health/ready", server)
+                timings.setdefault("bereit (ready)", []).append(time.perf_counter() - start)
+                for name, path, bodies in requests:
+                    for index, body in enumerate(bodies):
+                        sent = time.perf_counter()
+                        # first_move erwartet einen POST ohne Körper
+                        status = _request(url + path, body if body is not None else {})
+                        if status != 200:
+                            raise RuntimeError(f"{name}: HTTP {status}")
+                        label = "erste" if index == 0 else "zweite"
+                        timings.setdefault(f"{name}, {label}", []).append(time.perf_counter() - sent)
+                timings.setdefault("bis alle beantwortet", []).append(time.perf_counter() - start)
+            finally:
+                server.terminate()
+                server.wait()
+        print(f"{workers} Worker:")
+        for name, samples in timings.items():
+            summarize(f"  {name}", samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    load = sub.add_parser("load", help="Durchsatz des Prozesspools je Anzahl Worker")
+    load.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    load.add_argument("--requests", type=int, default=200)
+    load.add_argument("--concurrency", type=int, default=16, help="Gleichzeitig offene Anfragen")
+    load.add_argument("--max-rounds", type=int, default=5, help="Maximale Anzahl bisheriger Züge")
+    load.set_defaults(func=bench_load)
+
+    engines = sub.add_parser("engines", help="Latenz und Konsistenz der Züge je Engine")
+    engines.add_argument("--engines", nargs="+", default=["enumeration", "mip"],
+                         choices=["auto", "enumeration", "mip", "mip-fresh"])
+    engines.add_argument("--requests", type=int, default=200)
+    engines.add_argument("--max-rounds", type=int, default=5, help="Maximale Anzahl bisheriger Züge")
+    engines.add_argument("--strategy", default="first",
+                         help="Strategie der Aufzählung (first: erster passender Code wie das MIP-Modell)")
+    engines.add_argument("--pins", type=int, default=NUM_PINS)
+    engines.add_argument("--colors", type=int, default=NUM_COLORS)
+    engines.add_argument("--no-duplicates", dest="duplicates", action="store_false")
+    engines.set_defaults(func=bench_engines)
+
+    strategies = sub.add_parser("strategies", help="Züge je Spiel und Zeit je Zug je Strategie")
+    strategies.add_argument("--strategies", nargs="+", default=["first", "minimax", "partitions", "expected"])
+    strategies.add_argument("--games", type=int, default=200)
+    strategies.add_argument("--pins", type=int, default=NUM_PINS)
+    strategies.add_argument("--colors", type=int, default=NUM_COLORS)
+    strategies.add_argument("--no-duplicates", dest="duplicates", action="store_false")
+    strategies.set_defaults(func=bench_strategies)
+
+    sessions = sub.add_parser("sessions", help="Durchsatz vieler gleichzeitiger Spiele: zustandslos vs. mit Zustand")
+    sessions.add_argument("--games", type=int, default=2000)
+    sessions.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    sessions.add_argument("--strategy", default="minimax")
+    sessions.set_defaults(func=bench_sessions)
+
+    startup = sub.add_parser("startup", help="Kaltstart: Zeit bis live, bis ready und bis zur ersten Antwort")
+    startup.add_argument("--workers", type=int, nargs="+", default=[1, 2], help="JOB_WORKERS je Messreihe")
+    startup.add_argument("--repeat", type=int, default=5)
+    startup.add_argument("--seed", type=int, default=1)
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
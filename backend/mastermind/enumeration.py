@@ -0,0 +1,163 @@
+import threading
+from collections import OrderedDict
+from itertools import permutations
+from math import perm
+
+import numpy as np
+
+MAX_ENUMERATION_CODES = 2**21  # Größere Coderäume löst das MIP-Modell (z.B. 8 Pins x 8 Farben)
+MAX_TABLE_CODES = 4096         # Bis hierher wird die Feedback-Tabelle aller Codepaare vorberechnet
+CHUNK_SIZE = 512               # Zeilen je Schritt beim Aufbau der Feedback-Tabelle
+CODE_TABLE_CACHE = 8           # So viele Konfigurationen hält ein Prozess gleichzeitig vor
+
+
+def code_space_size(pins: int, colors: int, duplicates: bool = True) -> int:
+    """Anzahl der Codes einer Konfiguration, ohne Wiederholungen Farben!/(Farben-Pins)!."""
+    return colors**pins if duplicates else perm(colors, pins)
+
+
+class CodeTable:
+    """
+    Alle Codes einer Konfiguration (Pins, Farben, Wiederholungen erlaubt) als kompaktes
+    uint8-Array, in lexikographischer Reihenfolge. Mit Wiederholungen hat Code i an Position p
+    die Farbe (i // Farben^(Pins-1-p)) % Farben; ohne Wiederholungen enthält die Tabelle nur die
+    Codes mit lauter verschiedenen Farben, in derselben Reihenfolge.
+
+    Feedback wird als eine Zahl rot * (Pins + 1) + weiß kodiert. Für kleine Coderäume
+    (bis MAX_TABLE_CODES) liegt das Feedback aller Codepaare als Tabelle vor, sonst wird die
+    benötigte Zeile vektorisiert aus den Farbzählungen berechnet.
+    """
+
+    def __init__(self, pins: int, colors: int, duplicates: bool = True):
+        self.pins = pins
+        self.colors = colors
+        self.duplicates = duplicates
+        self.size = code_space_size(pins, colors, duplicates)
+        self.place_values = colors ** np.arange(pins - 1, -1, -1, dtype=np.int64)
+        indices = np.arange(self.size, dtype=np.int64)
+        if duplicates:
+            self.codes = ((indices[:, None] // self.place_values) % colors).astype(np.uint8)
+            self.keys = None
+        else:
+            self.codes = np.array(list(permutations(range(colors), pins)), dtype=np.uint8).reshape(self.size, pins)
+            # Lexikographische Nummer jedes Codes unter allen Codes, aufsteigend: Index per Binärsuche
+            self.keys = self.codes @ self.place_values
+        # Anzahl jeder Farbe je Code, für die weißen Pins
+        self.counts = np.zeros((self.size, colors), dtype=np.uint8)
+        for p in range(pins):
+            self.counts[indices, self.codes[:, p]] += 1
+        self.table = self._feedback_table() if self.size <= MAX_TABLE_CODES else None
+
+    def _feedback_table(self) -> np.ndarray:
+        table = np.empty((self.size, self.size), dtype=np.uint8)
+        for start in range(0, self.size, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, self.size)
+            red = (self.codes[start:stop, None, :] == self.codes[None, :, :]).sum(axis=2)
+            common = np.minimum(self.counts[start:stop, None, :], self.counts[None, :, :]).sum(axis=2)
+            table[start:stop] = red * (self.pins + 1) + common - red
+        table.setflags(write=False)
+        return table
+
+    def index(self, code) -> int:
+        """Index eines Codes (Folge von Farbindizes); -1, wenn der Code nicht in der Tabelle steht."""
+        key = int(np.asarray(code, dtype=np.int64) @ self.place_values)
+        if self.keys is None:
+            return key
+        index = int(np.searchsorted(self.keys, key))
+        return index if index < self.size and self.keys[index] == key else -1
+
+    def encode_feedback(self, red: int, white: int) -> int:
+        return red * (self.pins + 1) + white
+
+    def feedback(self, guess: int, candidates: np.ndarray | None = None) -> np.ndarray:
+        """
+        Feedback des Rateversuchs guess (Index) gegen die Codes candidates (Indizes, Standard: alle).
+
+        Rückgabe:
+        - uint8-Array mit dem kodierten Feedback je Kandidat
+        """
+        if self.table is not None:
+            row = self.table[guess]
+            return row if candidates is None else row[candidates]
+        codes = self.codes if candidates is None else self.codes[candidates]
+        counts = self.counts if candidates is None else self.counts[candidates]
+        red = (codes == self.codes[guess]).sum(axis=1)
+        common = np.minimum(counts, self.counts[guess]).sum(axis=1)
+        return (red * (self.pins + 1) + common - red).astype(np.uint8)
+
+    def feedback_matrix(self, guesses: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Feedback jedes Rateversuchs (Zeile) gegen jeden Kandidaten (Spalte), beides Indizes."""
+        if self.table is not None:
+            return self.table[np.ix_(guesses, candidates)]
+        codes, counts = self.codes[candidates], self.counts[candidates]
+        red = (self.codes[guesses, None, :] == codes[None, :, :]).sum(axis=2)
+        common = np.minimum(self.counts[guesses, None, :], counts[None, :, :]).sum(axis=2)
+        return (red * (self.pins + 1) + common - red).astype(np.uint8)
+
+    def feedback_code(self, code, candidates: np.ndarray) -> np.ndarray:
+        """
+        Wie feedback, aber für einen Rateversuch als Folge von Farbindizes. Er muss nicht in der
+        Tabelle stehen (z.B. ein Rateversuch mit Wiederholungen in einem Spiel ohne).
+        """
+        index = self.index(code)
+        if index >= 0:
+            return self.feedback(index, candidates)
+        code = np.asarray(code, dtype=np.uint8)
+        counts = np.bincount(code, minlength=self.colors).astype(np.uint8)
+        red = (self.codes[candidates] == code).sum(axis=1)
+        common = np.minimum(self.counts[candidates], counts).sum(axis=1)
+        return (red * (self.pins + 1) + common - red).astype(np.uint8)
+
+    def filter(self, candidates: np.ndarray, guess, red: int, white: int) -> np.ndarray:
+        """Behält die Kandidaten, die auf guess (Folge von Farbindizes) genau das Feedback (red, white) geben würden."""
+        return candidates[self.feedback_code(guess, candidates) == self.encode_feedback(red, white)]
+
+    def consistent(self, guesses, reds, whites) -> np.ndarray:
+        """
+        Alle Codes, die mit dem bisherigen Spielverlauf übereinstimmen.
+
+        Parameter:
+        - guesses: Bisherige Rateversuche als Folgen von Farbindizes
+        - reds, whites: Rote und weiße Pins je Rateversuch
+
+        Rückgabe:
+        - int-Array der Indizes der verbleibenden Codes
+        """
+        candidates = np.arange(self.size)
+        for guess, red, white in zip(guesses, reds, whites):
+            candidates = self.filter(candidates, guess, red, white)
+        return candidates
+
+    def code(self, index: int) -> list:
+        return self.codes[index].tolist()
+
+
+_tables = OrderedDict()  # (Pins, Farben, Wiederholungen) -> CodeTable, zuletzt benutzte am Ende
+_tables_lock = threading.Lock()
+
+
+def code_table(pins: int, colors: int, duplicates: bool = True) -> CodeTable:
+    """Die CodeTable einer Konfiguration, einmal je Prozess aufgebaut (die letzten CODE_TABLE_CACHE bleiben erhalten)."""
+    table = cached_code_table(pins, colors, duplicates)
+    if table is not None:
+        return table
+    size = code_space_size(pins, colors, duplicates)
+    if size > MAX_ENUMERATION_CODES:
+        raise ValueError(f"{size} codes are too many to enumerate")
+    table = CodeTable(pins, colors, duplicates)
+    with _tables_lock:
+        _tables[(pins, colors, bool(duplicates))] = table
+        while len(_tables) > CODE_TABLE_CACHE:
+            _tables.popitem(last=False)
+    return table
+
+
+def cached_code_table(pins: int, colors: int, duplicates: bool = True) -> CodeTable | None:
+    """Die CodeTable, wenn sie in diesem Prozess schon aufgebaut ist, sonst None (ohne sie aufzubauen)."""
+    key = (pins, colors, bool(duplicates))
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is not None:
+            _tables.move_to_end(key)
+    return table
+
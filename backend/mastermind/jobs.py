@@ -0,0 +1,235 @@
+import asyncio
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from instrumentation import configure_logging, phase, run_instrumented
+
+
+class JobQueueFull(Exception):
+    """Es warten bereits so viele Aufträge, wie die Warteschlange aufnehmen darf."""
+
+
+class JobTimeout(Exception):
+    """Ein Auftrag wurde nicht innerhalb der erlaubten Zeit fertig."""
+
+
+ENGINES = ("auto", "enumeration", "mip")
+# Bis zu dieser Größe des Coderaums kostet ein Zug mit Zustand (Mikrosekunden) weniger als der
+# Umweg über den Prozesspool und wird direkt im Serverprozess berechnet, sobald die CodeTable dort
+# aufgebaut ist (der Aufbau selbst dauert bei 4096 Codes über eine Sekunde)
+INLINE_SESSION_CODES = 4096
+# Ohne Zustand filtert die Aufzählung je Anfrage alle Codes (etwa 0,2 µs je Code und Runde),
+# das MIP-Modell braucht weitgehend unabhängig von der Größe 20-30 ms: ab etwa 100000 Codes ist es schneller
+AUTO_ENUMERATION_CODES = 2**16
+
+
+def warm_up(models: bool = True):
+    """
+    Initialisiert einen Worker-Prozess: lädt die Codetabelle und das Eröffnungsbuch vorab, mit
+    models zusätzlich pyoptinterface/HiGHS und das Modellgerüst der Standardkonfiguration (4x6),
+    an dem einmal gelöst wird, damit die erste Anfrage nicht die restlichen Importe bezahlt.
+    Der Serverprozess rechnet nur kleine Spiele mit Zustand selbst und braucht kein Modell.
+    """
+    random.seed()
+    configure_logging()
+    from enumeration import code_table
+    from mastermind import NUM_COLORS, NUM_PINS, mastermind_model
+    from strategies import load_book
+
+    code_table(NUM_PINS, NUM_COLORS)
+    load_book()
+    if models:
+        mastermind_model(NUM_PINS, NUM_COLORS, True).solve(np.zeros((0, NUM_PINS, NUM_COLORS)), [], [])
+
+
+def init_worker(warm_workers=None):
+    """Initialisiert einen Worker des JobPools: vorwärmen und danach den gemeinsamen Zähler warm_workers erhöhen."""
+    warm_up()
+    if warm_workers is not None:
+        with warm_workers.get_lock():
+            warm_workers.value += 1
+
+
+def choose_engine(engine: str, pins: int, colors: int, duplicates: bool = True) -> str:
+    """
+    Löst "auto" auf: Aufzählung bis AUTO_ENUMERATION_CODES Codes, sonst das MIP-Modell, dessen
+    Größe nur mit Pins x Farben wächst.
+    """
+    from enumeration import code_space_size
+
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    if engine == "auto":
+        return "enumeration" if code_space_size(pins, colors, duplicates) <= AUTO_ENUMERATION_CODES else "mip"
+    return engine
+
+
+def next_move(C, G, B, engine: str = "auto", strategy: str = "minimax", pins: int | None = None,
+              colors: int | None = None, duplicates: bool = True) -> list | None:
+    """
+    Berechnet im Worker-Prozess den nächsten Zug; None, wenn kein Code zum Feedback passt.
+
+    Parameter:
+    - C: One-Hot-Array der bisherigen Züge (Runde, Position, Farbe)
+    - G, B: Rote und weiße Pins je Runde
+    - engine: "enumeration" (exakte Filterung aller Codes), "mip" (HiGHS-Modell) oder "auto"
+    - strategy: Auswahl unter den passenden Codes, siehe strategies.next_guess (nur Aufzählung;
+      das MIP-Modell liefert den ersten zulässigen Code)
+    - pins, colors, duplicates: Die Konfiguration (Standard: NUM_PINS x NUM_COLORS mit Wiederholungen)
+    """
+    from mastermind import NUM_COLORS, NUM_PINS, mastermind_model
+
+    pins, colors = pins or NUM_PINS, colors or NUM_COLORS
+    if choose_engine(engine, pins, colors, duplicates) == "mip":
+        return mastermind_model(pins, colors, duplicates).solve(C, G, B)
+
+    from strategies import next_guess
+
+    guesses = [] if len(C) == 0 else np.asarray(C).argmax(axis=2)
+    with phase("solve"):
+        return next_guess(guesses, G, B, pins, colors, strategy, duplicates)
+
+
+def session_step(pins: int, colors: int, strategy: str, candidates, guesses, reds, whites, duplicates: bool = True):
+    """
+    Ein Zug eines Spiels mit Zustand (siehe sessions.py): filtert die Kandidaten nur mit dem
+    letzten Feedback und wählt den nächsten Zug.
+
+    Parameter:
+    - pins, colors, strategy: Konfiguration und Strategie des Spiels
+    - candidates: Indizes der bisher passenden Codes (None: alle Codes)
+    - guesses, reds, whites: Der bisherige Verlauf; der letzte Eintrag ist neu
+    - duplicates: Ob eine Farbe mehrfach im Code vorkommen darf
+
+    Rückgabe:
+    - (Kandidaten als int32-Array oder None, nächster Zug oder None, wenn kein Code passt)
+    """
+    from enumeration import code_table
+    from strategies import pick_guess
+
+    table = code_table(pins, colors, duplicates)
+    if not guesses:
+        with phase("solve"):
+            return None, pick_guess(table, np.arange(table.size), guesses, reds, whites, strategy)
+    if candidates is None:
+        candidates = np.arange(table.size, dtype=np.int32)
+    with phase("presolve"):
+        candidates = table.filter(candidates, guesses[-1], reds[-1], whites[-1])
+    with phase("solve"):
+        return candidates, pick_guess(table, candidates, guesses, reds, whites, strategy)
+
+
+class JobPool:
+    """
+    Berechnet Züge in einem Pool vorgewärmter Prozesse, damit die Event-Loop von FastAPI
+    nicht am GIL hängt.
+
+    Die Anzahl gleichzeitig angenommener Aufträge ist auf max_pending begrenzt; darüber hinaus wird
+    JobQueueFull ausgelöst. Aufträge, die nach timeout Sekunden nicht fertig sind, werden abgebrochen
+    (noch wartende werden aus der Warteschlange entfernt, laufende laufen zu Ende und ihr Ergebnis
+    wird verworfen) und JobTimeout wird ausgelöst.
+
+    Jeder Auftrag läuft über instrumentation.run_instrumented; mit metrics (instrumentation.Metrics)
+    landen Rechenzeit, Abschnitte und HiGHS-Kennzahlen dort.
+
+    Die Klasse liegt bewusst in beiden Services (backend/sudoku/jobs.py und
+    backend/mastermind/jobs.py), aus demselben Grund wie instrumentation.py: jedes Image bleibt
+    eigenständig. ready, stop, run, _execute und stats sind in beiden gleich, start unterscheidet
+    sich nur in den Argumenten für init_worker; Änderungen daran immer in beiden vornehmen. Nur die
+    Sudoku-Fassung hat zusätzlich die Caches der Worker und run_many für die Stapel-Endpunkte.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 8, timeout: float = 30.0, metrics=None):
+        self.workers = workers
+        self.metrics = metrics
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self._executor = None
+        self.warm_workers = multiprocessing.Value("i", 0)  # Worker, die init_worker abgeschlossen haben
+
+    def start(self, wait: bool = True):
+        """
+        Startet alle Worker sofort, damit der erste Auftrag nicht auf Import und Vorwärmen wartet.
+        Mit wait=False kehrt start gleich zurück; Aufträge warten dann in der Warteschlange, bis
+        ein Worker bereit ist (siehe ready).
+        """
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                             initargs=(self.warm_workers,))
+        futures = [self._executor.submit(os.getpid) for _ in range(self.workers)]
+        if wait:
+            # Die Aufträge können auf bereits warmen Workern laufen: danach noch auf den Zähler warten
+            for future in futures:
+                future.result()
+            while not self.ready():
+                time.sleep(0.01)
+
+    def ready(self) -> bool:
+        """True, sobald jeder Worker sein Vorwärmen abgeschlossen hat (gezählt in init_worker)."""
+        return self._executor is not None and self.warm_workers.value >= self.workers
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn, *args, timeout: float | None = None):
+        """
+        Führt fn(*args) in einem Worker-Prozess aus und wartet asynchron auf das Ergebnis.
+
+        Parameter:
+        - fn: Funktion auf Modulebene (muss sich an den Worker übergeben lassen)
+        - args: Argumente für fn
+        - timeout: Zeitlimit in Sekunden, sonst das Zeitlimit des Pools
+
+        Rückgabe:
+        - Das Ergebnis von fn
+        """
+        if self.pending >= self.max_pending:
+            raise JobQueueFull()
+        return await self._execute(fn, args, timeout)
+
+    async def _execute(self, fn, args, timeout):
+        self.pending += 1
+        try:
+            start = time.perf_counter()
+            future = self._executor.submit(run_instrumented, fn, *args)
+            try:
+                result, record = await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+                if self.metrics is not None:
+                    self.metrics.record(fn.__name__, record, time.perf_counter() - start)
+                return result
+            except asyncio.TimeoutError:
+                raise JobTimeout()
+            finally:
+                # Bei Zeitüberschreitung oder Verbindungsabbruch den Auftrag nicht mehr starten
+                future.cancel()
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "timeout_seconds": self.timeout,
+            "pending": self.pending,
+        }
+
+
+def job_pool_from_environment(metrics=None) -> JobPool:
+    """
+    Erzeugt den Prozesspool aus Umgebungsvariablen:
+    JOB_WORKERS (Standard: Anzahl CPUs), JOB_QUEUE_SIZE (Standard: 4 je Worker) und
+    JOB_TIMEOUT (Sekunden, Standard: 30).
+    """
+    workers = int(os.environ.get("JOB_WORKERS", os.cpu_count() or 1))
+    return JobPool(
+        workers=workers,
+        max_pending=int(os.environ.get("JOB_QUEUE_SIZE", 4 * workers)),
+        timeout=float(os.environ.get("JOB_TIMEOUT", "30")),
+        metrics=metrics,
+    )
@@ -1,13 +1,44 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import time
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional
+import numpy as np
 import uvicorn
 
-from mastermind import Mastermind, generate_first_move, reconstruct_C_matrix
+from instrumentation import configure_logging, run_instrumented, service_metrics
+from jobs import INLINE_SESSION_CODES, JobQueueFull, JobTimeout, choose_engine, job_pool_from_environment, next_move, session_step, warm_up
+from enumeration import MAX_ENUMERATION_CODES, cached_code_table, code_space_size, code_table
+from mastermind import NUM_COLORS, NUM_PINS, check_config, generate_first_move, reconstruct_C_matrix
+from sessions import session_store_from_environment
+from strategies import STRATEGIES
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Prozesspool für die Zugberechnung, damit die Event-Loop nicht blockiert
+    app.state.metrics = service_metrics("mastermind")
+    job_pool = job_pool_from_environment(app.state.metrics)
+    # Die Worker wärmen im Hintergrund vor; bis dahin meldet /health/ready 503, Anfragen warten im Pool
+    job_pool.start(wait=False)
+    app.state.job_pool = job_pool
+    app.state.sessions = session_store_from_environment()
+    # Spiele mit Zustand und kleinem Coderaum laufen im Serverprozess: Codetabelle und
+    # Eröffnungsbuch in einem Thread vorab laden, das MIP-Modell (und damit HiGHS) nur in den Workern
+    app.state.warming = asyncio.get_running_loop().run_in_executor(None, warm_up, False)
+    app.state.building_tables = set()  # Konfigurationen, deren CodeTable gerade im Hintergrund entsteht
+    yield
+    job_pool.stop()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # Erlaube Anfragen von Frontend (Port 3000 oder wo auch immer es läuft)
 origins = [
@@ -24,6 +55,17 @@ app.add_middleware(
     allow_headers=["*"], # Erlaube alle Header
 )
 
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """Misst jede Anfrage je Endpunkt (Routenmuster statt konkretem Pfad) für /metrics."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    app.state.metrics.observe("request_duration_seconds", time.perf_counter() - start, request.method,
+                              route.path if route is not None else "unmatched", str(response.status_code))
+    return response
+
 # --- Pydantic Models für Request Bodies --- #
 class FeedbackModel(BaseModel):
     redPins: int
@@ -35,70 +77,225 @@ class MoveModel(BaseModel):
 
 class FeedbackNextMoveRequest(BaseModel):
     moves: List[MoveModel] # Bisherige Züge mit Farbindizes
+    engine: str = "auto"   # "enumeration", "mip" oder "auto" (Aufzählung für kleine Coderäume)
+    strategy: str = "minimax"  # "first", "minimax", "partitions" oder "expected" (nur Aufzählung)
+    pins: int = NUM_PINS
+    colors: int = NUM_COLORS
+    duplicates: bool = True    # Darf eine Farbe mehrfach im Code vorkommen?
 
 
 # --- API Endpunkte --- #
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Mastermind Backend running"}
 
+@app.get("/health/live")
+async def get_liveness():
+    """Der Serverprozess läuft und nimmt Anfragen an."""
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def get_readiness():
+    """Bereit, sobald Serverprozess und alle Worker des Prozesspools vorgewärmt sind; vorher 503."""
+    if not (app.state.warming.done() and app.state.job_pool.ready()):
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready"}
+
+@app.get("/jobs/stats")
+async def get_job_stats():
+    """Auslastung des Prozesspools."""
+    return app.state.job_pool.stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Kennzahlen im Textformat von Prometheus: Dauer der Anfragen je Endpunkt, Rechen- und
+    Wartezeit der Aufträge, ihre Abschnitte (presolve, build, solve, extract) und die
+    HiGHS-Kennzahlen (Knoten, Iterationen, Rechenzeit).
+    """
+    return Response(content=app.state.metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/mastermind/first_move")
-def get_first_move():
-    """Generiert und gibt den ersten Zug zurück."""
-    try:
-        first_move_indices = generate_first_move()
-        # first_move ist eine Liste von Farb-Indizes [0, 0, 1, 1]
-        print(f"Generated first move: {first_move_indices}")
-        return {"solution": first_move_indices}
-    except Exception as e:
-        print(f"Error generating first move: {e}")
-        raise HTTPException(status_code=500, detail="Failed to generate first move")
+async def get_first_move(strategy: str = "minimax", pins: int = NUM_PINS, colors: int = NUM_COLORS,
+                         duplicates: bool = True):
+    """
+    Gibt den ersten Zug zurück: aus dem Eröffnungsbuch der Strategie oder, mit strategy=random,
+    eine zufällige Eröffnung aus Farbpaaren (AABB bei 4 Pins).
+    """
+    check_request(pins, colors, duplicates)
+    if strategy == "random":
+        first_move_indices = generate_first_move(pins, colors, duplicates)
+    else:
+        # Ohne Verlauf gibt es nichts zu filtern: die Aufzählung kostet nur Eröffnungsbuch oder Eröffnungsmuster
+        engine = "enumeration" if code_space_size(pins, colors, duplicates) <= MAX_ENUMERATION_CODES else "mip"
+        first_move_indices = await run_next_move(np.empty(0), [], [], engine, strategy, pins, colors, duplicates)
+    # first_move ist eine Liste von Farb-Indizes [0, 0, 1, 1]
+    logger.debug("Generated first move: %s", first_move_indices)
+    return {"solution": first_move_indices}
 
 @app.post("/mastermind/submit_feedback_next_move")
-def submit_feedback_and_get_next(request: FeedbackNextMoveRequest):
+async def submit_feedback_and_get_next(request: FeedbackNextMoveRequest):
     """Nimmt Feedback entgegen, berechnet und gibt den nächsten Zug zurück."""
 
-    print(f"Received Moves: {request.moves}")
-    
-    C = reconstruct_C_matrix(request.moves)
+    logger.debug("Received moves: %s", request.moves)
+    check_request(request.pins, request.colors, request.duplicates, request.moves)
+
+    C = reconstruct_C_matrix(request.moves, request.colors)
     G = [move.feedback.redPins for move in request.moves]
     B = [move.feedback.whitePins for move in request.moves]
-    mastermind_solver = Mastermind(C, G, B)
-    solution_move = mastermind_solver.solve()
+    solution_move = await run_next_move(C, G, B, request.engine, request.strategy,
+                                        request.pins, request.colors, request.duplicates)
     return {"solution": solution_move}
-    
-    # Rekonstruiere die C-Matrix aus den bisherigen Zügen
-    # Die Anzahl der Runden für die C-Matrix ist `request.round + 1`
-    num_previous_rounds = request.round + 1
+
+
+class SessionRequest(BaseModel):
+    strategy: str = "minimax"
+    pins: int = NUM_PINS
+    colors: int = NUM_COLORS
+    duplicates: bool = True
+
+
+@app.post("/mastermind/sessions")
+async def create_session(request: SessionRequest):
+    """
+    Startet ein Spiel mit Zustand auf dem Server. Danach genügt es, je Zug nur das Feedback zu
+    senden; der Server hält die noch passenden Codes.
+
+    Rückgabe:
+    - session_id und der erste Zug
+    """
+    if request.strategy not in STRATEGIES:
+        raise HTTPException(status_code=422, detail=f"Unknown strategy: {request.strategy}")
+    check_request(request.pins, request.colors, request.duplicates)
+    if code_space_size(request.pins, request.colors, request.duplicates) > MAX_ENUMERATION_CODES:
+        # Spiele mit Zustand halten die passenden Codes; dafür muss sich der Coderaum aufzählen lassen
+        raise HTTPException(status_code=422, detail="Code space too large for a session, use submit_feedback_next_move")
+    session = app.state.sessions.create(request.pins, request.colors, request.strategy, request.duplicates)
+    return {"session_id": session.id, "solution": await run_session_step(session)}
+
+@app.post("/mastermind/sessions/{session_id}/feedback")
+async def submit_session_feedback(session_id: str, feedback: FeedbackModel):
+    """
+    Nimmt das Feedback zum letzten Zug des Spiels entgegen und gibt den nächsten Zug zurück
+    (None, wenn kein Code mehr passt). Ist der Code erraten, wird das Spiel beendet.
+    """
+    session = app.state.sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    check_feedback(feedback, session.pins)
+    if feedback.redPins == session.pins:
+        app.state.sessions.delete(session_id)
+        return {"solution": session.guesses[-1], "solved": True}
+    return {"solution": await run_session_step(session, feedback.redPins, feedback.whitePins), "solved": False}
+
+@app.delete("/mastermind/sessions/{session_id}")
+async def delete_session(session_id: str):
+    app.state.sessions.delete(session_id)
+    return {"deleted": session_id}
+
+@app.get("/mastermind/sessions/stats")
+async def get_session_stats():
+    """Anzahl, Speicherbedarf und Verdrängungen der Spiele mit Zustand."""
+    return app.state.sessions.stats()
+
+
+async def run_session_step(session, red: int | None = None, white: int | None = None):
+    """
+    Berechnet den nächsten Zug eines Spiels, bei kleinen Coderäumen mit bereits aufgebauter
+    CodeTable direkt, sonst im Prozesspool (fehlt nur die Tabelle, entsteht sie derweil in einem
+    Thread, siehe build_table_in_background). Feedback und Zug werden erst nach
+    erfolgreicher Berechnung in den Verlauf übernommen; passt kein Code mehr, endet das Spiel.
+    """
+    if session.busy:
+        raise HTTPException(status_code=409, detail="A move for this session is already being computed")
+    reds, whites = session.reds, session.whites
+    if red is not None:
+        reds, whites = reds + [red], whites + [white]
+    args = (session.pins, session.colors, session.strategy, session.candidates, session.guesses, reds, whites,
+            session.duplicates)
+    session.busy = True
+    try:
+        config = (session.pins, session.colors, session.duplicates)
+        inline = code_space_size(*config) <= INLINE_SESSION_CODES
+        if inline and cached_code_table(*config) is None:
+            # Den Aufbau (über eine Sekunde) nicht auf der Event-Loop ausführen
+            build_table_in_background(config)
+            inline = False
+        if inline:
+            start = time.perf_counter()
+            (candidates, guess), record = run_instrumented(session_step, *args)
+            app.state.metrics.record("session_step", record, time.perf_counter() - start)
+        else:
+            candidates, guess = await app.state.job_pool.run(session_step, *args)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many pending requests")
+    except JobTimeout:
+        raise HTTPException(status_code=504, detail="Request timed out")
+    finally:
+        session.busy = False
+    if guess is None:
+        app.state.sessions.delete(session.id)
+        return None
+    session.reds, session.whites = reds, whites
+    session.guesses.append(guess)
+    app.state.sessions.update(session, candidates)
+    return guess
+
+
+def build_table_in_background(config: tuple):
+    """Baut die CodeTable einer Konfiguration in einem Thread auf, damit die folgenden Züge direkt laufen."""
+    building = app.state.building_tables
+    if config in building:
+        return
+    building.add(config)
+    future = asyncio.get_running_loop().run_in_executor(None, code_table, *config)
+    future.add_done_callback(lambda _: building.discard(config))
+
+
+def check_request(pins: int, colors: int, duplicates: bool, moves=()):
+    """Prüft Konfiguration und bisherige Züge; ungültige Anfragen werden mit 422 abgelehnt."""
+    try:
+        check_config(pins, colors, duplicates)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    for move in moves:
+        if len(move.colors) != pins or not all(0 <= c < colors for c in move.colors):
+            raise HTTPException(status_code=422, detail=f"Move {move.colors} does not fit {pins} pins and {colors} colors")
+        if move.feedback is None:
+            raise HTTPException(status_code=422, detail=f"Move {move.colors} has no feedback")
+        check_feedback(move.feedback, pins)
+
+
+def check_feedback(feedback: FeedbackModel, pins: int):
+    """
+    Lehnt Feedback ab, das es bei pins Pins nicht geben kann (422): negative Pins, mehr Pins als
+    Positionen oder pins-1 rote und ein weißer Pin (der letzte Pin hätte dann auch rot sein müssen).
+    """
+    red, white = feedback.redPins, feedback.whitePins
+    if red < 0 or white < 0 or red + white > pins or (red, white) == (pins - 1, 1):
+        raise HTTPException(status_code=422, detail=f"Impossible feedback for {pins} pins: {red} red, {white} white")
+
+
+async def run_next_move(C, G, B, engine: str, strategy: str, pins: int = NUM_PINS, colors: int = NUM_COLORS,
+                        duplicates: bool = True):
+    """Berechnet den nächsten Zug im Prozesspool und übersetzt Fehler in HTTP-Statuscodes."""
+    if strategy not in STRATEGIES:
+        raise HTTPException(status_code=422, detail=f"Unknown strategy: {strategy}")
     try:
-        C = reconstruct_C_matrix(request.moves)
-        if C.shape[0] != num_previous_rounds:
-             print(f"Warning: Reconstructed C matrix has {C.shape[0]} rounds, expected {num_previous_rounds}")
-             # Handle potential mismatch if necessary, maybe slice C or raise error
-             if C.shape[0] < num_previous_rounds:
-                 raise ValueError("Reconstructed C matrix has fewer rounds than expected.")
-             C = C[:num_previous_rounds, :, :] # Use only the relevant rounds
-
-        print("Reconstructed C matrix shape:", C.shape)
-    except Exception as e:
-        print(f"Error reconstructing C matrix: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to reconstruct C matrix: {e}")
-
-
-    # Berechne den nächsten Zug mit dem Solver
-    # Die Runde für den Solver ist die Anzahl der *bisherigen* Feedbacks = num_previous_rounds
-    solver_round = num_previous_rounds
+        # Für zu große Coderäume scheitert "enumeration" schon hier und nicht erst im Worker
+        if choose_engine(engine, pins, colors, duplicates) == "enumeration":
+            code_table_size = code_space_size(pins, colors, duplicates)
+            if code_table_size > MAX_ENUMERATION_CODES:
+                raise ValueError(f"{code_table_size} codes are too many to enumerate")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     try:
-        # Verwende die korrekten G und B Arrays aus dem Request
-        mastermind_solver = Mastermind(C, request.G, request.B, solver_round)
-        next_move_indices = mastermind_solver.solve()
-        print(f"Calculated next move: {next_move_indices}")
-        return {"solution": next_move_indices}
-    except Exception as e:
-        print(f"Error solving Mastermind: {e}")
-        # Hier könnte spezifischeres Fehlerhandling erfolgen, z.B. wenn keine Lösung gefunden wird
-        raise HTTPException(status_code=500, detail=f"Failed to calculate next move: {e}")
+        return await app.state.job_pool.run(next_move, C, G, B, engine, strategy, pins, colors, duplicates)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many pending requests")
+    except JobTimeout:
+        raise HTTPException(status_code=504, detail="Request timed out")
 
 # --- Server starten (wenn die Datei direkt ausgeführt wird) --- #
 if __name__ == "__main__":
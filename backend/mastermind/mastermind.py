@@ -1,87 +1,159 @@
 from enum import Enum
-import pyoptinterface as poi
-from pyoptinterface import highs
+from functools import lru_cache
+import logging
 import numpy as np
 from typing import List, Dict
 import random # Für den ersten Zug
 
+from instrumentation import phase, record_highs
+
 NUM_PINS = 4
 NUM_COLORS = 6
+MAX_PINS = 10
+MAX_COLORS = 20
+MODEL_CACHE = 8  # So viele Modellgerüste (je Konfiguration) hält ein Prozess vor
+
+logger = logging.getLogger(__name__)
+
+
+def check_config(pins: int, colors: int, duplicates: bool = True):
+    """Löst ValueError aus, wenn sich mit der Konfiguration kein Spiel spielen lässt."""
+    if not 1 <= pins <= MAX_PINS:
+        raise ValueError(f"pins must be between 1 and {MAX_PINS}")
+    if not 2 <= colors <= MAX_COLORS:
+        raise ValueError(f"colors must be between 2 and {MAX_COLORS}")
+    if not duplicates and colors < pins:
+        raise ValueError("Without duplicates there must be at least as many colors as pins")
+
 
 class Mastermind:
-    def __init__(self, C, G, B):
-        round = len(C)
-        
+    """
+    MIP-Modell einer Konfiguration (Pins, Farben, Wiederholungen erlaubt).
+
+    Das Gerüst aus Variablen und "genau eine Farbe je Position" (ohne Wiederholungen zusätzlich
+    "jede Farbe höchstens einmal") wird einmal aufgebaut; solve fügt die Bedingungen der bisherigen
+    Runden hinzu und entfernt sie danach wieder, sodass das Gerüst für die nächste Anfrage bleibt.
+    """
+
+    def __init__(self, pins: int = NUM_PINS, colors: int = NUM_COLORS, duplicates: bool = True):
+        self.pins = pins
+        self.colors = colors
+        self.duplicates = duplicates
+        # pyoptinterface/HiGHS erst hier laden: Der Serverprozess braucht sie nicht (siehe jobs.warm_up)
+        import pyoptinterface as poi
+        from pyoptinterface import highs
+
         self.model = highs.Model()
-        self.x = np.empty((NUM_PINS, NUM_COLORS), dtype=object)
-        print(C, G, B, round)
+        # Die Konsolenausgabe von HiGHS nur mit LOG_LEVEL=DEBUG
+        self.model.set_raw_parameter("log_to_console", logger.isEnabledFor(logging.DEBUG))
+        self.x = np.empty((pins, colors), dtype=object)
 
         # Variablen: x[p, c] = 1, wenn an Position p die Farbe c ist, sonst 0
-        for p in range(NUM_PINS):
-            for c in range(NUM_COLORS):
+        for p in range(pins):
+            for c in range(colors):
                 self.x[p, c] = self.model.add_variable(domain=poi.VariableDomain.Binary)
 
         # Constraint: Pro Position genau eine Farbe
-        for p in range(NUM_PINS):
+        for p in range(pins):
             self.model.add_linear_constraint(poi.quicksum(self.x[p, :]), poi.Eq, 1.0)
 
-        # Constraints basierend auf bisherigen Runden (Feedback)
-        if round > 0:
-            for t in range(round):
-                # Constraint für rote/schwarze Pins (G[t])
-                red_pins_sum = poi.quicksum([
-                    self.x[p, c] for p in range(NUM_PINS) 
-                                 for c in range(NUM_COLORS) 
-                                 if C[t, p, c] == 1
-                    ])
-                self.model.add_linear_constraint(red_pins_sum, poi.Eq, G[t])
-                print("ok")
-
-                # Constraint für weiße Pins (B[t])
-                white_pins_sum = poi.quicksum([
-                    self.x[p, c] for p in range(NUM_PINS) 
-                                 for c in range(NUM_COLORS) 
-                                 if C[t, p, c] != 1
-                                 if any([C[t, q, c] == 1 for q in range(NUM_PINS)])             
-                    ])
-                self.model.add_linear_constraint(white_pins_sum, poi.Geq, B[t])
+        # Constraint: Ohne Wiederholungen jede Farbe höchstens einmal
+        if not duplicates:
+            for c in range(colors):
+                self.model.add_linear_constraint(poi.quicksum(self.x[:, c]), poi.Leq, 1.0)
 
+    def add_round(self, guess, red: int, white: int, variables: list, constraints: list):
+        """
+        Bedingungen einer Runde: genau red Positionen stimmen, und für jede Farbe c des
+        Rateversuchs ist m_c = min(Anzahl von c im Code, Anzahl g_c im Rateversuch) mit
+        sum(m_c) = red + white. Das Minimum wird über eine Binärvariable z_c exakt modelliert:
+        z_c = 0 erzwingt m_c = Anzahl im Code <= g_c, z_c = 1 erzwingt m_c = g_c <= Anzahl im Code.
+        """
+        import pyoptinterface as poi
+
+        # Constraint für rote/schwarze Pins
+        constraints.append(self.model.add_linear_constraint(
+            poi.quicksum(self.x[p, guess[p]] for p in range(self.pins)), poi.Eq, red))
+
+        # Constraint für rote + weiße Pins
+        matches = []
+        for c, g in enumerate(np.bincount(guess, minlength=self.colors)):
+            if g == 0:
+                continue
+            m = self.model.add_variable(lb=0, ub=int(g), domain=poi.VariableDomain.Integer)
+            z = self.model.add_variable(domain=poi.VariableDomain.Binary)
+            variables += [m, z]
+            count = poi.quicksum(self.x[:, c])
+            constraints.append(self.model.add_linear_constraint(m - count, poi.Leq, 0))
+            constraints.append(self.model.add_linear_constraint(count - m - self.pins * z, poi.Leq, 0))
+            constraints.append(self.model.add_linear_constraint(m - int(g) * z, poi.Geq, 0))
+            matches.append(m)
+        constraints.append(self.model.add_linear_constraint(poi.quicksum(matches), poi.Eq, red + white))
 
     def get_solution(self):
         try:
             get_v = np.vectorize(lambda var: self.model.get_value(var))
             solution_matrix = get_v(self.x)
-        except Exception as e:
-             print(f"Error getting solution values: {e}")
+        except Exception:
+             logger.exception("Error getting solution values")
              return None
-         
-        solution = []
-        for p in range(NUM_PINS):
-            for c in range(NUM_COLORS):
-                if solution_matrix[p, c] == 1:
-                    solution.append(c)
-        return solution
 
+        return [int(c) for c in solution_matrix.argmax(axis=1)]
+
+    def solve(self, C, G, B):
+        """
+        Sucht einen Code, der zu allen bisherigen Runden exakt passt.
+
+        Parameter:
+        - C: One-Hot-Array der bisherigen Züge (Runde, Position, Farbe)
+        - G, B: Rote und weiße Pins je Runde
 
-    def solve(self):
+        Rückgabe:
+        - Der Code als Liste von Farbindizes oder None, wenn keiner passt
+        """
+        import pyoptinterface as poi
+
+        logger.debug("Rounds: %d, C=%s, G=%s, B=%s", len(C), C, G, B)
+        variables, constraints = [], []
         try:
-            self.model.optimize()
+            with phase("build"):
+                for t in range(len(C)):
+                    self.add_round(np.asarray(C[t]).argmax(axis=1), G[t], B[t], variables, constraints)
+            with phase("solve"):
+                self.model.optimize()
+            record_highs(self.model)
             status = self.model.get_model_attribute(poi.ModelAttribute.TerminationStatus)
-            print("Termination status:", status)
+            logger.debug("Termination status: %s", status)
 
             # Prüfe, ob eine optimale oder machbare Lösung gefunden wurde
             if status == poi.TerminationStatusCode.OPTIMAL:
-                return self.get_solution()
+                with phase("extract"):
+                    return self.get_solution()
             else:
-                print(f"Solver terminated with status: {status}. No solution found.")
+                logger.info("Solver terminated with status: %s. No solution found.", status)
                 return None # Keine gültige Lösung gefunden oder anderer Fehler
-        except Exception as e:
-            print(f"Exception during optimization or solution retrieval: {e}")
+        except Exception:
+            logger.exception("Exception during optimization or solution retrieval")
             return None
+        finally:
+            # Gerüst für die nächste Anfrage wiederherstellen
+            for constraint in constraints:
+                self.model.delete_constraint(constraint)
+            self.model.delete_variables(variables)
+
+
+@lru_cache(maxsize=MODEL_CACHE)
+def mastermind_model(pins: int = NUM_PINS, colors: int = NUM_COLORS, duplicates: bool = True) -> Mastermind:
+    """Das Modellgerüst einer Konfiguration, einmal je Prozess aufgebaut."""
+    return Mastermind(pins, colors, duplicates)
+
 
-def generate_first_move() -> List[int]:
-    return [c for c in random.sample(range(NUM_PINS), 2) for _ in range(2)]
+def generate_first_move(pins: int = NUM_PINS, colors: int = NUM_COLORS, duplicates: bool = True) -> List[int]:
+    """Zufällige Eröffnung aus Farbpaaren (AABB bei 4 Pins); ohne Wiederholungen lauter verschiedene Farben."""
+    if not duplicates:
+        return random.sample(range(colors), pins)
+    pairs = random.sample(range(colors), min(colors, (pins + 1) // 2))
+    return [pairs[(p // 2) % len(pairs)] for p in range(pins)]
 
-def reconstruct_C_matrix(moves: List[Dict]) -> np.ndarray:
-    return np.array([[[1 if c == color else 0 for c in range(NUM_COLORS)]for color in move.colors]for move in moves])
-    
\ No newline at end of file
+def reconstruct_C_matrix(moves: List[Dict], colors: int = NUM_COLORS) -> np.ndarray:
+    return np.array([[[1 if c == color else 0 for c in range(colors)]for color in move.colors]for move in moves])
@@ -0,0 +1,77 @@
+"""
+Berechnet das Eröffnungsbuch für gängige Konfigurationen und schreibt es nach opening_book.json.
+
+Aufruf (im Verzeichnis backend/mastermind):
+    python opening_book.py --configs 4x6:3 5x8:2 6x8:2 --strategies minimax partitions expected
+    python opening_book.py --configs 4x6:3 4x8u:3 --output book.json   # u: ohne Wiederholungen
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from enumeration import code_table
+from strategies import BOOK_PATH, book_key, choose_guess
+
+
+def build_node(table, candidates: np.ndarray, strategy: str, plies: int) -> dict:
+    """
+    Baut einen Knoten des Eröffnungsbaums: den Rateversuch für die Kandidaten und, solange noch
+    Züge fehlen, für jedes mögliche Feedback den Folgeknoten.
+    """
+    guess = choose_guess(table, candidates, strategy)
+    node = {"guess": table.code(guess), "replies": {}}
+    if plies <= 1:
+        return node
+    feedback = table.feedback(guess, candidates)
+    for value in np.unique(feedback):
+        red, white = divmod(int(value), table.pins + 1)
+        if red == table.pins:
+            continue  # Getroffen
+        node["replies"][f"{red},{white}"] = build_node(table, candidates[feedback == value], strategy, plies - 1)
+    return node
+
+
+def build_book(configs, strategies) -> dict:
+    """
+    Parameter:
+    - configs: Folge von (Pins, Farben, Wiederholungen erlaubt, Züge)
+    - strategies: Strategienamen, siehe strategies.STRATEGIES
+
+    Rückgabe:
+    - Das Buch: Schlüssel aus strategies.book_key -> Wurzelknoten
+    """
+    book = {}
+    for pins, colors, duplicates, plies in configs:
+        table = code_table(pins, colors, duplicates)
+        for strategy in strategies:
+            start = time.perf_counter()
+            key = book_key(pins, colors, strategy, duplicates)
+            book[key] = build_node(table, np.arange(table.size), strategy, plies)
+            print(f"{key}: {plies} Züge in {time.perf_counter() - start:.1f} s")
+    return book
+
+
+def parse_config(text: str):
+    size, _, plies = text.partition(":")
+    pins, colors = size.split("x")
+    duplicates = not colors.endswith("u")
+    return int(pins), int(colors.rstrip("u")), duplicates, int(plies or 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", nargs="+", type=parse_config, default=["4x6:3", "5x8:2", "6x8:2"],
+                        help="PinsxFarben[u]:Züge")
+    parser.add_argument("--strategies", nargs="+", default=["minimax", "partitions", "expected"])
+    parser.add_argument("--output", default=BOOK_PATH)
+    args = parser.parse_args()
+    configs = [parse_config(c) if isinstance(c, str) else c for c in args.configs]
+
+    with open(args.output, "w") as f:
+        json.dump(build_book(configs, args.strategies), f, separators=(",", ":"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class GameSession:
+    """
+    Zustand eines laufenden Spiels: Konfiguration, bisheriger Verlauf und die Indizes der Codes,
+    die noch zum Feedback passen (None, solange noch alle Codes möglich sind).
+    """
+
+    __slots__ = ("id", "pins", "colors", "duplicates", "strategy", "guesses", "reds", "whites", "candidates",
+                 "busy", "last_used")
+
+    def __init__(self, pins: int, colors: int, strategy: str, duplicates: bool = True):
+        self.id = uuid.uuid4().hex
+        self.pins = pins
+        self.colors = colors
+        self.duplicates = duplicates
+        self.strategy = strategy
+        self.guesses = []
+        self.reds = []
+        self.whites = []
+        self.candidates = None
+        self.busy = False  # Ein Zug wird gerade berechnet
+        self.last_used = time.monotonic()
+
+    @property
+    def memory(self) -> int:
+        return 0 if self.candidates is None else self.candidates.nbytes
+
+
+class SessionStore:
+    """
+    Hält die laufenden Spiele im Speicher, in der Reihenfolge der letzten Verwendung.
+
+    Spiele, die länger als ttl Sekunden nicht verwendet wurden, werden entfernt, ebenso die am
+    längsten unbenutzten, sobald mehr als max_sessions Spiele oder mehr als max_memory Bytes an
+    Kandidaten gehalten werden.
+    """
+
+    def __init__(self, ttl: float = 1800.0, max_sessions: int = 10000, max_memory: int = 256 * 2**20):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_memory = max_memory
+        self.memory = 0
+        self.evicted_ttl = 0
+        self.evicted_capacity = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, pins: int, colors: int, strategy: str, duplicates: bool = True) -> GameSession:
+        session = GameSession(pins, colors, strategy, duplicates)
+        with self._lock:
+            self._sessions[session.id] = session
+            self._evict()
+        return session
+
+    def get(self, session_id: str) -> GameSession | None:
+        """Das Spiel mit session_id oder None, wenn es nicht existiert oder abgelaufen ist."""
+        with self._lock:
+            self._evict()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def update(self, session: GameSession, candidates):
+        """Ersetzt die Kandidaten eines Spiels und hält dabei den Speicherbedarf nach."""
+        with self._lock:
+            if session.id in self._sessions:
+                self.memory -= session.memory
+            session.candidates = candidates
+            if session.id in self._sessions:
+                self.memory += session.memory
+                self._evict()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self.memory -= session.memory
+
+    def _evict(self):
+        expired = time.monotonic() - self.ttl
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used < expired:
+                self.evicted_ttl += 1
+            elif len(self._sessions) > self.max_sessions or self.memory > self.max_memory:
+                self.evicted_capacity += 1
+            else:
+                return
+            self._sessions.popitem(last=False)
+            self.memory -= session.memory
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl,
+                "memory_bytes": self.memory,
+                "max_memory_bytes": self.max_memory,
+                "evicted_ttl": self.evicted_ttl,
+                "evicted_capacity": self.evicted_capacity,
+            }
+
+
+def session_store_from_environment() -> SessionStore:
+    """
+    Erzeugt den Spielspeicher aus Umgebungsvariablen: SESSION_TTL (Sekunden, Standard: 1800),
+    MAX_SESSIONS (Standard: 10000) und SESSION_MEMORY (Bytes für Kandidaten, Standard: 256 MiB).
+    """
+    return SessionStore(
+        ttl=float(os.environ.get("SESSION_TTL", "1800")),
+        max_sessions=int(os.environ.get("MAX_SESSIONS", "10000")),
+        max_memory=int(os.environ.get("SESSION_MEMORY", str(256 * 2**20))),
+    )
@@ -0,0 +1,196 @@
+"""
+Spielt Mastermind-Partien vollständig durch und berichtet Qualität und Geschwindigkeit als JSON.
+
+Aufruf (im Verzeichnis backend/mastermind):
+    python simulation.py --engine enumeration --strategy minimax --workers 2 --output minimax.json
+    python simulation.py --engine mip --sample 200 --seed 1
+    python simulation.py --baseline minimax.json   # Exit-Code 1 bei Verschlechterung
+    python simulation.py --pins 5 --colors 8 --no-duplicates --sample 500
+"""
+import argparse
+import json
+import os
+import random as rnd
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from enumeration import MAX_ENUMERATION_CODES, code_space_size, code_table
+from jobs import choose_engine, next_move, warm_up
+from mastermind import NUM_COLORS, NUM_PINS, check_config
+
+MAX_ROUNDS = 20  # Danach gilt eine Partie als gescheitert (z.B. wiederholte inkonsistente Züge)
+
+
+def feedback(secret, guess) -> tuple:
+    """Rote Pins (richtige Farbe an richtiger Position) und weiße Pins (richtige Farbe, falsche Position)."""
+    red = sum(s == g for s, g in zip(secret, guess))
+    common = sum((Counter(secret) & Counter(guess)).values())
+    return red, common - red
+
+
+def play_game(secret: list, engine: str, strategy: str, colors: int = NUM_COLORS, duplicates: bool = True) -> dict:
+    """
+    Spielt eine Partie gegen secret, Zug für Zug über jobs.next_move wie der Endpunkt.
+
+    Rückgabe:
+    - {"rounds": Anzahl Züge oder None, wenn nicht gelöst, "latencies": Sekunden je Zug}
+    """
+    guesses, reds, whites, latencies = [], [], [], []
+    while len(guesses) < MAX_ROUNDS:
+        C = np.array([[[1 if c == color else 0 for c in range(colors)] for color in guess]
+                      for guess in guesses]) if guesses else np.empty(0)
+        start = time.perf_counter()
+        guess = next_move(C, reds, whites, engine, strategy, len(secret), colors, duplicates)
+        latencies.append(time.perf_counter() - start)
+        if guess is None:
+            break
+        guesses.append(guess)
+        red, white = feedback(secret, guess)
+        if red == len(secret):
+            return {"rounds": len(guesses), "latencies": latencies}
+        reds.append(red)
+        whites.append(white)
+    return {"rounds": None, "latencies": latencies}
+
+
+def play_games(secrets: list, engine: str, strategy: str, colors: int, duplicates: bool) -> list:
+    return [play_game(secret, engine, strategy, colors, duplicates) for secret in secrets]
+
+
+def _init_worker():
+    # HiGHS und der MIP-Pfad schreiben auf fd 1; die JSON-Ausgabe soll sauber bleiben
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    warm_up()
+
+
+def percentile(samples: list, q: float) -> float:
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+
+def secret_codes(pins: int, colors: int, duplicates: bool, sample: int | None, seed: int | None) -> list:
+    """
+    Alle Codes der Konfiguration oder sample zufällige davon. Coderäume, die sich nicht aufzählen
+    lassen (nur MIP), werden zufällig gezogen.
+    """
+    generator = rnd.Random(seed)
+    if code_space_size(pins, colors, duplicates) > MAX_ENUMERATION_CODES:
+        if not sample:
+            raise ValueError("The code space is too large to play every code, pass --sample")
+        if duplicates:
+            return [[generator.randrange(colors) for _ in range(pins)] for _ in range(sample)]
+        return [generator.sample(range(colors), pins) for _ in range(sample)]
+    codes = code_table(pins, colors, duplicates).codes.tolist()
+    return generator.sample(codes, sample) if sample and sample < len(codes) else codes
+
+
+def simulate(engine: str = "auto", strategy: str = "minimax", sample: int | None = None,
+             workers: int = 1, seed: int | None = None, chunk_size: int = 50, pins: int = NUM_PINS,
+             colors: int = NUM_COLORS, duplicates: bool = True) -> dict:
+    """
+    Spielt alle Codes (oder sample zufällige) als Geheimcode durch, verteilt auf workers Prozesse.
+
+    Rückgabe:
+    - Bericht mit Konfiguration, Verteilung der Züge je Partie, schlechtestem Fall,
+      Latenz-Perzentilen je Zug (ms) und Gesamtzeit
+    """
+    check_config(pins, colors, duplicates)
+    secrets = secret_codes(pins, colors, duplicates, sample, seed)
+    chunks = [secrets[i:i + chunk_size] for i in range(0, len(secrets), chunk_size)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        results = [game for chunk in executor.map(play_games, chunks, [engine] * len(chunks),
+                                                  [strategy] * len(chunks), [colors] * len(chunks),
+                                                  [duplicates] * len(chunks))
+                   for game in chunk]
+    wall = time.perf_counter() - start
+
+    rounds = [game["rounds"] for game in results if game["rounds"] is not None]
+    latencies = [latency * 1000 for game in results for latency in game["latencies"]]
+    return {
+        "pins": pins,
+        "colors": colors,
+        "duplicates": duplicates,
+        "engine": choose_engine(engine, pins, colors, duplicates),
+        "strategy": strategy,
+        "workers": workers,
+        "games": len(results),
+        "failed": len(results) - len(rounds),
+        "guesses": {
+            "distribution": {str(k): v for k, v in sorted(Counter(rounds).items())},
+            "mean": statistics.mean(rounds) if rounds else None,
+            "worst": max(rounds) if rounds else None,
+        },
+        "turn_latency_ms": {
+            "turns": len(latencies),
+            "mean": statistics.mean(latencies) if latencies else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies, default=0.0),
+        },
+        "wall_seconds": wall,
+    }
+
+
+def regressions(report: dict, baseline: dict, latency_tolerance: float = 0.25) -> list:
+    """
+    Vergleicht einen Bericht mit einem früheren: mehr gescheiterte Partien, mehr Züge im Mittel
+    oder im schlechtesten Fall, oder eine um mehr als latency_tolerance höhere p95-Latenz je Zug.
+
+    Rückgabe:
+    - Liste lesbarer Beschreibungen der Verschlechterungen (leer, wenn keine)
+    """
+    found = []
+    if report["failed"] > baseline["failed"]:
+        found.append(f"failed games {baseline['failed']} -> {report['failed']}")
+    for key in ("mean", "worst"):
+        old, new = baseline["guesses"][key], report["guesses"][key]
+        if old is not None and (new is None or new > old + 1e-9):
+            found.append(f"guesses {key} {old} -> {new}")
+    old, new = baseline["turn_latency_ms"]["p95"], report["turn_latency_ms"]["p95"]
+    if new > old * (1 + latency_tolerance):
+        found.append(f"turn latency p95 {old:.3f} ms -> {new:.3f} ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", default="auto", choices=["auto", "enumeration", "mip"])
+    parser.add_argument("--strategy", default="minimax", choices=["first", "minimax", "partitions", "expected"])
+    parser.add_argument("--pins", type=int, default=NUM_PINS)
+    parser.add_argument("--colors", type=int, default=NUM_COLORS)
+    parser.add_argument("--no-duplicates", dest="duplicates", action="store_false",
+                        help="Jede Farbe höchstens einmal im Code")
+    parser.add_argument("--sample", type=int, help="Nur so viele zufällige Geheimcodes statt aller")
+    parser.add_argument("--seed", type=int, help="Startwert für die Stichprobe")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", help="JSON-Datei (Standard: Standardausgabe)")
+    parser.add_argument("--baseline", help="Früherer Bericht; bei Verschlechterung Exit-Code 1")
+    args = parser.parse_args()
+
+    report = simulate(args.engine, args.strategy, args.sample, args.workers, args.seed,
+                      pins=args.pins, colors=args.colors, duplicates=args.duplicates)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f))
+        for regression in found:
+            print(f"Regression: {regression}", file=sys.stderr)
+        sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from enumeration import code_table
+
+# Strategie -> Bewertung der Aufteilung der Kandidaten nach Feedback (kleiner ist besser)
+STRATEGIES = ("first", "minimax", "partitions", "expected")
+MAX_SCORING_PAIRS = 2**22  # Mehr (Rateversuch, Kandidat)-Paare: nur Kandidaten als Rateversuche
+CHUNK_PAIRS = 2**20        # Paare je Schritt beim Bewerten
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.json")
+
+
+def _score(counts: np.ndarray, strategy: str) -> np.ndarray:
+    if strategy == "minimax":
+        return counts.max(axis=1)                # Knuth: größte verbleibende Kandidatenmenge
+    if strategy == "partitions":
+        return -(counts > 0).sum(axis=1)         # Möglichst viele unterscheidbare Rückmeldungen
+    return (counts.astype(np.int64) ** 2).sum(axis=1)  # Erwartete Restgröße (bis auf den Faktor 1/n)
+
+
+def score_guesses(table, guesses: np.ndarray, candidates: np.ndarray, strategy: str) -> np.ndarray:
+    """
+    Bewertet Rateversuche nach der Aufteilung der Kandidaten, die ihr Feedback erzeugt.
+
+    Für jeden Rateversuch wird das Feedback gegen alle Kandidaten bestimmt und per bincount
+    zu Klassengrößen gezählt, in Blöcken von höchstens CHUNK_PAIRS Paaren.
+
+    Parameter:
+    - table: Die CodeTable
+    - guesses, candidates: Indizes der Rateversuche und der verbleibenden Codes
+    - strategy: 'minimax', 'partitions' oder 'expected'
+
+    Rückgabe:
+    - int-Array mit einer Bewertung je Rateversuch (kleiner ist besser)
+    """
+    classes = (table.pins + 1) ** 2
+    step = max(1, CHUNK_PAIRS // len(candidates))
+    scores = np.empty(len(guesses), dtype=np.int64)
+    for start in range(0, len(guesses), step):
+        chunk = guesses[start:start + step]
+        feedback = table.feedback_matrix(chunk, candidates).astype(np.int64)
+        feedback += np.arange(len(chunk))[:, None] * classes
+        counts = np.bincount(feedback.ravel(), minlength=len(chunk) * classes).reshape(len(chunk), classes)
+        scores[start:start + step] = _score(counts, strategy)
+    return scores
+
+
+def opening_patterns(table) -> np.ndarray:
+    """
+    Vertreter der ersten Rateversuche bis auf Vertauschung von Farben und Positionen
+    (z.B. 0000, 0001, 0011, 0012, 0123 bei 4 Pins). Solange noch alle Codes möglich sind,
+    bewerten sich gleichwertige Codes gleich.
+    """
+    steps = np.diff(table.codes.astype(np.int16), axis=1)
+    return np.nonzero((table.codes[:, 0] == 0) & ((steps == 0) | (steps == 1)).all(axis=1))[0]
+
+
+def choose_guess(table, candidates: np.ndarray, strategy: str) -> int:
+    """
+    Wählt den nächsten Rateversuch (Index) für die verbleibenden Kandidaten.
+
+    Bewertet werden alle Codes, solange höchstens MAX_SCORING_PAIRS Paare anfallen, sonst nur
+    (gleichmäßig ausgedünnte) Kandidaten. Bei gleicher Bewertung gewinnt ein Kandidat (er kann
+    sofort treffen), dann der kleinste Index.
+    """
+    if strategy == "first" or len(candidates) <= 2:
+        return int(candidates[0])
+    if len(candidates) == table.size:
+        guesses = opening_patterns(table)
+    elif table.size * len(candidates) <= MAX_SCORING_PAIRS:
+        guesses = np.arange(table.size)
+    else:
+        guesses = candidates[::max(1, len(candidates) ** 2 // MAX_SCORING_PAIRS)]
+    scores = score_guesses(table, guesses, candidates, strategy)
+    is_candidate = np.isin(guesses, candidates)
+    return int(guesses[np.argmin(2 * scores + ~is_candidate)])
+
+
+@lru_cache(maxsize=None)
+def load_book(path: str = BOOK_PATH) -> dict:
+    """Lädt das Eröffnungsbuch (siehe opening_book.py); leer, wenn die Datei fehlt."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def book_key(pins: int, colors: int, strategy: str, duplicates: bool = True) -> str:
+    """z.B. "4x6:minimax", ohne Wiederholungen "4x6u:minimax"."""
+    return f"{pins}x{colors}{'' if duplicates else 'u'}:{strategy}"
+
+
+def book_guess(guesses, reds, whites, pins: int, colors: int, strategy: str, duplicates: bool = True) -> list | None:
+    """
+    Sucht den nächsten Zug im Eröffnungsbuch. Das Buch ist ein Baum aus
+    {"guess": Code, "replies": {"rot,weiß": Knoten}}; er trägt nur, solange die bisherigen
+    Züge denen des Buchs entsprechen.
+
+    Rückgabe:
+    - Der Code als Liste von Farbindizes oder None, wenn das Buch die Stellung nicht enthält
+    """
+    node = load_book().get(book_key(pins, colors, strategy, duplicates))
+    for guess, red, white in zip(guesses, reds, whites):
+        if node is None or list(guess) != node["guess"]:
+            return None
+        node = node["replies"].get(f"{red},{white}")
+    return None if node is None else node["guess"]
+
+
+def next_guess(guesses, reds, whites, pins: int, colors: int, strategy: str = "minimax",
+               duplicates: bool = True) -> list | None:
+    """
+    Berechnet den nächsten Zug per Aufzählung: aus dem Eröffnungsbuch, sonst nach der Strategie
+    unter allen Codes, die mit den bisherigen Rückmeldungen exakt übereinstimmen.
+
+    Parameter:
+    - guesses: Bisherige Rateversuche als Folgen von Farbindizes
+    - reds, whites: Rote und weiße Pins je Rateversuch
+    - pins, colors: Die Konfiguration
+    - strategy: 'first' (erster passender Code), 'minimax', 'partitions' oder 'expected'
+    - duplicates: Ob eine Farbe mehrfach im Code vorkommen darf
+
+    Rückgabe:
+    - Der Code als Liste von Farbindizes oder None, wenn kein Code zum Feedback passt
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    table = code_table(pins, colors, duplicates)
+    return pick_guess(table, table.consistent(guesses, reds, whites), guesses, reds, whites, strategy)
+
+
+def pick_guess(table, candidates: np.ndarray, guesses, reds, whites, strategy: str) -> list | None:
+    """Wie next_guess, wenn die zum Spielverlauf passenden Kandidaten schon bekannt sind."""
+    if len(candidates) == 0:
+        return None
+    guess = book_guess(guesses, reds, whites, table.pins, table.colors, strategy, table.duplicates)
+    if guess is not None:
+        return guess
+    return table.code(choose_guess(table, candidates, strategy))
@@ -0,0 +1,653 @@
+"""
+Benchmarks für den Sudoku-Service.
+
+Aufruf (im Verzeichnis backend/sudoku):
+    python benchmark.py solve --dimensions 3 4 --repeat 20
+    python benchmark.py generate --dimension 3 --difficulty hard --oracles backtracking mip
+    python benchmark.py generate --oracles mip --options default warm_start=1 threads=1,presolve=off
+    python benchmark.py grade --dimension 3 --difficulties easy normal hard --count 20
+    python benchmark.py large --dimensions 3 4 5 --repeat 5
+    python benchmark.py load --workers 1 2 4 --requests 200 --concurrency 16
+    python benchmark.py cache --dimensions 2 3 4 --repeat 20
+    python benchmark.py cache --dimensions 3 --engine mip
+    python benchmark.py killer --dimensions 3 4 --repeat 10
+    python benchmark.py killer-cache --dimensions 3 4 --layouts 5 --repeat 10 --engines auto cp
+    python benchmark.py killer-generate --dimension 3 --difficulty hard --modes cages-first givens-first
+    python benchmark.py engines --dimensions 2 3 4 --killer-dimensions 2 3 --count 10
+    PORTFOLIO_SIZE=3 python benchmark.py portfolio --dimension 4 --count 20 --engines auto mip portfolio
+    python benchmark.py startup --workers 1 2 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random as rnd
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cage_cache import CageCache
+from cage_cache import cache_stats as cage_cache_stats
+from canonical import FULL_SYMMETRY_MAX_DIMENSION, canonicalize
+from corpus import engine_corpus
+from grading import RATING_LEVELS, grade
+from jobs import JobPool, solve_sudoku
+from portfolio import PORTFOLIO, portfolio_members
+from solution_cache import SolutionCache, cache_stats
+from solver_options import ENGINES, SolverOptions, SolverTimeLimit
+from sudoku import KillerSudokuGenerator, KillerSudokuSolver, Sudoku, SudokuGenerator, SudokuSolver
+from wire import grid_from_rows
+
+
+def quiet(fn, *args, **kwargs):
+    """Führt fn aus und verwirft dabei die Konsolenausgabe von HiGHS (schreibt direkt auf fd 1)."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        os.dup2(saved, 1)
+        os.close(devnull)
+        os.close(saved)
+
+
+def random_puzzle(s: int, given_ratio: float = 0.4) -> list:
+    """Erzeugt ein lösbares Rätsel, indem Zellen aus einer vollständigen Lösung entfernt werden."""
+    complete = quiet(Sudoku, s)
+    quiet(complete.solve)
+    solution = complete.get_solution()
+    return [[value if rnd.random() < given_ratio else None for value in row] for row in solution]
+
+
+def random_cages(solution: list, s: int, max_size: int = 4):
+    """Zerlegt eine vollständige Lösung in zusammenhängende Käfige ohne doppelte Ziffern."""
+    n = s**2
+    cages = np.full((n, n), -1)
+    sums = []
+    for start in rnd.sample([(i, j) for i in range(n) for j in range(n)], n * n):
+        if cages[start] >= 0:
+            continue
+        cage, size = [start], rnd.randint(1, max_size)
+        digits = {solution[start[0]][start[1]]}
+        cages[start] = len(sums)
+        while len(cage) < size:
+            neighbors = [(i + di, j + dj) for i, j in cage for di, dj in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                         if 0 <= i + di < n and 0 <= j + dj < n and cages[i + di, j + dj] < 0
+                         and solution[i + di][j + dj] not in digits]
+            if not neighbors:
+                break
+            cell = rnd.choice(neighbors)
+            cages[cell] = len(sums)
+            digits.add(solution[cell[0]][cell[1]])
+            cage.append(cell)
+        sums.append(sum(digits))
+    return cages, sums
+
+
+def random_symmetry(grid: np.ndarray, s: int) -> np.ndarray:
+    """
+    Wendet eine zufällige Sudoku-Symmetrie an (Transposition, Bänder/Stapel, Zeilen/Spalten, Ziffern),
+    ab Dimension 4 nur die Symmetrien, die canonicalize normiert.
+    """
+    full = s <= FULL_SYMMETRY_MAX_DIMENSION
+    if full and rnd.random() < 0.5:
+        grid = grid.T
+    rows = [band * s + q for band in rnd.sample(range(s), s) for q in rnd.sample(range(s), s)]
+    columns = [stack * s + q for stack in rnd.sample(range(s), s) for q in rnd.sample(range(s), s)]
+    if not full:
+        columns = list(range(s**2))
+    mapping = np.array([0] + rnd.sample(range(1, s**2 + 1), s**2), dtype=np.uint8)
+    return mapping[grid[np.ix_(rows, columns)]]
+
+
+def summarize(name: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    print(f"{name:<28} n={len(samples):<4} mean={statistics.mean(samples)*1000:8.2f} ms  "
+          f"p50={statistics.median(samples)*1000:8.2f} ms  p95={p95*1000:8.2f} ms")
+
+
+def bench_solve(args):
+    for s in args.dimensions:
+        puzzles = [random_puzzle(s, args.given_ratio) for _ in range(args.repeat)]
+        build, solve = [], []
+        propagated = 0
+        for puzzle in puzzles:
+            start = time.perf_counter()
+            solver = SudokuSolver(s, puzzle)
+            built = time.perf_counter()
+            quiet(solver.solve_sudoku)
+            done = time.perf_counter()
+            propagated += solver.model is None
+            build.append(built - start)
+            solve.append(done - built)
+        summarize(f"{s**2}x{s**2} Modellaufbau", build)
+        summarize(f"{s**2}x{s**2} Lösen", solve)
+        summarize(f"{s**2}x{s**2} gesamt", [b + t for b, t in zip(build, solve)])
+        print(f"{s**2}x{s**2} ohne Solveraufruf gelöst: {propagated}/{len(puzzles)}")
+
+
+def parse_options(text: str) -> SolverOptions | None:
+    """'default' oder z.B. 'threads=1,time_limit=0.5,presolve=off,warm_start=1'."""
+    if text == "default":
+        return None
+    types = {"threads": int, "time_limit": float, "mip_gap": float, "presolve": str,
+             "warm_start": lambda value: value not in ("0", "false"), "engine": str}
+    return SolverOptions(**{key: types[key](value)
+                            for key, value in (item.split("=") for item in text.split(","))})
+
+
+def bench_generate(args):
+    for oracle in args.oracles:
+        for text in args.options:
+            options = parse_options(text)
+            durations, givens = [], []
+            for _ in range(args.count):
+                start = time.perf_counter()
+                generator = quiet(SudokuGenerator, args.dimension, options)
+                quiet(generator.remove_cell, args.difficulty, oracle=oracle, time_budget=args.time_budget)
+                durations.append(time.perf_counter() - start)
+                givens.append(sum(value is not None for row in generator.solution for value in row))
+            summarize(f"Generieren ({oracle}, {text})", durations)
+            print(f"{'':<28} {len(durations) / sum(durations):.2f} Rätsel/s, "
+                  f"Vorgaben im Mittel {statistics.mean(givens):.1f}")
+
+
+def bench_grade(args):
+    """Verteilung der Bewertungen je Schwierigkeitsgrad: nur Anteil entfernter Zellen gegen Zielbewertung."""
+    for difficulty in args.difficulties:
+        low, high = RATING_LEVELS[difficulty]
+        for mode in ("holes", "rating"):
+            durations, grading, levels, givens = [], [], [], []
+            for _ in range(args.count):
+                start = time.perf_counter()
+                generator = quiet(SudokuGenerator, args.dimension)
+                if mode == "holes":
+                    quiet(generator.remove_cell, difficulty)
+                else:
+                    quiet(generator.get_incomplete_and_complete_sudoku, difficulty)
+                durations.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                levels.append(grade(generator.solution, args.dimension)[0])
+                grading.append(time.perf_counter() - start)
+                givens.append(sum(value is not None for row in generator.solution for value in row))
+            summarize(f"{difficulty} ({mode})", durations)
+            summarize(f"{difficulty} ({mode}) Bewerten", grading)
+            hits = sum(low <= level <= high for level in levels)
+            print(f"{'':<28} Stufen {dict(sorted(Counter(levels).items()))}, im Bereich {low}-{high}: "
+                  f"{hits}/{len(levels)}, Vorgaben im Mittel {statistics.mean(givens):.1f}")
+
+
+def _measure_large(s: int, mode: str, repeat: int, given_ratio: float, difficulty: str):
+    """Läuft in einem frischen Prozess, damit ru_maxrss nur diese Dimension misst."""
+    rnd.seed(s)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    latencies, timeouts = [], 0
+    for _ in range(repeat):
+        puzzle = random_puzzle(s, given_ratio) if mode == "solve" else None
+        start = time.perf_counter()
+        try:
+            if mode == "solve":
+                quiet(SudokuSolver(s, puzzle).solve_sudoku)
+            else:
+                quiet(quiet(SudokuGenerator, s).get_incomplete_and_complete_sudoku, difficulty)
+        except SolverTimeLimit:
+            timeouts += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, timeouts, base, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def bench_large(args):
+    """Latenz und Spitzen-RSS (ru_maxrss, je Dimension ein eigener Prozess) für Lösen und Generieren."""
+    for s in args.dimensions:
+        for mode in args.modes:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                latencies, timeouts, base, peak = executor.submit(_measure_large, s, mode, args.repeat,
+                                                                  args.given_ratio, args.difficulty).result()
+            summarize(f"{s**2}x{s**2} {mode}", latencies)
+            print(f"{'':<28} Spitzen-RSS {peak / 1024:.1f} MiB (nach den Importen {base / 1024:.1f} MiB), "
+                  f"Zeitlimit erreicht: {timeouts}/{len(latencies)}")
+
+
+def bench_cache(args):
+    for s in args.dimensions:
+        grids = [grid_from_rows(random_puzzle(s, args.given_ratio), s) for _ in range(args.repeat)]
+        cache = SolutionCache(max_entries=len(grids))
+        options = SolverOptions(engine=args.engine)
+        canonical, uncached, miss, hit = [], [], [], []
+        for grid in grids:
+            start = time.perf_counter()
+            canonicalize(grid, s)
+            canonical.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            expected = quiet(lambda: SudokuSolver(s, grid, options=options).solve_grid())
+            uncached.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            quiet(lambda: SudokuSolver(s, grid, cache=cache, options=options).solve_grid())
+            miss.append(time.perf_counter() - start)
+
+            variant = random_symmetry(grid, s)
+            start = time.perf_counter()
+            solution = quiet(lambda: SudokuSolver(s, variant, cache=cache, options=options).solve_grid())
+            hit.append(time.perf_counter() - start)
+            assert (solution[variant > 0] == variant[variant > 0]).all()
+            assert expected is not None
+        summarize(f"{s**2}x{s**2} Normalform", canonical)
+        summarize(f"{s**2}x{s**2} Lösen ohne Cache", uncached)
+        summarize(f"{s**2}x{s**2} Lösen, Fehlgriff", miss)
+        summarize(f"{s**2}x{s**2} Lösen, symmetr. Treffer", hit)
+        stats = cache_stats(cache.counters)
+        print(f"{s**2}x{s**2} Trefferquote {stats['hit_rate']:.2f}, übersprungen {stats['skipped']}, "
+              f"{stats['entries']} Einträge, {stats['memory_bytes']} Bytes")
+
+
+def bench_killer(args):
+    for s in args.dimensions:
+        build, solve = [], []
+        for _ in range(args.repeat):
+            complete = quiet(Sudoku, s)
+            quiet(complete.solve)
+            solution = complete.get_solution()
+            cages, sums = random_cages(solution, s, args.max_cage_size)
+            puzzle = [[value if rnd.random() < args.given_ratio else None for value in row] for row in solution]
+            start = time.perf_counter()
+            solver = quiet(KillerSudokuSolver, s, puzzle, cages, sums)
+            built = time.perf_counter()
+            result = quiet(solver.solve_grid)
+            done = time.perf_counter()
+            assert result is not None
+            build.append(built - start)
+            solve.append(done - built)
+        summarize(f"{s**2}x{s**2} Killer Modellaufbau", build)
+        summarize(f"{s**2}x{s**2} Killer Lösen", solve)
+
+
+def bench_killer_cache(args):
+    """
+    Wiederholtes Lösen desselben Käfiglayouts mit wachsenden Vorgaben, wie beim Spielen im
+    Frontend: ohne Cache und mit CageCache (nur die Treffer nach dem ersten Lösen je Layout).
+    """
+    for s in args.dimensions:
+        layouts = []
+        for _ in range(args.layouts):
+            complete = quiet(Sudoku, s)
+            quiet(complete.solve)
+            solution = complete.get_solution()
+            cages, sums = random_cages(solution, s, args.max_cage_size)
+            # Der Spieler trägt nach und nach Ziffern der Lösung ein
+            order = rnd.sample(range(s**4), s**4)
+            puzzles = []
+            for step in range(args.repeat):
+                filled = set(order[:int(step / args.repeat * args.max_filled * s**4)])
+                puzzles.append([[value if i * s**2 + j in filled else None for j, value in enumerate(row)]
+                                for i, row in enumerate(solution)])
+            layouts.append((cages, sums, puzzles))
+        for engine in args.engines:
+            options = SolverOptions(engine=engine)
+            cache = CageCache()
+            uncached, cached = [], []
+            for cages, sums, puzzles in layouts:
+                quiet(lambda: KillerSudokuSolver(s, puzzles[0], cages, sums, options, cage_cache=cache).solve_grid())
+                for puzzle in puzzles:
+                    start = time.perf_counter()
+                    expected = quiet(lambda: KillerSudokuSolver(s, puzzle, cages, sums, options).solve_grid())
+                    uncached.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    result = quiet(lambda: KillerSudokuSolver(s, puzzle, cages, sums, options, cage_cache=cache).solve_grid())
+                    cached.append(time.perf_counter() - start)
+                    assert (result == expected).all()
+            summarize(f"{s**2}x{s**2} {engine} ohne Cache", uncached)
+            summarize(f"{s**2}x{s**2} {engine} Käfigcache", cached)
+            stats = cage_cache_stats(cache.counters)
+            print(f"{s**2}x{s**2} {engine} Trefferquote {stats['hit_rate']:.2f}, {stats['entries']} Einträge, "
+                  f"{stats['memory_bytes'] / 1024:.0f} KiB")
+
+
+def bench_engines(args):
+    rnd.seed(args.seed)
+    corpus = engine_corpus(args.dimensions, args.killer_dimensions, args.count)
+    mismatches = 0
+    for engine in args.engines:
+        options = SolverOptions(engine=engine)
+        latencies = {}
+        for name, s, puzzle, cage_data, expected in corpus:
+            start = time.perf_counter()
+            if cage_data is None:
+                solver = SudokuSolver(s, puzzle, options=options)
+            else:
+                solver = KillerSudokuSolver(s, puzzle, *cage_data, options)
+            result = quiet(solver.solve_sudoku)
+            latencies.setdefault(name, []).append(time.perf_counter() - start)
+            if result != expected:
+                mismatches += 1
+                print(f"Abweichung: {engine}, {name}")
+        for name, samples in latencies.items():
+            summarize(f"{engine} {name}", samples)
+    print(f"{len(corpus)} Rätsel, {mismatches} Abweichungen")
+    if mismatches:
+        sys.exit(1)
+
+
+def valid_killer(grid: np.ndarray, puzzle: list, cages: np.ndarray, sums: list, s: int) -> bool:
+    """Hält die Lösung Vorgaben, Einheiten und Käfigsummen ein (auch bei mehrdeutigen Rätseln)?"""
+    n = s**2
+    blocks = grid.reshape(s, s, s, s).swapaxes(1, 2).reshape(n, n)
+    digits = set(range(1, n + 1))
+    if any(set(unit) != digits for unit in (*grid, *grid.T, *blocks)):
+        return False
+    if any(value is not None and grid[i, j] != value for i, row in enumerate(puzzle) for j, value in enumerate(row)):
+        return False
+    cage_sums = np.bincount(cages.ravel(), weights=grid.ravel(), minlength=len(sums))
+    return bool((cage_sums == np.asarray(sums)).all())
+
+
+def bench_portfolio(args):
+    """
+    Latenz auf schweren Killer-Sudokus (zufällige große Käfige, kaum Vorgaben): eine Konfiguration
+    gegen das Portfolio. Die Rätsel sind nicht nach Schwierigkeit ausgewählt, die schweren liegen
+    im Ende der Verteilung; ein erreichtes Zeitlimit zählt mit time_limit.
+    """
+    rnd.seed(args.seed)
+    s = args.dimension
+    corpus = []
+    for _ in range(args.count):
+        complete = quiet(Sudoku, s)
+        quiet(complete.solve)
+        solution = complete.get_solution()
+        cages, sums = random_cages(solution, s, args.max_cage_size)
+        puzzle = [[value if rnd.random() < args.given_ratio else None for value in row] for row in solution]
+        corpus.append((puzzle, cages, sums))
+    invalid = 0
+    for engine in args.engines:
+        options = SolverOptions(engine=engine, time_limit=args.time_limit)
+        latencies, limits = [], 0
+        for puzzle, cages, sums in corpus:
+            start = time.perf_counter()
+            try:
+                result = quiet(lambda: KillerSudokuSolver(s, puzzle, cages, sums, options).solve_grid())
+            except SolverTimeLimit:
+                limits += 1
+                result = None
+            latencies.append(time.perf_counter() - start)
+            if result is not None and not valid_killer(result, puzzle, cages, sums, s):
+                invalid += 1
+                print(f"Ungültige Lösung: {engine}")
+        summarize(f"{s**2}x{s**2} Killer {engine}", latencies)
+        print(f"{'':<28} max={max(latencies)*1000:8.2f} ms  Zeitlimit erreicht: {limits}/{len(latencies)}")
+    if args.members:
+        # Jeder Versuch einzeln im selben Prozess; das Minimum je Rätsel ist die Latenz eines
+        # Portfolios mit einem Kern je Versuch (ohne die Kosten für fork, einige ms)
+        options = SolverOptions(engine="portfolio", time_limit=args.time_limit)
+        primary = quiet(KillerSudokuSolver, s, *corpus[0], options).auto_engine(s)
+        members = portfolio_members(primary, options, size=len(PORTFOLIO))
+        best = [args.time_limit] * len(corpus)
+        for name, engine, parameters in members:
+            latencies, limits = [], 0
+            for index, (puzzle, cages, sums) in enumerate(corpus):
+                start = time.perf_counter()
+                try:
+                    solver = KillerSudokuSolver(s, puzzle, cages, sums, options)
+                    result = quiet(solver.solve_with, engine, parameters)
+                except SolverTimeLimit:
+                    limits += 1
+                    result = None
+                latencies.append(time.perf_counter() - start)
+                if result is not None:
+                    best[index] = min(best[index], latencies[-1])
+                    if not valid_killer(result, puzzle, cages, sums, s):
+                        invalid += 1
+                        print(f"Ungültige Lösung: {name}")
+            summarize(f"{s**2}x{s**2} Killer {name}", latencies)
+            print(f"{'':<28} Zeitlimit erreicht: {limits}/{len(latencies)}")
+        summarize(f"{s**2}x{s**2} Killer bester Versuch", best)
+        print(f"{'':<28} max={max(best)*1000:8.2f} ms  ohne Lösung: {best.count(args.time_limit)}/{len(best)}")
+    if invalid:
+        sys.exit(1)
+
+
+def _request(url: str, body=None, timeout: float = 60.0) -> int:
+    """HTTP-Anfrage (POST mit JSON, wenn body gesetzt ist); Rückgabe: Statuscode."""
+    data = None if body is None else json.dumps(body).encode()
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def _wait_for(url: str, server: subprocess.Popen, timeout: float = 120.0) -> int:
+    """Fragt url ab, bis der Server mit einem Status unter 500 antwortet (503 heißt: noch nicht bereit)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            status = _request(url, timeout=5.0)
+            if status < 500:
+                return status
+        except OSError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def bench_startup(args):
+    """
+    Kaltstart des Servers (uvicorn im Unterprozess): Zeit bis der Port antwortet (/health/live),
+    bis /health/ready und bis zur ersten Antwort je Anfrageart, dazu die Latenz der ersten und der
+    zweiten Anfrage derselben Art (mit anderem Rätsel, damit der Lösungscache nicht trifft).
+    """
+    rnd.seed(args.seed)
+    requests = []
+    for s in args.dimensions:
+        puzzles = [random_puzzle(s, 0.4) for _ in range(2)]
+        requests.append((f"{s**2}x{s**2} lösen", "/sudoku/solve", [{"dimension": s, "sudoku": p} for p in puzzles]))
+        killers = []
+        for _ in range(2):
+            complete = quiet(Sudoku, s)
+            quiet(complete.solve)
+            solution = complete.get_solution()
+            cages, sums = random_cages(solution, s)
+            killers.append({"dimension": s, "sudoku": [[None] * s**2 for _ in range(s**2)],
+                            "cages": cages.tolist(), "cageSums": sums})
+        requests.append((f"{s**2}x{s**2} Killer lösen", "/killer-sudoku/solve", killers))
+        requests.append((f"{s**2}x{s**2} generieren", f"/sudoku/{s}?difficulty=normal", [None, None]))
+
+    for workers in args.workers:
+        env = {**os.environ, "JOB_WORKERS": str(workers), "PUZZLE_POOL_ENABLED": "1" if args.puzzle_pool else "0"}
+        timings = {}
+        for _ in range(args.repeat):
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                port = sock.getsockname()[1]
+            url = f"http://127.0.0.1:{port}"
+            start = time.perf_counter()
+            server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+                                      env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                _wait_for(url + "/health/live", server)
+                timings.setdefault("Port offen (live)", []).append(time.perf_counter() - start)
+                _wait_for(url + "/health/ready", server)
+                timings.setdefault("bereit (ready)", []).append(time.perf_counter() - start)
+                for name, path, bodies in requests:
+                    for index, body in enumerate(bodies):
+                        sent = time.perf_counter()
+                        status = _request(url + path, body)
+                        if status != 200:
+                            raise RuntimeError(f"{name}: HTTP {status}")
+                        label = "erste" if index == 0 else "zweite"
+                        timings.setdefault(f"{name}, {label}", []).append(time.perf_counter() - sent)
+                timings.setdefault("bis alle beantwortet", []).append(time.perf_counter() - start)
+            finally:
+                server.terminate()
+                server.wait()
+        print(f"{workers} Worker:")
+        for name, samples in timings.items():
+            summarize(f"  {name}", samples)
+
+
+def bench_killer_generate(args):
+    for mode in args.modes:
+        durations, givens = [], []
+        for _ in range(args.count):
+            start = time.perf_counter()
+            generator = quiet(KillerSudokuGenerator, args.dimension)
+            puzzle, _, _ = quiet(generator.get_killer_sudoku, args.difficulty, mode=mode)
+            durations.append(time.perf_counter() - start)
+            givens.append(sum(value is not None for row in puzzle for value in row))
+        summarize(f"Killer generieren ({mode})", durations)
+        print(f"{'':<28} Vorgaben im Mittel {statistics.mean(givens):.1f} von {args.dimension**4}")
+
+
+async def _drive(job_pool: JobPool, s: int, puzzles: list, concurrency: int) -> list:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(puzzle):
+        async with limit:
+            start = time.perf_counter()
+            await job_pool.run(solve_sudoku, s, puzzle)
+            return time.perf_counter() - start
+
+    return await asyncio.gather(*(one(puzzle) for puzzle in puzzles))
+
+
+def bench_load(args):
+    puzzles = [random_puzzle(args.dimension, args.given_ratio) for _ in range(args.requests)]
+    for workers in args.workers:
+        job_pool = JobPool(workers=workers, max_pending=args.concurrency, timeout=300)
+        quiet(job_pool.start)
+        try:
+            start = time.perf_counter()
+            # Die Worker schreiben auf dasselbe fd 1, daher während des gesamten Laufs umleiten
+            latencies = quiet(asyncio.run, _drive(job_pool, args.dimension, puzzles, args.concurrency))
+            elapsed = time.perf_counter() - start
+        finally:
+            job_pool.stop()
+        summarize(f"{workers} Worker Latenz", latencies)
+        print(f"{'':<28} {len(puzzles) / elapsed:.1f} Anfragen/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    solve = sub.add_parser("solve", help="Latenz wiederholter Lösungen")
+    solve.add_argument("--dimensions", type=int, nargs="+", default=[3, 4])
+    solve.add_argument("--repeat", type=int, default=20)
+    solve.add_argument("--given-ratio", type=float, default=0.4, help="Anteil vorgegebener Zellen")
+    solve.set_defaults(func=bench_solve)
+
+    generate = sub.add_parser("generate", help="Rätsel pro Sekunde je Eindeutigkeitsprüfung")
+    generate.add_argument("--dimension", type=int, default=3)
+    generate.add_argument("--difficulty", default="hard", choices=["easy", "normal", "hard"])
+    generate.add_argument("--count", type=int, default=5)
+    generate.add_argument("--oracles", nargs="+", default=["backtracking", "mip"],
+                          choices=sorted(SudokuGenerator.uniqueness_oracles))
+    generate.add_argument("--options", nargs="+", default=["default"],
+                          help="Solver-Einstellungen je Lauf, z.B. default warm_start=1 threads=1,presolve=off")
+    generate.add_argument("--time-budget", type=float, help="Sekunden je Rätsel (Standard: SudokuGenerator.time_budget)")
+    generate.set_defaults(func=bench_generate)
+
+    grade_parser = sub.add_parser("grade", help="Bewertungen je Schwierigkeitsgrad, mit und ohne Zielbewertung")
+    grade_parser.add_argument("--dimension", type=int, default=3)
+    grade_parser.add_argument("--difficulties", nargs="+", default=["easy", "normal", "hard"], choices=list(RATING_LEVELS))
+    grade_parser.add_argument("--count", type=int, default=10)
+    grade_parser.set_defaults(func=bench_grade)
+
+    large = sub.add_parser("large", help="Latenz und Spitzen-RSS je Dimension für Lösen und Generieren")
+    large.add_argument("--dimensions", type=int, nargs="+", default=[3, 4, 5])
+    large.add_argument("--modes", nargs="+", default=["solve", "generate"], choices=["solve", "generate"])
+    large.add_argument("--repeat", type=int, default=5)
+    large.add_argument("--given-ratio", type=float, default=0.3, help="Anteil vorgegebener Zellen beim Lösen")
+    large.add_argument("--difficulty", default="normal", choices=["easy", "normal", "hard"])
+    large.set_defaults(func=bench_large)
+
+    load = sub.add_parser("load", help="Durchsatz des Prozesspools je Anzahl Worker")
+    load.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    load.add_argument("--dimension", type=int, default=3)
+    load.add_argument("--requests", type=int, default=200)
+    load.add_argument("--concurrency", type=int, default=16, help="Gleichzeitig offene Anfragen")
+    load.add_argument("--given-ratio", type=float, default=0.3, help="Anteil vorgegebener Zellen")
+    load.set_defaults(func=bench_load)
+
+    cache = sub.add_parser("cache", help="Kosten der Normalform und Lösungscache mit symmetrischen Kopien")
+    cache.add_argument("--dimensions", type=int, nargs="+", default=[2, 3, 4])
+    cache.add_argument("--repeat", type=int, default=20)
+    cache.add_argument("--engine", default="auto", choices=ENGINES,
+                       help="Engine beim Lösen; mit cp wird der Cache erst ab 16x16 befragt")
+    cache.add_argument("--given-ratio", type=float, default=0.3, help="Anteil vorgegebener Zellen")
+    cache.set_defaults(func=bench_cache)
+
+    killer = sub.add_parser("killer", help="Modellaufbau und Lösen von Killer-Sudokus mit zufälligen Käfigen")
+    killer.add_argument("--dimensions", type=int, nargs="+", default=[3, 4])
+    killer.add_argument("--repeat", type=int, default=10)
+    killer.add_argument("--given-ratio", type=float, default=0.0, help="Anteil vorgegebener Zellen")
+    killer.add_argument("--max-cage-size", type=int, default=4)
+    killer.set_defaults(func=bench_killer)
+
+    killer_cache = sub.add_parser("killer-cache", help="Killer-Sudokus mit demselben Käfiglayout, mit und ohne CageCache")
+    killer_cache.add_argument("--dimensions", type=int, nargs="+", default=[3, 4])
+    killer_cache.add_argument("--layouts", type=int, default=5)
+    killer_cache.add_argument("--repeat", type=int, default=10, help="Anfragen je Layout")
+    killer_cache.add_argument("--max-filled", type=float, default=0.5, help="Anteil eingetragener Zellen in der letzten Anfrage")
+    killer_cache.add_argument("--max-cage-size", type=int, default=4)
+    killer_cache.add_argument("--engines", nargs="+", default=["auto"], choices=list(ENGINES))
+    killer_cache.set_defaults(func=bench_killer_cache)
+
+    killer_generate = sub.add_parser("killer-generate", help="Dauer und verbleibende Vorgaben je Generierungsmodus")
+    killer_generate.add_argument("--dimension", type=int, default=3)
+    killer_generate.add_argument("--difficulty", default="hard", choices=["easy", "normal", "hard"])
+    killer_generate.add_argument("--count", type=int, default=5)
+    killer_generate.add_argument("--modes", nargs="+", default=["cages-first", "givens-first"],
+                                 choices=["cages-first", "givens-first"])
+    killer_generate.set_defaults(func=bench_killer_generate)
+
+    engines = sub.add_parser("engines", help="Gleiche Ergebnisse und Latenz der Engines auf einem gemeinsamen Korpus")
+    engines.add_argument("--dimensions", type=int, nargs="+", default=[2, 3, 4])
+    engines.add_argument("--killer-dimensions", type=int, nargs="+", default=[2, 3])
+    engines.add_argument("--count", type=int, default=10, help="Generierte Rätsel je Dimension und Art")
+    engines.add_argument("--engines", nargs="+", default=["mip", "cp", "auto"], choices=list(ENGINES))
+    engines.add_argument("--seed", type=int, default=0)
+    engines.set_defaults(func=bench_engines)
+
+    portfolio = sub.add_parser("portfolio", help="Tail-Latenz schwerer Killer-Sudokus: eine Konfiguration gegen das Portfolio")
+    portfolio.add_argument("--dimension", type=int, default=4)
+    portfolio.add_argument("--count", type=int, default=20)
+    portfolio.add_argument("--max-cage-size", type=int, default=5)
+    portfolio.add_argument("--given-ratio", type=float, default=0.05, help="Anteil vorgegebener Zellen")
+    portfolio.add_argument("--time-limit", type=float, default=10.0, help="Sekunden je Rätsel")
+    portfolio.add_argument("--engines", nargs="+", default=["auto", "portfolio"], choices=list(ENGINES))
+    portfolio.add_argument("--seed", type=int, default=1)
+    portfolio.add_argument("--members", action="store_true",
+                           help="Zusätzlich jeden Versuch einzeln messen (Portfolio mit einem Kern je Versuch)")
+    portfolio.set_defaults(func=bench_portfolio)
+
+    startup = sub.add_parser("startup", help="Kaltstart: Zeit bis live, bis ready und bis zur ersten Antwort")
+    startup.add_argument("--workers", type=int, nargs="+", default=[1, 2], help="JOB_WORKERS je Messreihe")
+    startup.add_argument("--dimensions", type=int, nargs="+", default=[3])
+    startup.add_argument("--repeat", type=int, default=5)
+    startup.add_argument("--seed", type=int, default=1)
+    startup.add_argument("--puzzle-pool", action="store_true", help="Rätselvorrat beim Start füllen (Standard: aus)")
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import hashlib
+import multiprocessing
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from cages import CageIndex
+
+HITS, MISSES, EVICTIONS, ENTRIES, MEMORY = range(5)
+
+
+def shared_counters():
+    """Zähler, die sich alle Worker-Prozesse eines Pools teilen (Treffer, Fehlgriffe, Speicher)."""
+    return multiprocessing.Array("q", 5)
+
+
+def layout_key(cages, sums, s: int) -> bytes:
+    """Hash über Dimension, Käfiggitter und Summen; gleiche Layouts mit anderen Vorgaben ergeben denselben Schlüssel."""
+    cages = np.ascontiguousarray(cages, dtype=np.int64)
+    sums = np.ascontiguousarray(sums, dtype=np.int64)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.array([s, *cages.shape, len(sums)], dtype=np.int64).tobytes())
+    digest.update(cages.tobytes())
+    digest.update(sums.tobytes())
+    return digest.digest()
+
+
+class CageCache:
+    """
+    Cache für die Auswertung von Killer-Käfiglayouts (CageIndex) über Anfragen hinweg,
+    geschlüsselt über einen Hash von Käfiggitter und Summen (siehe layout_key). Das Frontend
+    schickt während eines Spiels dasselbe Layout mit wechselnden Vorgaben; bei einem Treffer
+    entfallen Aufbau des Index, Einheitenprüfung, Kandidatenmasken, die Anordnung der
+    Käfigbedingungen im Modell und (für die Engine "cp") die Struktur der Suche.
+
+    Die Einträge liegen in einem LRU-Speicher mit höchstens max_entries Einträgen und höchstens
+    max_bytes Bytes (CageIndex.nbytes); die ältesten Einträge werden zuerst verdrängt.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 2**20, counters=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.counters = counters if counters is not None else shared_counters()
+        self._entries = OrderedDict()  # Schlüssel -> (CageIndex, gezählte Bytes, mit Struktur für "cp" gezählt)
+        self._memory = 0
+        self._lock = threading.Lock()
+
+    def _count(self, index: int, delta: int = 1):
+        with self.counters.get_lock():
+            self.counters[index] += delta
+
+    def get(self, cages, sums, s: int) -> "CageIndex":
+        """
+        Liefert den CageIndex des Layouts aus dem Cache oder baut ihn auf und speichert ihn.
+        Ungültige Layouts lösen wie CageIndex ValueError aus und werden nicht gespeichert.
+
+        Parameter:
+        - cages: Gitter der Form (s^2, s^2) mit dem Käfigindex jeder Zelle
+        - sums: Summe je Käfig
+        - s: Die Dimension des Sudokus
+        """
+        key = layout_key(cages, sums, s)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            self._count(HITS)
+            index, _, structured = entry
+            if not structured and index.search_structure is not None:
+                # Die Struktur für "cp" entsteht erst bei der ersten Suche; ihren Speicher nachtragen
+                self._resize(key, index)
+            return index
+
+        from cages import CageIndex
+
+        self._count(MISSES)
+        index = CageIndex(cages, sums, s)
+        self._remember(key, index)
+        return index
+
+    def _remember(self, key: bytes, index: "CageIndex"):
+        size = index.nbytes()
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (index, size, index.search_structure is not None)
+            self._memory += size
+            memory_evicted, evicted = self._evict()
+        self._count(ENTRIES, 1 - evicted)
+        self._count(MEMORY, size - memory_evicted)
+        self._count(EVICTIONS, evicted)
+
+    def _resize(self, key: bytes, index: "CageIndex"):
+        size = index.nbytes()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2]:
+                return
+            self._entries[key] = (index, size, True)
+            self._memory += size - entry[1]
+            memory_evicted, evicted = self._evict()
+        self._count(MEMORY, size - entry[1] - memory_evicted)
+        self._count(ENTRIES, -evicted)
+        self._count(EVICTIONS, evicted)
+
+    def _evict(self):
+        """Verdrängt die ältesten Einträge bis zu den Grenzen (mit gehaltenem Lock); Rückgabe: (Bytes, Anzahl)."""
+        memory, evicted = 0, 0
+        while len(self._entries) > self.max_entries or (self._memory > self.max_bytes and len(self._entries) > 1):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._memory -= size
+            memory += size
+            evicted += 1
+        return memory, evicted
+
+
+def cache_stats(counters) -> dict:
+    """Trefferquote, Verdrängungen und Speicherbedarf aus den (geteilten) Zählern."""
+    with counters.get_lock():
+        hits, misses, evictions, entries, memory = counters[:]
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "evictions": evictions,
+        "entries": entries,
+        "memory_bytes": memory,
+    }
@@ -0,0 +1,262 @@
+import itertools
+import math
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pyoptinterface as poi
+
+from highs_bulk import add_sum_constraints
+from propagation import propagate
+
+MAX_COMBINATIONS = 50000  # Größere Kombinationstabellen werden nicht aufgebaut (kein Beschneiden)
+
+
+@lru_cache(maxsize=None)
+def digit_combinations(n: int, size: int):
+    """
+    Kombinationstabelle für Käfige mit size offenen Zellen: alle Mengen von size verschiedenen
+    Ziffern aus 1..n mit ihrer Summe. Die Zeilen mit Summe t sind die Ziffernmengen, mit denen
+    der Käfig die Restsumme t erreicht (z.B. n=9, size=2, t=3: nur {1, 2}).
+
+    Rückgabe:
+    - (Masken, Summen): float32-Array der Form (Anzahl, n) mit 1 für enthaltene Ziffern und
+      die Summe jeder Menge, oder None, wenn es mehr als MAX_COMBINATIONS Mengen wären
+    """
+    if math.comb(n, size) > MAX_COMBINATIONS:
+        return None
+    masks = np.zeros((math.comb(n, size), n), dtype=np.float32)
+    for row, combination in enumerate(itertools.combinations(range(n), size)):
+        masks[row, list(combination)] = 1
+    sums = masks @ np.arange(1, n + 1, dtype=np.float32)
+    masks.setflags(write=False)
+    sums.setflags(write=False)
+    return masks, sums
+
+
+class CageIndex:
+    """
+    Invertiertes Käfiggitter: die Zellen jedes Käfigs und der Käfig jeder Zelle, einmal je
+    Käfiglayout aufgebaut. Modellaufbau und Beschneiden arbeiten damit auf allen Käfigen zugleich
+    statt das Gitter je Käfig zu durchsuchen.
+
+    Alles hier hängt nur von Käfigen und Summen ab, nicht von den Vorgaben; ein CageIndex wird
+    nach dem Aufbau nicht mehr verändert und kann über cage_cache.CageCache von mehreren Rätseln
+    mit demselben Layout geteilt werden.
+    """
+
+    def __init__(self, cages, sums: list, s: int):
+        """
+        Parameter:
+        - cages: Gitter der Form (s^2, s^2) mit dem Käfigindex jeder Zelle
+        - sums: Summe je Käfig
+        - s: Die Dimension des Sudokus
+        """
+        n = s**2
+        count = len(sums)
+        self.dimension = s
+        self.sums = np.asarray(sums, dtype=np.int64)
+        cages = np.asarray(cages, dtype=np.int64)
+        if cages.shape != (n, n):
+            raise ValueError(f"Expected a {n}x{n} cage grid")
+        self.cell_cage = cages.ravel()
+        if self.cell_cage.min() < 0 or self.cell_cage.max() >= count:
+            raise ValueError(f"Cage indices must be between 0 and {count - 1}")
+
+        order = np.argsort(self.cell_cage, kind="stable")
+        self.sizes = np.bincount(self.cell_cage, minlength=count)
+        self.cells = np.split(order, np.cumsum(self.sizes)[:-1])
+        # Zugehörigkeitsmatrix (Käfig, Zelle) für Summen über alle Käfige per Matrixprodukt
+        self.membership = np.zeros((count, n * n), dtype=np.float32)
+        self.membership[self.cell_cage, np.arange(n * n)] = 1
+        self.unit_cages = self._unit_cages()
+        self.candidate_masks = self._candidate_masks()
+        self._constraint_layout(order)
+        self.search_structure = None  # (Käfige, Nachbarn) für die Engine "cp", siehe search.cage_structure
+        for array in (self.sums, self.cell_cage, self.sizes, self.membership, self.unit_cages,
+                      self.candidate_masks, *self.cells, *self._layout_arrays()):
+            array.setflags(write=False)
+
+    def _unit_cages(self) -> np.ndarray:
+        """Je Käfig, ob alle Zellen in einer Zeile, einer Spalte oder einem Block liegen."""
+        s = self.dimension
+        rows, columns = np.divmod(np.arange(s**4), s**2)
+        in_unit = np.zeros(len(self.sums), dtype=bool)
+        for values in (rows, columns, rows // s * s + columns // s):
+            # Erster Wert je Käfig (rückwärts zugewiesen, damit die erste Zelle gewinnt)
+            first = np.zeros(len(self.sums), dtype=np.int64)
+            first[self.cell_cage[::-1]] = values[::-1]
+            mismatches = np.bincount(self.cell_cage, weights=values != first[self.cell_cage], minlength=len(self.sums))
+            in_unit |= mismatches == 0
+        return in_unit
+
+    def _constraint_layout(self, order: np.ndarray):
+        """
+        Die Käfigbedingungen als Positionen (Zelle * s^2 + Ziffer) im Variablengitter, nach
+        Bedingung sortiert; add_constraints bildet sie je Modell nur noch über var_index ab.
+
+        - sum_positions, sum_coefficients, sum_rows: je Käfig alle (Zelle, Ziffer)-Paare mit der
+          Ziffer als Koeffizient und dem Käfig als Bedingung
+        - digit_positions, digit_rows: je Käfig außerhalb einer Einheit und Ziffer die Zellen
+          des Käfigs, Bedingung Käfig * s^2 + Ziffer
+        """
+        n = self.dimension**2
+        digits = np.arange(n)
+        positions = order[:, None] * n + digits
+        self.sum_positions = positions.ravel().astype(np.int32)
+        self.sum_coefficients = np.tile(digits + 1.0, len(order))
+        self.sum_rows = np.repeat(self.cell_cage[order], n).astype(np.int32)
+
+        cages = self.cell_cage[order]
+        spread = ~self.unit_cages[cages] & (self.sizes[cages] > 1)
+        rows = (cages[spread, None] * n + digits).ravel()
+        by_row = np.argsort(rows, kind="stable")
+        self.digit_positions = positions[spread].ravel()[by_row].astype(np.int32)
+        self.digit_rows = rows[by_row].astype(np.int32)
+
+    def _layout_arrays(self) -> tuple:
+        return (self.sum_positions, self.sum_coefficients, self.sum_rows, self.digit_positions, self.digit_rows)
+
+    def _candidate_masks(self) -> np.ndarray:
+        """
+        Die Ziffern, die jede Zelle allein wegen Größe und Summe ihres Käfigs tragen kann: die
+        Vereinigung aller passenden Ziffernmengen (alle Ziffern, wenn die Tabelle zu groß ist).
+
+        Rückgabe:
+        - Bool-Array der Form (s^4, s^2)
+        """
+        n = self.dimension**2
+        allowed = np.ones((len(self.sums), n), dtype=bool)
+        for size in np.unique(self.sizes):
+            combinations = digit_combinations(n, int(size)) if size > 0 else None
+            if combinations is None:
+                continue
+            masks, sums = combinations
+            group = self.sizes == size
+            allowed[group] = (sums[None, :] == self.sums[group, None]).astype(np.float32) @ masks > 0
+        return allowed[self.cell_cage]
+
+    def in_unit(self, cage: int) -> bool:
+        """Liegen alle Zellen des Käfigs in einer Zeile, Spalte oder einem Block?"""
+        return bool(self.unit_cages[cage])
+
+    def nbytes(self) -> int:
+        """Ungefährer Speicherbedarf in Bytes (Arrays und, sobald aufgebaut, die Struktur für "cp")."""
+        arrays = (self.sums, self.cell_cage, self.sizes, self.membership, self.unit_cages, self.candidate_masks,
+                  *self._layout_arrays())
+        total = sum(array.nbytes for array in arrays) + sum(cells.nbytes + 112 for cells in self.cells)
+        if self.search_structure is not None:
+            structure, peers = self.search_structure
+            total += sum(sys.getsizeof(entry) + sys.getsizeof(entry[0]) for entry in structure)
+            total += sys.getsizeof(peers) + sum(sys.getsizeof(cell_peers) for cell_peers in peers)
+        return total
+
+    def add_constraints(self, model, var_index: np.ndarray, fixed: np.ndarray | None = None, registered: bool = True):
+        """
+        Fügt die Käfigbedingungen in zwei Sammelaufrufen zum Modell hinzu: Summe je Käfig und
+        jede Ziffer höchstens einmal (entfällt für Käfige innerhalb einer Einheit, dort verlangt
+        das schon eine Grundbedingung). Die vorberechneten Positionen (siehe _constraint_layout)
+        werden nur über var_index abgebildet; entfallene Paare und leere Bedingungen fallen weg.
+
+        Parameter:
+        - model: Das highs.Model
+        - var_index: Variablenindex je (Zelle, Ziffer), -1 für entfallene Paare (siehe Sudoku.create_model)
+        - fixed: Festgelegte Variablen; ihre Ziffern gehen in die rechte Seite ein. prune hat sie
+          bereits aus den offenen Zellen des Käfigs gestrichen.
+        - registered: Siehe highs_bulk.add_sum_constraints
+
+        Rückgabe:
+        - Die ConstraintIndex-Handles (bei registered=False die Zeilennummern) der
+          Summenbedingungen und der Ziffernbedingungen
+        """
+        n = self.dimension**2
+        count = len(self.sums)
+        var_index = var_index.ravel()
+
+        columns = var_index[self.sum_positions]
+        present = columns >= 0
+        sum_lengths = np.bincount(self.sum_rows[present], minlength=count)
+        rhs = self.sums.astype(np.float64)
+        if fixed is not None:
+            fixed = fixed.ravel()[self.sum_positions]
+            rhs -= np.bincount(self.sum_rows[fixed], weights=self.sum_coefficients[fixed], minlength=count)
+        sum_rows = _split(columns[present], sum_lengths[sum_lengths > 0])
+        sum_coefficients = _split(self.sum_coefficients[present], sum_lengths[sum_lengths > 0])
+
+        columns = var_index[self.digit_positions]
+        present = columns >= 0
+        digit_lengths = np.bincount(self.digit_rows[present], minlength=count * n)
+        kept = present & (digit_lengths[self.digit_rows] > 1)
+        digit_rows = _split(columns[kept], digit_lengths[digit_lengths > 1])
+        return (add_sum_constraints(model, sum_rows, rhs[sum_lengths > 0], coefficients=sum_coefficients,
+                                    registered=registered),
+                add_sum_constraints(model, digit_rows, 1.0, poi.Leq, registered=registered))
+
+    def prune(self, candidates: np.ndarray, fixed: np.ndarray):
+        """
+        Streicht Kandidaten, die in keiner Ziffernmenge vorkommen, mit der die offenen Zellen eines
+        Käfigs seine Restsumme erreichen. Ziffern, die im Käfig schon festgelegt sind oder in keiner
+        offenen Zelle mehr möglich sind, scheiden für die Mengen aus. Die Käfige werden nach der
+        Anzahl offener Zellen gruppiert und je Gruppe gemeinsam gegen die Tabelle geprüft.
+
+        Parameter:
+        - candidates, fixed: Bool-Arrays der Form (s^2, s^2, s^2), siehe propagation.propagate
+
+        Rückgabe:
+        - (candidates, consistent, changed): reduziertes Kandidatengitter, ob kein Widerspruch
+          gefunden wurde und ob Kandidaten gestrichen wurden
+        """
+        n = self.dimension**2
+        shape = candidates.shape
+        flat_candidates = candidates.reshape(n * n, n)
+        flat_fixed = fixed.reshape(n * n, n)
+
+        used = self.membership @ flat_fixed.astype(np.float32)
+        if (used > 1).any():
+            return candidates, False, False
+        is_open = ~flat_fixed.any(axis=1)
+        open_count = (self.membership @ is_open.astype(np.float32)).astype(np.int64)
+        remaining = self.sums - (used @ np.arange(1, n + 1, dtype=np.float32)).astype(np.int64)
+        available = self.membership @ (flat_candidates & is_open[:, None]).astype(np.float32) > 0
+        forbidden = ((used > 0) | ~available).astype(np.float32)
+
+        allowed = np.ones((len(self.sums), n), dtype=bool)
+        for size in np.unique(open_count):
+            group = open_count == size
+            if size == 0:
+                if (remaining[group] != 0).any():
+                    return candidates, False, False
+                continue
+            combinations = digit_combinations(n, int(size))
+            if combinations is None:
+                continue
+            masks, sums = combinations
+            feasible = (sums[None, :] == remaining[group, None]) & (forbidden[group] @ masks.T == 0)
+            if not feasible.any(axis=1).all():
+                return candidates, False, False
+            allowed[group] = feasible.astype(np.float32) @ masks > 0
+
+        pruned = flat_candidates & (allowed[self.cell_cage] | ~is_open[:, None])
+        changed = bool((pruned != flat_candidates).any())
+        return pruned.reshape(shape), True, changed
+
+
+def _split(values: np.ndarray, lengths: np.ndarray) -> list:
+    """Teilt values in aufeinanderfolgende Stücke der Längen lengths."""
+    return np.split(values, np.cumsum(lengths)[:-1]) if len(lengths) else []
+
+
+def propagate_cages(candidates: np.ndarray, s: int, cages: CageIndex):
+    """
+    Wechselt zwischen Naked/Hidden Singles und CageIndex.prune bis zum Fixpunkt.
+
+    Rückgabe:
+    - (candidates, fixed, consistent) wie propagation.propagate
+    """
+    while True:
+        candidates, fixed, consistent = propagate(candidates, s)
+        if not consistent:
+            return candidates, fixed, False
+        candidates, consistent, changed = cages.prune(candidates, fixed)
+        if not consistent or not changed:
+            return candidates, fixed, consistent
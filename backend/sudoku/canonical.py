@@ -0,0 +1,165 @@
+import itertools
+from functools import lru_cache
+
+import numpy as np
+
+FULL_SYMMETRY_MAX_DIMENSION = 3  # Darüber nur Zeilen-/Bandvertauschungen und Umbenennung der Ziffern
+MAX_STATES = 50000  # Mehr gleichwertige Teilzuordnungen: keine Normalform (z.B. fast leeres Gitter)
+
+
+@lru_cache(maxsize=None)
+def column_arrangements(s: int) -> np.ndarray:
+    """
+    Alle Spaltenanordnungen eines Sudokus der Dimension s, die die Stapelstruktur erhalten:
+    Vertauschung der Stapel und der Spalten innerhalb jedes Stapels.
+
+    Rückgabe:
+    - int-Array der Form ((s!)^(s+1), s^2); Zeile c listet die Originalspalten in neuer Reihenfolge
+    """
+    perms = list(itertools.permutations(range(s)))
+    arrangements = [
+        [stack * s + within[stack][q] for stack in stack_order for q in range(s)]
+        for stack_order in perms
+        for within in itertools.product(perms, repeat=s)
+    ]
+    arrangements = np.array(arrangements, dtype=np.intp)
+    arrangements.setflags(write=False)
+    return arrangements
+
+
+@lru_cache(maxsize=None)
+def _column_weights(s: int) -> np.ndarray:
+    """
+    Gewicht jeder Originalspalte je Spaltenanordnung: 2^(s^2-1-p), wenn die Spalte an Position p
+    landet. (gefüllt @ Gewichte) ist dann das Bitmuster der gefüllten Zellen nach der Anordnung.
+    """
+    n = s**2
+    columns = column_arrangements(s)
+    weights = np.zeros((n, len(columns)))
+    weights[columns, np.arange(len(columns))[:, None]] = 2.0 ** np.arange(n - 1, -1, -1)
+    weights.setflags(write=False)
+    return weights
+
+
+def _minimal_rows(labels: np.ndarray, n: int) -> np.ndarray:
+    """Indizes der lexikographisch kleinsten Zeilen von labels (Einträge 0..n)."""
+    if (n + 1) ** n < 2**63:
+        keys = labels @ ((n + 1) ** np.arange(n - 1, -1, -1, dtype=np.int64))
+        return np.nonzero(keys == keys.min())[0]
+    keep = np.ones(len(labels), dtype=bool)
+    for j in range(n):
+        column = labels[:, j]
+        keep &= column == column[keep].min()
+    return np.nonzero(keep)[0]
+
+
+class SymmetryTransform:
+    """
+    Eine Symmetrie des Sudokus: optionale Transposition, dann Zeilen- und Spaltenanordnung,
+    dann Umbenennung der Ziffern (mapping[alte Ziffer] = neue Ziffer, 0 bleibt 0).
+    """
+
+    def __init__(self, transposed: bool, rows: np.ndarray, columns: np.ndarray, mapping: np.ndarray):
+        self.transposed = transposed
+        self.rows = rows
+        self.columns = columns
+        self.mapping = mapping
+        self.inverse_mapping = np.empty_like(mapping)
+        self.inverse_mapping[mapping] = np.arange(len(mapping), dtype=mapping.dtype)
+
+    def apply(self, grid: np.ndarray) -> np.ndarray:
+        grid = grid.T if self.transposed else grid
+        return self.mapping[grid[np.ix_(self.rows, self.columns)]]
+
+    def invert(self, grid: np.ndarray) -> np.ndarray:
+        original = np.empty_like(grid)
+        original[np.ix_(self.rows, self.columns)] = self.inverse_mapping[grid]
+        return original.T if self.transposed else original
+
+
+def canonicalize(grid: np.ndarray, s: int):
+    """
+    Bestimmt die Normalform eines Sudokus unter den Symmetrien, die Lösbarkeit und Lösungen
+    erhalten: Umbenennung der Ziffern, Vertauschen von Zeilen innerhalb eines Bandes und von
+    Spalten innerhalb eines Stapels, Vertauschen von Bändern und Stapeln sowie Transposition.
+
+    Die Normalform ist das lexikographisch kleinste Gitter der Symmetrieklasse, wobei die Ziffern
+    in der Reihenfolge ihres ersten Auftretens mit 1, 2, ... benannt werden. Für jede
+    Spaltenanordnung werden die Zeilen der Reihe nach gewählt; behalten werden nur die
+    Teilzuordnungen, deren bisherige Zeilen minimal sind. Ab Dimension 4 wären das zu viele
+    Spaltenanordnungen, dann werden nur Zeilen, Bänder und Ziffern normiert.
+
+    Parameter:
+    - grid: uint8-Array der Form (s^2, s^2), 0 für leere Zellen
+    - s: Die Dimension des Sudokus
+
+    Rückgabe:
+    - (Normalform als uint8-Array, SymmetryTransform vom Gitter zur Normalform) oder None, wenn
+      das Gitter eine Ziffer doppelt in einer Zeile enthält oder zu symmetrisch ist
+    """
+    n = s**2
+    grid = np.asarray(grid, dtype=np.intp)
+    filled = np.sort(grid, axis=1)
+    if ((filled[:, 1:] == filled[:, :-1]) & (filled[:, 1:] != 0)).any():
+        return None  # Doppelte Ziffern in einer Zeile: Umbenennung je Zeile wäre nicht eindeutig
+
+    if s <= FULL_SYMMETRY_MAX_DIMENSION:
+        columns = column_arrangements(s)
+        weights = _column_weights(s)
+        orientations = np.stack([grid, grid.T])
+    else:
+        columns = np.arange(n, dtype=np.intp)[None, :]
+        weights = 2.0 ** np.arange(n - 1, -1, -1)[:, None]
+        orientations = grid[None]
+    row_band = np.arange(n) // s
+
+    # Erste Zeile: Ohne bisherige Zuordnung hängt die umbenannte Zeile nur davon ab, welche Zellen
+    # gefüllt sind; lexikographisch kleiner heißt dann kleineres Bitmuster (leere Zellen zuerst).
+    keys = (orientations != 0).astype(np.float64) @ weights  # (Orientierung, Zeile, Spaltenanordnung)
+    orientation, row, arrangement = np.nonzero(keys == keys.min())
+    if len(row) > MAX_STATES:
+        return None
+    values = orientations[orientation, row][np.arange(len(row))[:, None], columns[arrangement]]
+    mapping = np.zeros((len(row), n + 1), dtype=np.intp)
+    labels = np.where(values != 0, np.cumsum(values != 0, axis=1), 0)
+    mapping[np.arange(len(row))[:, None], values] = labels
+    mapping[:, 0] = 0
+    next_label = labels.max(axis=1) + 1
+    used = np.zeros((len(row), n), dtype=bool)
+    used[np.arange(len(row)), row] = True
+    band = row_band[row]
+    chosen = row[:, None]
+    canonical = np.zeros((n, n), dtype=np.uint8)
+    canonical[0] = labels[0]
+
+    for r in range(1, n):
+        allowed = ~used if r % s == 0 else ~used & (row_band[None, :] == band[:, None])
+        state, row = np.nonzero(allowed)
+        values = orientations[orientation[state, None], row[:, None], columns[arrangement[state]]]
+        mapped = mapping[state[:, None], values]
+        unmapped = (values != 0) & (mapped == 0)
+        labels = np.where(unmapped, next_label[state, None] + np.cumsum(unmapped, axis=1) - 1, mapped)
+
+        keep = _minimal_rows(labels, n)
+        if len(keep) > MAX_STATES:
+            return None
+
+        canonical[r] = labels[keep[0]]
+        state, row, values, labels = state[keep], row[keep], values[keep], labels[keep]
+        mapping = mapping[state]
+        mapping[np.arange(len(state))[:, None], values] = labels
+        mapping[:, 0] = 0
+        used = used[state]
+        used[np.arange(len(state)), row] = True
+        band = row_band[row]
+        next_label = next_label[state] + unmapped[keep].sum(axis=1)
+        orientation, arrangement = orientation[state], arrangement[state]
+        chosen = np.concatenate([chosen[state], row[:, None]], axis=1)
+
+    # Ziffern, die im Gitter nicht vorkommen, erhalten die übrigen Namen in aufsteigender Reihenfolge
+    mapping = mapping[0]
+    absent = np.nonzero(mapping[1:] == 0)[0] + 1
+    mapping[absent] = np.arange(next_label[0], n + 1)
+
+    transform = SymmetryTransform(bool(orientation[0]), chosen[0], columns[arrangement[0]], mapping)
+    return canonical, transform
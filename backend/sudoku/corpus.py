@@ -0,0 +1,56 @@
+"""
+Gemeinsamer Korpus für den Vergleich der Engines, genutzt von "benchmark.py engines" und
+tests/test_engines.py. Die Rätsel hängen vom Zustand des Moduls random ab (vorher random.seed setzen).
+"""
+import random
+
+from sudoku import KillerSudokuGenerator, SudokuGenerator
+
+
+def unsolvable_variant(puzzle: list, solution: list, s: int) -> list | None:
+    """
+    Setzt in eine leere Zelle eine falsche Ziffer, die keiner Vorgabe in Zeile, Spalte oder Block
+    widerspricht. Da das Rätsel eindeutig ist, hat die Variante keine Lösung.
+    """
+    n = s**2
+    empty = [(i, j) for i in range(n) for j in range(n) if puzzle[i][j] is None]
+    random.shuffle(empty)
+    for i, j in empty:
+        box = [puzzle[a][b] for a in range(i // s * s, i // s * s + s) for b in range(j // s * s, j // s * s + s)]
+        seen = set(puzzle[i]) | {puzzle[a][j] for a in range(n)} | set(box)
+        wrong = [digit for digit in range(1, n + 1) if digit != solution[i][j] and digit not in seen]
+        if wrong:
+            variant = [row[:] for row in puzzle]
+            variant[i][j] = random.choice(wrong)
+            return variant
+    return None
+
+
+def engine_corpus(dimensions: list, killer_dimensions: list, count: int) -> list:
+    """
+    Gemeinsamer Korpus für den Vergleich der Engines: eindeutige Rätsel aus den Generatoren (je
+    Schwierigkeitsgrad im Wechsel) und unlösbare Varianten davon.
+
+    Rückgabe:
+    - Liste von (Name, s, Rätsel, Käfiggitter und Summen oder None, erwartete Lösung oder None)
+    """
+    difficulties = ["easy", "normal", "hard"]
+    corpus = []
+    for s in dimensions:
+        for index in range(count):
+            generator = SudokuGenerator(s)
+            puzzle, solution = generator.get_incomplete_and_complete_sudoku(difficulties[index % 3])
+            corpus.append((f"{s**2}x{s**2}", s, puzzle, None, solution))
+            variant = unsolvable_variant(puzzle, solution, s)
+            if variant is not None:
+                corpus.append((f"{s**2}x{s**2} unlösbar", s, variant, None, None))
+    for s in killer_dimensions:
+        for index in range(count):
+            generator = KillerSudokuGenerator(s)
+            puzzle, solution, cages = generator.get_killer_sudoku(difficulties[index % 3])
+            cage_data = (generator.cage_grid().tolist(), [cage_sum for _, cage_sum in cages])
+            corpus.append((f"{s**2}x{s**2} Killer", s, puzzle, cage_data, solution))
+            variant = unsolvable_variant(puzzle, solution, s)
+            if variant is not None:
+                corpus.append((f"{s**2}x{s**2} Killer unlösbar", s, variant, cage_data, None))
+    return corpus
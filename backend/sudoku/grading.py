@@ -0,0 +1,248 @@
+from functools import lru_cache
+from itertools import combinations
+
+from uniqueness import units
+
+# Techniken in aufsteigender Schwierigkeit: (Name, Stufe). Die Bewertung eines Rätsels ist die
+# Stufe der schwierigsten Technik, die der Löser braucht; kommt er nicht weiter, GUESSING.
+TECHNIQUES = (
+    ("naked_single", 1),
+    ("hidden_single", 1),
+    ("locked_candidates", 2),
+    ("naked_pair", 3),
+    ("hidden_pair", 3),
+    ("naked_triple", 4),
+    ("hidden_triple", 4),
+    ("x_wing", 5),
+    ("swordfish", 6),
+)
+GUESSING = ("backtracking", 7)
+
+# Schwierigkeitsgrad -> Bereich der Bewertung (kleinste, größte Stufe), siehe SudokuGenerator
+RATING_LEVELS = {
+    "easy": (1, 1),    # Nur Singles
+    "normal": (2, 3),  # Locked Candidates oder Paare
+    "hard": (4, 7),    # Tripel, Fische oder Ausprobieren
+}
+
+
+@lru_cache(maxsize=None)
+def layout(s: int):
+    """
+    Struktur für den Löser, einmal je Dimension: Einheiten und Nachbarn (siehe uniqueness.units),
+    die Zeilen und Spalten getrennt für die Fische und für jeden Schnitt aus Block und Zeile oder
+    Spalte (Schnitt, Rest des Blocks, Rest der Linie) für die Locked Candidates.
+    """
+    n = s**2
+    all_units, peers = units(s)
+    rows, columns, boxes = all_units[:n], all_units[n:2 * n], all_units[2 * n:]
+    intersections = []
+    for box in boxes:
+        for line in rows + columns:
+            common = [cell for cell in box if cell in line]
+            if common:
+                intersections.append((common, [cell for cell in box if cell not in common],
+                                      [cell for cell in line if cell not in common]))
+    return all_units, peers, rows, columns, intersections
+
+
+class LogicSolver:
+    """
+    Löst ein Sudoku nur mit menschlichen Techniken auf Bitmasken-Kandidaten (Bit k = Ziffer k+1)
+    und merkt sich die schwierigste verwendete Technik.
+
+    Nach jedem Fortschritt beginnt der Löser wieder bei der leichtesten Technik, so dass jede
+    Technik nur eingesetzt wird, wenn alle leichteren nicht mehr weiterkommen.
+    """
+
+    def __init__(self, sudoku, s: int):
+        self.s = s
+        self.n = s**2
+        self.units, self.peers, self.rows, self.columns, self.intersections = layout(s)
+        self.masks = [(1 << self.n) - 1] * (self.n * self.n)
+        self.placed = [False] * (self.n * self.n)
+        self.consistent = True
+        for i, row in enumerate(sudoku):
+            for j, value in enumerate(row):
+                if value:
+                    self.masks[i * self.n + j] = 1 << (int(value) - 1)
+        for cell in range(self.n * self.n):
+            if self.masks[cell] & (self.masks[cell] - 1) == 0 and not self.placed[cell]:
+                self.place(cell)
+
+    def place(self, cell: int):
+        """Legt die einzige Ziffer der Zelle fest und streicht sie bei allen Nachbarn."""
+        self.placed[cell] = True
+        bit = self.masks[cell]
+        for peer in self.peers[cell]:
+            if self.masks[peer] & bit:
+                self.masks[peer] &= ~bit
+                if not self.masks[peer]:
+                    self.consistent = False
+
+    def eliminate(self, cells, bits: int) -> bool:
+        """Streicht bits aus den Kandidaten der Zellen; True, wenn sich etwas geändert hat."""
+        changed = False
+        for cell in cells:
+            if self.masks[cell] & bits:
+                self.masks[cell] &= ~bits
+                changed = True
+                if not self.masks[cell]:
+                    self.consistent = False
+        return changed
+
+    def open_cells(self, unit):
+        return [cell for cell in unit if not self.placed[cell]]
+
+    def naked_single(self) -> bool:
+        found = [cell for cell, mask in enumerate(self.masks)
+                 if not self.placed[cell] and mask & (mask - 1) == 0]
+        for cell in found:
+            if not self.placed[cell]:
+                self.place(cell)
+        return bool(found)
+
+    def hidden_single(self) -> bool:
+        for unit in self.units:
+            once = twice = 0
+            for cell in self.open_cells(unit):
+                twice |= once & self.masks[cell]
+                once |= self.masks[cell]
+            hidden = once & ~twice
+            for cell in self.open_cells(unit):
+                bit = self.masks[cell] & hidden
+                if bit:
+                    self.masks[cell] = bit & -bit
+                    self.place(cell)
+                    return True
+        return False
+
+    def locked_candidates(self) -> bool:
+        """Pointing (Ziffer im Block nur in einer Linie) und Claiming (in der Linie nur in einem Block)."""
+        for common, box_rest, line_rest in self.intersections:
+            inside = 0
+            for cell in common:
+                if not self.placed[cell]:
+                    inside |= self.masks[cell]
+            if not inside:
+                continue
+            in_box_rest = in_line_rest = 0
+            for cell in box_rest:
+                if not self.placed[cell]:
+                    in_box_rest |= self.masks[cell]
+            for cell in line_rest:
+                if not self.placed[cell]:
+                    in_line_rest |= self.masks[cell]
+            if self.eliminate(self.open_cells(line_rest), inside & ~in_box_rest):
+                return True
+            if self.eliminate(self.open_cells(box_rest), inside & ~in_line_rest):
+                return True
+        return False
+
+    def naked_subset(self, size: int) -> bool:
+        """size Zellen einer Einheit mit zusammen nur size Kandidaten: diese fallen im Rest weg."""
+        for unit in self.units:
+            cells = self.open_cells(unit)
+            small = [cell for cell in cells if bin(self.masks[cell]).count("1") <= size]
+            for subset in combinations(small, size):
+                union = 0
+                for cell in subset:
+                    union |= self.masks[cell]
+                if bin(union).count("1") == size:
+                    if self.eliminate([cell for cell in cells if cell not in subset], union):
+                        return True
+        return False
+
+    def hidden_subset(self, size: int) -> bool:
+        """size Ziffern, die in einer Einheit nur in size Zellen vorkommen: dort fällt der Rest weg."""
+        for unit in self.units:
+            cells = self.open_cells(unit)
+            positions = {}
+            for index, cell in enumerate(cells):
+                mask = self.masks[cell]
+                while mask:
+                    bit = mask & -mask
+                    positions[bit] = positions.get(bit, 0) | (1 << index)
+                    mask ^= bit
+            digits = [bit for bit, where in positions.items() if bin(where).count("1") <= size]
+            for subset in combinations(digits, size):
+                where = 0
+                for bit in subset:
+                    where |= positions[bit]
+                if bin(where).count("1") == size:
+                    keep = sum(subset)
+                    chosen = [cell for index, cell in enumerate(cells) if where >> index & 1]
+                    if self.eliminate(chosen, ~keep & ((1 << self.n) - 1)):
+                        return True
+        return False
+
+    def fish(self, size: int) -> bool:
+        """X-Wing (size 2) und Swordfish (size 3) je Ziffer, mit Zeilen oder Spalten als Basis."""
+        for bit in (1 << k for k in range(self.n)):
+            for base, cover in ((self.rows, self.columns), (self.columns, self.rows)):
+                lines = []
+                for line in base:
+                    where = 0
+                    for index, cell in enumerate(line):
+                        if not self.placed[cell] and self.masks[cell] & bit:
+                            where |= 1 << index
+                    if 2 <= bin(where).count("1") <= size:
+                        lines.append((line, where))
+                for subset in combinations(lines, size):
+                    where = 0
+                    for _, positions in subset:
+                        where |= positions
+                    if bin(where).count("1") != size:
+                        continue
+                    base_cells = {cell for line, _ in subset for cell in line}
+                    targets = [cell for index, line in enumerate(cover) if where >> index & 1
+                               for cell in line if cell not in base_cells and not self.placed[cell]]
+                    if self.eliminate(targets, bit):
+                        return True
+        return False
+
+    def solve(self):
+        """
+        Wendet die Techniken an, bis das Rätsel gelöst ist oder keine mehr weiterkommt.
+
+        Rückgabe:
+        - (Stufe, Technik) der schwierigsten verwendeten Technik; GUESSING, wenn der Löser
+          steckenbleibt. ValueError, wenn das Rätsel widersprüchlich ist.
+        """
+        steps = {
+            "naked_single": self.naked_single,
+            "hidden_single": self.hidden_single,
+            "locked_candidates": self.locked_candidates,
+            "naked_pair": lambda: self.naked_subset(2),
+            "hidden_pair": lambda: self.hidden_subset(2),
+            "naked_triple": lambda: self.naked_subset(3),
+            "hidden_triple": lambda: self.hidden_subset(3),
+            "x_wing": lambda: self.fish(2),
+            "swordfish": lambda: self.fish(3),
+        }
+        hardest = ("naked_single", 1)
+        while self.consistent and not all(self.placed):
+            for name, level in TECHNIQUES:
+                if steps[name]():
+                    if level > hardest[1]:
+                        hardest = (name, level)
+                    break
+            else:
+                return GUESSING[1], GUESSING[0]
+        if not self.consistent:
+            raise ValueError("Sudoku is inconsistent")
+        return hardest[1], hardest[0]
+
+
+def grade(sudoku, s: int):
+    """
+    Bewertet ein Sudoku nach der schwierigsten Technik, die ein menschlicher Löser braucht.
+
+    Parameter:
+    - sudoku: s^2 x s^2 Gitter mit Ziffern 1..s^2 und None (oder 0) für leere Zellen
+    - s: Die Dimension des Sudokus
+
+    Rückgabe:
+    - (Stufe, Technik), z.B. (3, 'naked_pair'), siehe TECHNIQUES und GUESSING
+    """
+    return LogicSolver(sudoku, s).solve()
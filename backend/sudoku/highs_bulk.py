@@ -0,0 +1,258 @@
+"""
+Massenoperationen auf einem highs.Model: Variablen, Bedingungen und Lösungswerte in einem Schritt
+statt je Zelle.
+
+Sie rufen die C-API von HiGHS direkt auf und stützen sich dabei auf Interna von
+pyoptinterface, die nicht zur öffentlichen API gehören: pyoptinterface._src.highs.detected_libraries
+(Pfad der geladenen HiGHS-Bibliothek) und die PyCapsule aus Model.get_raw_model() mit dem Zeiger auf
+das Highs-Objekt. Die Version von pyoptinterface ist deshalb in requirements.txt fest vorgegeben.
+Der Zugriff läuft ausschließlich über _highs_handle; fehlen die Interna, gilt der langsamere Weg
+über die öffentliche API von pyoptinterface je Zelle.
+
+Spalten und Zeilen, die mit registered=False in einem Aufruf direkt in HiGHS angelegt werden, kennt
+pyoptinterface nicht: Für sie gibt es keine Handles, und Bedingungen, die danach über
+pyoptinterface hinzukommen oder gelöscht werden, träfen die falschen Zeilen. Das eignet sich nur
+für Modelle, die nach dem Aufbau bloß noch mit run gelöst und über get_column_values ausgelesen
+werden; model.optimize() würde die Lösung in Puffer für die pyoptinterface bekannten Spalten und
+Zeilen schreiben.
+"""
+import ctypes
+from functools import lru_cache
+from itertools import repeat
+
+import numpy as np
+import pyoptinterface as poi
+
+# HighsModelStatus -> TerminationStatusCode, wie pyoptinterface ihn nach optimize() meldet
+_TERMINATION_STATUS = {
+    2: poi.TerminationStatusCode.INVALID_MODEL,
+    6: poi.TerminationStatusCode.INVALID_MODEL,
+    7: poi.TerminationStatusCode.OPTIMAL,
+    8: poi.TerminationStatusCode.INFEASIBLE,
+    9: poi.TerminationStatusCode.INFEASIBLE_OR_UNBOUNDED,
+    10: poi.TerminationStatusCode.DUAL_INFEASIBLE,
+    11: poi.TerminationStatusCode.OBJECTIVE_LIMIT,
+    12: poi.TerminationStatusCode.OBJECTIVE_LIMIT,
+    13: poi.TerminationStatusCode.TIME_LIMIT,
+    14: poi.TerminationStatusCode.ITERATION_LIMIT,
+    16: poi.TerminationStatusCode.SOLUTION_LIMIT,
+}
+
+
+@lru_cache(maxsize=None)
+def _highs_library():
+    """
+    Lädt die HiGHS-Bibliothek, die auch pyoptinterface verwendet, für direkte Aufrufe.
+
+    Rückgabe:
+    - Die ctypes-Bibliothek oder None, falls sie nicht geladen werden kann
+    """
+    try:
+        from pyoptinterface._src.highs import detected_libraries
+
+        paths = list(detected_libraries())
+    except (ImportError, AttributeError):
+        return None
+    for path in paths:
+        try:
+            lib = ctypes.CDLL(path)
+            fn = lib.Highs_changeColsIntegralityByRange
+            get_solution = lib.Highs_getSolution
+            add_cols = lib.Highs_addCols
+            add_rows = lib.Highs_addRows
+            get_infinity = lib.Highs_getInfinity
+            run = lib.Highs_run
+            get_model_status = lib.Highs_getModelStatus
+        except (OSError, AttributeError):
+            continue
+        fn.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+        fn.restype = ctypes.c_int
+        get_solution.argtypes = [ctypes.c_void_p] * 5
+        get_solution.restype = ctypes.c_int
+        # Highs_addCols(highs, Anzahl, Kosten, untere, obere Schranken, Nichtnullen, Starts, Indizes, Werte)
+        add_cols.argtypes = [ctypes.c_void_p, ctypes.c_int, *[ctypes.c_void_p] * 3, ctypes.c_int, *[ctypes.c_void_p] * 3]
+        add_cols.restype = ctypes.c_int
+        # Highs_addRows(highs, Anzahl, untere, obere Schranken, Nichtnullen, Starts, Indizes, Werte)
+        add_rows.argtypes = [ctypes.c_void_p, ctypes.c_int, *[ctypes.c_void_p] * 2, ctypes.c_int, *[ctypes.c_void_p] * 3]
+        add_rows.restype = ctypes.c_int
+        get_infinity.argtypes = [ctypes.c_void_p]
+        get_infinity.restype = ctypes.c_double
+        for function in (run, get_model_status):
+            function.argtypes = [ctypes.c_void_p]
+            function.restype = ctypes.c_int
+        return lib
+    return None
+
+
+def _highs_handle(model):
+    """
+    Die HiGHS-Bibliothek und der Zeiger auf das Highs-Objekt von model für direkte Aufrufe.
+
+    Rückgabe:
+    - (ctypes-Bibliothek, Zeiger) oder None, wenn die Interna von pyoptinterface (siehe oben)
+      nicht wie erwartet vorhanden sind; der Aufrufer nimmt dann die öffentliche API
+    """
+    lib = _highs_library()
+    if lib is None:
+        return None
+    try:
+        return lib, _raw_pointer(model)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _raw_pointer(model):
+    capsule = model.get_raw_model()
+    get_name = ctypes.pythonapi.PyCapsule_GetName
+    get_name.argtypes = [ctypes.py_object]
+    get_name.restype = ctypes.c_char_p
+    get_pointer = ctypes.pythonapi.PyCapsule_GetPointer
+    get_pointer.argtypes = [ctypes.py_object, ctypes.c_char_p]
+    get_pointer.restype = ctypes.c_void_p
+    return get_pointer(capsule, get_name(capsule))
+
+
+def add_binary_variables(model, n: int, registered: bool = True) -> np.ndarray:
+    """
+    Fügt n binäre Variablen in einem Schritt zum Modell hinzu.
+
+    Einzelnes Anlegen mit domain=Binary ändert in HiGHS für jede Spalte die Ganzzahligkeit
+    separat und ist dadurch etwa zehnmal langsamer. Hier werden stetige Spalten in [0, 1]
+    angelegt und die Ganzzahligkeit anschließend für den ganzen Bereich gesetzt.
+
+    Parameter:
+    - model: Ein frisch erzeugtes highs.Model (Spalten müssen am Ende angehängt werden)
+    - n: Anzahl der Variablen
+    - registered: False legt die Spalten mit einem Aufruf von Highs_addCols an, an
+      pyoptinterface vorbei (siehe oben); ohne Zugriff auf HiGHS wie bei True
+
+    Rückgabe:
+    - int32-Array mit den Variablenindizes (VariableIndex.index, bei registered=False die
+      Spaltennummern); die Handles selbst werden nicht aufbewahrt, bei großen Modellen wären das
+      zehntausende Python-Objekte
+    """
+    first_column = model.getnumcol()
+    handle = _highs_handle(model) if n > 0 else None
+    if not registered and handle is not None:
+        lib, highs = handle
+        costs, lower, upper = np.zeros(n), np.zeros(n), np.ones(n)
+        if lib.Highs_addCols(highs, n, costs.ctypes.data, lower.ctypes.data, upper.ctypes.data,
+                             0, None, None, None) != 0:
+            raise RuntimeError("HiGHS rejected the variables")
+        variables = np.arange(first_column, first_column + n, dtype=np.int32)
+    else:
+        variables = np.fromiter((model.add_variable(lb=0.0, ub=1.0).index for _ in range(n)), dtype=np.int32, count=n)
+
+    if n == 0:
+        return variables
+
+    integrality = np.ones(n, dtype=np.int32)
+    if handle is None or handle[0].Highs_changeColsIntegralityByRange(
+        handle[1], first_column, first_column + n - 1, integrality.ctypes.data
+    ) != 0:
+        if not registered:
+            raise RuntimeError("HiGHS rejected the integrality of the variables")
+        # Fallback: Variablentyp einzeln setzen
+        for index in variables:
+            model.set_variable_type(poi.VariableIndex(int(index)), poi.VariableDomain.Binary)
+    return variables
+
+
+def add_sum_constraints(model, index_rows, rhs=1.0, sense=poi.Eq, coefficients=None, registered=True):
+    """
+    Fügt für jede Zeile von index_rows die Bedingung sum(coefficients * x[row]) (sense) rhs hinzu.
+
+    Parameter:
+    - model: Das highs.Model
+    - index_rows: 2D-Array oder Liste von 1D-Arrays mit pyoptinterface-Variablenindizes je Bedingung
+    - rhs: Rechte Seite (Skalar oder ein Wert pro Zeile)
+    - sense: poi.Eq, poi.Leq oder poi.Geq
+    - coefficients: Koeffizienten je Zeile (Standard: 1.0)
+    - registered: False übergibt alle Zeilen als eine CSR-Matrix mit einem Aufruf von
+      Highs_addRows, an pyoptinterface vorbei (siehe oben); ohne Zugriff auf HiGHS wie bei True
+
+    Rückgabe:
+    - Liste der ConstraintIndex-Handles, bei registered=False die Zeilennummern (range)
+    """
+    handle = None if registered else _highs_handle(model)
+    if handle is not None:
+        return _add_rows(*handle, model, index_rows, rhs, sense, coefficients)
+    if np.isscalar(rhs):
+        rhs = repeat(rhs)
+    if coefficients is None:
+        coefficients = repeat(None)
+
+    from_numpy = poi.ScalarAffineFunction.from_numpy
+    constraints = []
+    for row, coef, b in zip(index_rows, coefficients, rhs):
+        row = np.ascontiguousarray(row, dtype=np.int32)
+        coef = np.ones(len(row)) if coef is None else np.ascontiguousarray(coef, dtype=np.float64)
+        constraints.append(model.add_linear_constraint(from_numpy(coef, row), sense, float(b)))
+    return constraints
+
+
+def _add_rows(lib, highs, model, index_rows, rhs, sense, coefficients):
+    """add_sum_constraints mit registered=False: alle Zeilen als CSR-Matrix in einem Aufruf."""
+    if isinstance(index_rows, np.ndarray):
+        index_rows = list(index_rows)
+    else:
+        index_rows = [np.asarray(row) for row in index_rows]
+    first_row = model.getnumrow()
+    count = len(index_rows)
+    if count == 0:
+        return range(first_row, first_row)
+    lengths = np.fromiter((len(row) for row in index_rows), dtype=np.int32, count=count)
+    starts = np.zeros(count, dtype=np.int32)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    index = np.concatenate(index_rows).astype(np.int32)
+    if coefficients is None:
+        value = np.ones(len(index))
+    else:
+        value = np.concatenate(list(coefficients)).astype(np.float64)
+    rhs = np.broadcast_to(np.asarray(rhs, dtype=np.float64), count)
+    infinity = np.full(count, lib.Highs_getInfinity(highs))
+    lower = -infinity if sense == poi.Leq else rhs
+    upper = infinity if sense == poi.Geq else rhs
+    lower, upper = np.ascontiguousarray(lower), np.ascontiguousarray(upper)
+    if lib.Highs_addRows(highs, count, lower.ctypes.data, upper.ctypes.data, len(index),
+                         starts.ctypes.data, index.ctypes.data, value.ctypes.data) != 0:
+        raise RuntimeError("HiGHS rejected the constraints")
+    return range(first_row, first_row + count)
+
+
+def run(model) -> poi.TerminationStatusCode:
+    """
+    Löst ein Modell, das mit registered=False aufgebaut wurde, über Highs_run statt model.optimize()
+    (siehe oben). pyoptinterface meldet danach weiter OPTIMIZE_NOT_CALLED; den Status liefert run.
+
+    Rückgabe:
+    - Der TerminationStatusCode, den model.get_model_attribute nach optimize() melden würde
+    """
+    handle = _highs_handle(model)
+    if handle is None:
+        # Ohne Zugriff auf HiGHS wurde das Modell über pyoptinterface aufgebaut
+        model.optimize()
+        return model.get_model_attribute(poi.ModelAttribute.TerminationStatus)
+    lib, highs = handle
+    if lib.Highs_run(highs) == -1:
+        return poi.TerminationStatusCode.OTHER_ERROR
+    return _TERMINATION_STATUS.get(lib.Highs_getModelStatus(highs), poi.TerminationStatusCode.OTHER_ERROR)
+
+
+def get_column_values(model, variables) -> np.ndarray:
+    """
+    Liest die Werte aller Spalten der aktuellen Lösung in einem Aufruf aus.
+
+    Parameter:
+    - model: Das gelöste highs.Model
+    - variables: Die Variablenindizes aller Spalten in Spaltenreihenfolge (nur für den Fallback)
+
+    Rückgabe:
+    - float64-Array mit einem Wert pro Spalte
+    """
+    values = np.empty(model.getnumcol(), dtype=np.float64)
+    handle = _highs_handle(model)
+    if handle is None or handle[0].Highs_getSolution(handle[1], values.ctypes.data, None, None, None) != 0:
+        # Fallback: Werte einzeln abfragen
+        values[:] = [model.get_value(poi.VariableIndex(int(index))) for index in variables]
+    return values
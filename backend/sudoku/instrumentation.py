@@ -0,0 +1,205 @@
+"""
+Messung der Aufträge (Abschnitte, HiGHS-Kennzahlen, cProfile), Logging und /metrics.
+
+Die Datei liegt bewusst identisch in backend/sudoku und backend/mastermind: Jeder Service wird
+aus seinem eigenen Verzeichnis als eigenes Image gebaut (siehe compose.yaml) und bleibt so
+unabhängig auslieferbar. Änderungen immer in beiden Kopien vornehmen.
+"""
+import cProfile
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "WARNING").upper()
+PROFILE_DIR = os.environ.get("PROFILE_DIR") or None  # cProfile je Auftrag in dieses Verzeichnis schreiben
+
+# Obergrenzen der Histogramm-Buckets (Sekunden bzw. Anzahl), zusätzlich +Inf
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+_record = None  # Messwerte des Auftrags, der gerade in diesem Prozess läuft (siehe run_instrumented)
+
+
+def configure_logging():
+    """Richtet das Logging nach LOG_LEVEL ein (Standard: WARNING), im Server und in jedem Worker."""
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # uvicorn schreibt über eigene Handler; ohne das erschiene jede Zeile zweimal
+    logging.getLogger("uvicorn").propagate = False
+
+
+@contextmanager
+def phase(name: str):
+    """Misst einen Abschnitt des laufenden Auftrags (z.B. 'build', 'solve'); außerhalb eines Auftrags wirkungslos."""
+    if _record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = _record["phases"]
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def record_highs(model):
+    """Übernimmt Knoten, Simplex-Iterationen und Rechenzeit des letzten optimize() in den laufenden Auftrag."""
+    if _record is None:
+        return
+    import pyoptinterface as poi
+
+    stats = _record["highs"]
+    try:
+        values = {
+            "nodes": model.get_raw_info_int64("mip_node_count"),
+            "iterations": model.get_raw_info_int("simplex_iteration_count"),
+            "solve_seconds": model.get_model_attribute(poi.ModelAttribute.SolveTimeSec),
+        }
+    except Exception:
+        return  # Nicht jeder Lauf liefert alle Kennzahlen (z.B. ohne MIP-Suche)
+    for key, value in values.items():
+        stats[key] = stats.get(key, 0) + max(value, 0)
+    stats["calls"] = stats.get("calls", 0) + 1
+
+
+def run_instrumented(fn, *args):
+    """
+    Führt fn(*args) aus und misst dabei die Abschnitte (phase) und die HiGHS-Kennzahlen (record_highs).
+    Mit PROFILE_DIR wird der Aufruf zusätzlich mit cProfile aufgezeichnet und als
+    <PROFILE_DIR>/<fn>-<pid>-<Zeitstempel>.prof abgelegt (auswertbar mit pstats oder snakeviz).
+
+    Rückgabe:
+    - (Ergebnis von fn, Messwerte {'seconds', 'phases', 'highs'}); Exceptions von fn werden durchgereicht
+    """
+    global _record
+    _record = {"phases": {}, "highs": {}}
+    profiler = cProfile.Profile() if PROFILE_DIR else None
+    start = time.perf_counter()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        result = fn(*args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{fn.__name__}-{os.getpid()}-{time.time_ns()}.prof"))
+        record, _record = _record, None
+    record["seconds"] = time.perf_counter() - start
+    return result, record
+
+
+class Histogram:
+    """Kumulatives Histogramm im Stil von Prometheus, getrennt nach Label-Werten."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}  # Labels -> [Zähler je Bucket, Summe, Anzahl]
+
+    def observe(self, value: float, labels: tuple):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+
+class Metrics:
+    """
+    Kennzahlen des Serverprozesses für /metrics: Histogramme und Zähler mit Labels, im
+    Textformat von Prometheus ausgegeben. Die Messwerte der Worker kommen über record in den
+    Serverprozess (siehe JobPool).
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.histograms = {}  # Name -> (Hilfetext, Label-Namen, Histogram)
+        self.counters = {}    # Name -> (Hilfetext, Label-Namen, {Labels: Wert})
+
+    def histogram(self, name: str, help: str, labels: tuple, buckets=SECONDS_BUCKETS):
+        self.histograms[name] = (help, labels, Histogram(buckets))
+
+    def counter(self, name: str, help: str, labels: tuple):
+        self.counters[name] = (help, labels, {})
+
+    def observe(self, name: str, value: float, *labels):
+        self.histograms[name][2].observe(value, labels)
+
+    def inc(self, name: str, *labels, value: float = 1):
+        values = self.counters[name][2]
+        values[labels] = values.get(labels, 0) + value
+
+    @contextmanager
+    def timer(self, name: str, *labels):
+        """Beobachtet die Dauer des Blocks im Histogramm name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, *labels)
+
+    def record(self, job: str, record: dict, wall: float):
+        """
+        Übernimmt die Messwerte eines Auftrags (siehe run_instrumented).
+
+        Parameter:
+        - job: Name der Worker-Funktion
+        - record: Messwerte aus dem Worker
+        - wall: Sekunden von der Übergabe an den Pool bis zum Ergebnis (die Differenz zu
+          record['seconds'] ist die Wartezeit und die Übertragung)
+        """
+        self.observe("job_duration_seconds", record["seconds"], job)
+        self.observe("job_wait_seconds", max(wall - record["seconds"], 0.0), job)
+        for name, seconds in record["phases"].items():
+            self.observe("phase_duration_seconds", seconds, job, name)
+        highs = record["highs"]
+        if highs:
+            self.inc("highs_calls_total", job, value=highs["calls"])
+            self.observe("highs_nodes", highs["nodes"], job)
+            self.observe("highs_iterations", highs["iterations"], job)
+            self.observe("highs_solve_seconds", highs["solve_seconds"], job)
+
+    def render(self) -> str:
+        """Alle Kennzahlen im Textformat von Prometheus (text/plain; version=0.0.4)."""
+        lines = []
+        for name, (help, label_names, histogram) in self.histograms.items():
+            full = f"{self.prefix}_{name}"
+            lines += [f"# HELP {full} {help}", f"# TYPE {full} histogram"]
+            for labels, (counts, total, count) in sorted(histogram.series.items()):
+                base = _labels(label_names, labels)
+                for bound, bucket in zip(histogram.buckets, counts):
+                    lines.append(f"{full}_bucket{_labels(label_names + ('le',), labels + (f'{bound:g}',))} {bucket}")
+                lines.append(f"{full}_bucket{_labels(label_names + ('le',), labels + ('+Inf',))} {count}")
+                lines.append(f"{full}_sum{base} {total:.9g}")
+                lines.append(f"{full}_count{base} {count}")
+        for name, (help, label_names, values) in self.counters.items():
+            full = f"{self.prefix}_{name}"
+            lines += [f"# HELP {full} {help}", f"# TYPE {full} counter"]
+            for labels, value in sorted(values.items()):
+                lines.append(f"{full}{_labels(label_names, labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def service_metrics(prefix: str) -> Metrics:
+    """Die Kennzahlen eines Service: Anfragen je Endpunkt, Aufträge und Abschnitte je Worker-Funktion, HiGHS."""
+    metrics = Metrics(prefix)
+    metrics.histogram("request_duration_seconds", "Dauer der HTTP-Anfragen bis zum Beginn der Antwort",
+                      ("method", "endpoint", "status"))
+    metrics.histogram("job_duration_seconds", "Rechenzeit eines Auftrags im Worker", ("job",))
+    metrics.histogram("job_wait_seconds", "Wartezeit und Übertragung eines Auftrags", ("job",))
+    metrics.histogram("phase_duration_seconds", "Dauer je Abschnitt eines Auftrags", ("job", "phase"))
+    metrics.histogram("highs_nodes", "Branch-and-Bound-Knoten von HiGHS je Auftrag", ("job",), COUNT_BUCKETS)
+    metrics.histogram("highs_iterations", "Simplex-Iterationen von HiGHS je Auftrag", ("job",), COUNT_BUCKETS)
+    metrics.histogram("highs_solve_seconds", "Rechenzeit von HiGHS je Auftrag", ("job",))
+    metrics.counter("highs_calls_total", "Aufrufe von optimize()", ("job",))
+    return metrics
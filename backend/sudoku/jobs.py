@@ -0,0 +1,287 @@
+import asyncio
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import cage_cache
+from instrumentation import configure_logging, phase, run_instrumented
+from solution_cache import SolutionCache, cache_stats, shared_counters
+
+WARM_DIMENSIONS = (2, 3)
+
+_solution_cache = None  # Lösungscache des Worker-Prozesses, siehe init_worker
+_cage_cache = None  # Cache der Käfiglayouts des Worker-Prozesses, siehe init_worker
+
+
+class JobQueueFull(Exception):
+    """Es warten bereits so viele Aufträge, wie die Warteschlange aufnehmen darf."""
+
+
+class JobTimeout(Exception):
+    """Ein Auftrag wurde nicht innerhalb der erlaubten Zeit fertig."""
+
+
+def warm_up(dimensions=WARM_DIMENSIONS):
+    """
+    Initialisiert einen Worker-Prozess: lädt pyoptinterface/HiGHS, baut die zwischengespeicherten
+    Grundmodelle (Constraint-Matrizen, Einheiten) für die gängigen Dimensionen vorab auf, löst je
+    Dimension ein kleines Rätsel (damit die erste Anfrage nicht die restlichen Importe bezahlt,
+    etwa numpy.ma beim ersten np.unique in der Propagation) und begrenzt danach den Speicher des
+    Workers (siehe limits.WORKER_MEMORY_LIMIT).
+    """
+    # Zufallsgenerator je Prozess neu initialisieren, sonst erzeugen alle Worker dieselben Rätsel
+    random.seed()
+    configure_logging()
+    from highs_bulk import _highs_library
+    from limits import apply_memory_limit
+    from propagation import base_constraint_matrix, variable_constraints
+    from sudoku import SudokuSolver
+    from uniqueness import units
+
+    _highs_library()
+    for s in dimensions:
+        base_constraint_matrix(s)
+        variable_constraints(s)
+        units(s)
+        # Eine Lösung des leeren Gitters mit jeder zweiten Zeile als Vorgabe erneut lösen
+        puzzle = SudokuSolver(s, np.zeros((s**2, s**2), dtype=np.uint8)).solve_grid()
+        puzzle[1::2] = 0
+        SudokuSolver(s, puzzle).solve_grid()
+    apply_memory_limit()
+
+
+def init_worker(cache_counters=None, cache_size: int = 0, cache_path: str | None = None,
+                cage_counters=None, cage_cache_size: int = 0, cage_cache_bytes: int = 0, warm_workers=None):
+    """
+    Initialisiert einen Worker des JobPools: vorwärmen, Lösungscache und Cache der Käfiglayouts
+    anlegen und danach den gemeinsamen Zähler warm_workers (siehe JobPool.ready) erhöhen.
+    """
+    global _solution_cache, _cage_cache
+    warm_up()
+    if cache_counters is not None:
+        _solution_cache = SolutionCache(cache_size, cache_path, cache_counters)
+    if cage_counters is not None:
+        _cage_cache = cage_cache.CageCache(cage_cache_size, cage_cache_bytes, cage_counters)
+    if warm_workers is not None:
+        with warm_workers.get_lock():
+            warm_workers.value += 1
+
+
+def solve_sudoku(dimension: int, sudoku, options=None):
+    """
+    Löst ein Sudoku im Worker-Prozess. Das Sudoku kann als verschachtelte Liste, kompakte
+    Zeichenkette oder uint8-Array übergeben werden, die Lösung kommt in derselben Form zurück;
+    None, wenn es keine Lösung gibt. Ungültige Eingaben lösen ValueError aus, ein erreichtes
+    Zeitlimit aus options SolverTimeLimit.
+    """
+    from sudoku import SudokuSolver
+    from wire import encode_like, to_grid
+
+    solution = SudokuSolver(dimension, to_grid(sudoku, dimension), cache=_solution_cache,
+                            options=options).solve_grid()
+    with phase("encode"):
+        return None if solution is None else encode_like(solution, sudoku)
+
+
+def solve_killer_sudoku(dimension: int, sudoku, cages: list, cage_sums: list, options=None):
+    """Löst ein Killer-Sudoku im Worker-Prozess, Ein- und Ausgabe wie bei solve_sudoku."""
+    from sudoku import KillerSudokuSolver
+    from wire import encode_like, to_grid
+
+    solution = KillerSudokuSolver(dimension, to_grid(sudoku, dimension), cages, cage_sums, options,
+                                  cage_cache=_cage_cache).solve_grid()
+    with phase("encode"):
+        return None if solution is None else encode_like(solution, sudoku)
+
+
+class JobPool:
+    """
+    Führt rechenintensive Aufträge (Lösen, Generieren) in einem Pool vorgewärmter Prozesse aus,
+    damit die Event-Loop von FastAPI nicht am GIL hängt.
+
+    Die Anzahl gleichzeitig angenommener Aufträge ist auf max_pending begrenzt; darüber hinaus wird
+    JobQueueFull ausgelöst. Aufträge, die nach timeout Sekunden nicht fertig sind, werden abgebrochen
+    (noch wartende werden aus der Warteschlange entfernt, laufende laufen zu Ende und ihr Ergebnis
+    wird verworfen) und JobTimeout wird ausgelöst.
+
+    Jeder Worker hält einen Lösungscache mit cache_size Einträgen (0 schaltet ihn ab), optional
+    gemeinsam in der SQLite-Datei cache_path; die Zähler teilen sich alle Worker. Ebenso hält jeder
+    Worker einen Cache für Käfiglayouts von Killer-Sudokus mit höchstens cage_cache_size Einträgen
+    und cage_cache_bytes Bytes (cage_cache.CageCache, 0 Einträge schaltet ihn ab).
+
+    Jeder Auftrag läuft über instrumentation.run_instrumented; mit metrics (instrumentation.Metrics)
+    landen Rechenzeit, Abschnitte und HiGHS-Kennzahlen dort.
+
+    Die Klasse liegt bewusst in beiden Services (backend/sudoku/jobs.py und
+    backend/mastermind/jobs.py), aus demselben Grund wie instrumentation.py: jedes Image bleibt
+    eigenständig. ready, stop, run, _execute und stats sind in beiden gleich, start unterscheidet
+    sich nur in den Argumenten für init_worker; Änderungen daran immer in beiden vornehmen. Nur
+    diese Fassung hat zusätzlich die Caches der Worker und run_many für die Stapel-Endpunkte.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 8, timeout: float = 30.0,
+                 cache_size: int = 10000, cache_path: str | None = None, metrics=None,
+                 cage_cache_size: int = 256, cage_cache_bytes: int = 64 * 2**20):
+        self.workers = workers
+        self.metrics = metrics
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self.cache_counters = shared_counters() if cache_size > 0 else None
+        self.cage_cache_size = cage_cache_size
+        self.cage_cache_bytes = cage_cache_bytes
+        self.cage_counters = cage_cache.shared_counters() if cage_cache_size > 0 else None
+        self._executor = None
+        self.warm_workers = multiprocessing.Value("i", 0)  # Worker, die init_worker abgeschlossen haben
+
+    def start(self, wait: bool = True):
+        """
+        Startet alle Worker sofort, damit der erste Auftrag nicht auf Import und Vorwärmen wartet.
+        Mit wait=False kehrt start gleich zurück; Aufträge warten dann in der Warteschlange, bis
+        ein Worker bereit ist (siehe ready).
+        """
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=init_worker,
+            initargs=(self.cache_counters, self.cache_size, self.cache_path,
+                      self.cage_counters, self.cage_cache_size, self.cage_cache_bytes, self.warm_workers),
+        )
+        futures = [self._executor.submit(os.getpid) for _ in range(self.workers)]
+        if wait:
+            # Die Aufträge können auf bereits warmen Workern laufen: danach noch auf den Zähler warten
+            for future in futures:
+                future.result()
+            while not self.ready():
+                time.sleep(0.01)
+
+    def ready(self) -> bool:
+        """True, sobald jeder Worker sein Vorwärmen abgeschlossen hat (gezählt in init_worker)."""
+        return self._executor is not None and self.warm_workers.value >= self.workers
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn, *args, timeout: float | None = None):
+        """
+        Führt fn(*args) in einem Worker-Prozess aus und wartet asynchron auf das Ergebnis.
+
+        Parameter:
+        - fn: Funktion auf Modulebene (muss sich an den Worker übergeben lassen)
+        - args: Argumente für fn
+        - timeout: Zeitlimit in Sekunden, sonst das Zeitlimit des Pools
+
+        Rückgabe:
+        - Das Ergebnis von fn
+        """
+        if self.pending >= self.max_pending:
+            raise JobQueueFull()
+        return await self._execute(fn, args, timeout)
+
+    async def run_many(self, fn, jobs, timeout: float | None = None):
+        """
+        Führt fn für viele Aufträge parallel aus und liefert die Ergebnisse in der Reihenfolge,
+        in der sie fertig werden.
+
+        Ein Stapel wird nicht wegen einer vollen Warteschlange abgelehnt, hält aber höchstens
+        zwei Aufträge je Worker gleichzeitig offen, damit Einzelanfragen nicht verdrängt werden.
+
+        Parameter:
+        - fn: Funktion auf Modulebene (muss sich an den Worker übergeben lassen)
+        - jobs: Iterable von (Schlüssel, Argumente als Tupel)
+        - timeout: Zeitlimit je Auftrag in Sekunden, sonst das Zeitlimit des Pools
+
+        Rückgabe:
+        - Asynchroner Iterator über (Schlüssel, Ergebnis, Fehler); Fehler ist None oder die Exception
+        """
+        jobs = iter(jobs)
+        running = {}
+
+        def submit_next():
+            for key, args in jobs:
+                running[asyncio.ensure_future(self._execute(fn, args, timeout))] = key
+                return
+
+        try:
+            for _ in range(2 * self.workers):
+                submit_next()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    key = running.pop(task)
+                    submit_next()
+                    try:
+                        yield key, task.result(), None
+                    except Exception as error:
+                        yield key, None, error
+        finally:
+            # Bei Verbindungsabbruch die restlichen Aufträge nicht mehr ausführen
+            for task in running:
+                task.cancel()
+
+    async def _execute(self, fn, args, timeout):
+        self.pending += 1
+        try:
+            start = time.perf_counter()
+            future = self._executor.submit(run_instrumented, fn, *args)
+            try:
+                result, record = await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+                if self.metrics is not None:
+                    self.metrics.record(fn.__name__, record, time.perf_counter() - start)
+                return result
+            except asyncio.TimeoutError:
+                raise JobTimeout()
+            finally:
+                # Bei Zeitüberschreitung oder Verbindungsabbruch den Auftrag nicht mehr starten
+                future.cancel()
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "timeout_seconds": self.timeout,
+            "pending": self.pending,
+        }
+
+    def cache_stats(self) -> dict | None:
+        """Trefferquote und Speicherbedarf des Lösungscaches über alle Worker; None ohne Cache."""
+        if self.cache_counters is None:
+            return None
+        return {"max_entries_per_worker": self.cache_size, **cache_stats(self.cache_counters)}
+
+    def cage_cache_stats(self) -> dict | None:
+        """Trefferquote, Verdrängungen und Speicherbedarf des Caches der Käfiglayouts über alle Worker; None ohne Cache."""
+        if self.cage_counters is None:
+            return None
+        return {"max_entries_per_worker": self.cage_cache_size, "max_bytes_per_worker": self.cage_cache_bytes,
+                **cage_cache.cache_stats(self.cage_counters)}
+
+
+def job_pool_from_environment(metrics=None) -> JobPool:
+    """
+    Erzeugt den Prozesspool aus Umgebungsvariablen:
+    JOB_WORKERS (Standard: Anzahl CPUs), JOB_QUEUE_SIZE (Standard: 4 je Worker),
+    JOB_TIMEOUT (Sekunden, Standard: 30), SOLUTION_CACHE_SIZE (Einträge je Worker, Standard: 10000,
+    0 schaltet den Cache ab), SOLUTION_CACHE_PATH (optionale SQLite-Datei für den Cache),
+    CAGE_CACHE_SIZE (Käfiglayouts je Worker, Standard: 256, 0 schaltet den Cache ab) und
+    CAGE_CACHE_MEMORY (MiB je Worker für die Käfiglayouts, Standard: 64).
+    """
+    workers = int(os.environ.get("JOB_WORKERS", os.cpu_count() or 1))
+    return JobPool(
+        workers=workers,
+        max_pending=int(os.environ.get("JOB_QUEUE_SIZE", 4 * workers)),
+        timeout=float(os.environ.get("JOB_TIMEOUT", "30")),
+        cache_size=int(os.environ.get("SOLUTION_CACHE_SIZE", "10000")),
+        cache_path=os.environ.get("SOLUTION_CACHE_PATH") or None,
+        cage_cache_size=int(os.environ.get("CAGE_CACHE_SIZE", "256")),
+        cage_cache_bytes=int(float(os.environ.get("CAGE_CACHE_MEMORY", "64")) * 2**20),
+        metrics=metrics,
+    )
@@ -0,0 +1,55 @@
+import os
+import resource
+
+MIN_DIMENSION = 2
+MAX_DIMENSION = int(os.environ.get("MAX_DIMENSION", "5"))  # 5 entspricht 25x25
+
+# Sekunden je Solveraufruf, wenn die Anfrage kein time_limit setzt. Liegt unter dem Zeitlimit des
+# JobPools (JOB_TIMEOUT, Standard: 30 s): Der JobPool bricht nur das Warten ab, HiGHS rechnet im
+# Worker weiter, bis dieses Limit greift.
+DEFAULT_TIME_LIMITS = {4: 20.0, 5: 20.0}
+
+# Zusätzlicher Adressraum je Worker in MiB über dem Stand nach dem Vorwärmen (0 schaltet das Limit
+# ab). Der Speicher wächst vor allem mit dem Branch-and-Bound-Baum von HiGHS, nicht mit der
+# Modellgröße (25x25 mit ~9.000 Nichtnullen: über 150 MiB nach 20 s), daher ein Limit zur Laufzeit:
+# Überschreitet ein Auftrag es, meldet HiGHS std::bad_alloc als MemoryError und der Worker bleibt
+# benutzbar. Es begrenzt den Adressraum, nicht RSS; jeder Thread von HiGHS reserviert zusätzlich
+# Stack und Malloc-Arena.
+WORKER_MEMORY_LIMIT = int(os.environ.get("WORKER_MEMORY_LIMIT", "2048"))
+
+
+def check_dimension(s: int):
+    """Löst ValueError aus, wenn der Service Sudokus dieser Dimension nicht annimmt."""
+    if not MIN_DIMENSION <= s <= MAX_DIMENSION:
+        raise ValueError(f"dimension must be between {MIN_DIMENSION} and {MAX_DIMENSION}")
+
+
+def default_time_limit(s: int, options=None) -> float | None:
+    """Das Zeitlimit je Solveraufruf: aus den SolverOptions, sonst DEFAULT_TIME_LIMITS (None: keines)."""
+    if options is not None and options.time_limit is not None:
+        return options.time_limit
+    return DEFAULT_TIME_LIMITS.get(s)
+
+
+def address_space() -> int | None:
+    """Aktueller Adressraum des Prozesses in Bytes (VmSize) oder None außerhalb von Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def apply_memory_limit(headroom_mib: int = WORKER_MEMORY_LIMIT):
+    """Begrenzt den Adressraum des aufrufenden Prozesses auf den aktuellen Stand plus headroom_mib."""
+    current = address_space()
+    if headroom_mib <= 0 or current is None:
+        return
+    limit = current + headroom_mib * 2**20
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
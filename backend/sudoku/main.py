@@ -1,14 +1,47 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+import json
+import logging
+import os
+import time
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-import numpy as np
 
-from sudoku import KillerSudokuGenerator, KillerSudokuSolver, SudokuGenerator, SudokuSolver
+from jobs import JobQueueFull, JobTimeout, job_pool_from_environment, solve_killer_sudoku, solve_sudoku
+from grading import GUESSING
+from instrumentation import configure_logging, service_metrics
+from limits import check_dimension
+from pool import generate_puzzle, pool_from_environment
+from solver_options import SolverOptions, SolverTimeLimit
+from wire import decode_grids, dimension_from_cells, encode_grid, grid_from_rows
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Prozesspool für Lösen und Generieren, damit die Event-Loop nicht blockiert
+    app.state.metrics = service_metrics("sudoku")
+    job_pool = job_pool_from_environment(app.state.metrics)
+    # Die Worker wärmen im Hintergrund vor; bis dahin meldet /health/ready 503, Anfragen warten im Pool
+    job_pool.start(wait=False)
+    app.state.job_pool = job_pool
+    # Rätselvorrat laden und im Hintergrund auffüllen (abschaltbar mit PUZZLE_POOL_ENABLED=0)
+    puzzle_pool = None
+    if os.environ.get("PUZZLE_POOL_ENABLED", "1") != "0":
+        puzzle_pool = pool_from_environment()
+        puzzle_pool.start()
+    app.state.puzzle_pool = puzzle_pool
+    yield
+    if puzzle_pool is not None:
+        puzzle_pool.stop()
+    job_pool.stop()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
@@ -23,55 +56,323 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """Misst jede Anfrage je Endpunkt (Routenmuster statt konkretem Pfad) für /metrics."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    app.state.metrics.observe("request_duration_seconds", time.perf_counter() - start, request.method,
+                              route.path if route is not None else "unmatched", str(response.status_code))
+    return response
+
 class UnsolvedSudoku(BaseModel):
     dimension: int
-    sudoku: list[list[int | None]]
+    sudoku: list[list[int | None]] | str  # Oder kompakt, z.B. 81 Zeichen "53..7...." für 9x9
 
 class UnsolvedKillerSudoku(BaseModel):
     dimension: int
-    sudoku: list[list[int | None]]
+    sudoku: list[list[int | None]] | str
     cages: list[list[int]]  # 2D array with cage indices for each cell
     cageSums: list[int]     # List with the sum for each cage
 
+class BatchUnsolvedSudoku(UnsolvedSudoku):
+    id: int | str | None = None  # Wird in der Antwort zurückgegeben, sonst die Position im Stapel
+
+class BatchUnsolvedKillerSudoku(UnsolvedKillerSudoku):
+    id: int | str | None = None
+
+class SudokuBatch(BaseModel):
+    puzzles: list[BatchUnsolvedSudoku]
+
+class KillerSudokuBatch(BaseModel):
+    puzzles: list[BatchUnsolvedKillerSudoku]
+
+def solver_options(
+    threads: int | None = Query(None, ge=1, description="Threads von HiGHS"),
+    time_limit: float | None = Query(None, gt=0, description="Sekunden je Solveraufruf"),
+    mip_gap: float | None = Query(None, ge=0, description="Relative MIP-Lücke"),
+    presolve: str | None = Query(None, description="'choose', 'on' oder 'off'"),
+    warm_start: bool = Query(False, description="Generieren: bekannte Lösung als Startlösung"),
+    engine: str = Query("auto", description="Lösen: 'auto', 'mip', 'cp' oder 'portfolio'"),
+) -> SolverOptions | None:
+    """Solver-Einstellungen aus den Query-Parametern; None, wenn keine gesetzt ist."""
+    if (threads is None and time_limit is None and mip_gap is None and presolve is None and not warm_start
+            and engine == "auto"):
+        return None
+    try:
+        return SolverOptions(threads, time_limit, mip_gap, presolve, warm_start, engine)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+
+def rating_range(
+    min_rating: int | None = Query(None, ge=1, le=GUESSING[1], description="Kleinste Stufe der Bewertung"),
+    max_rating: int | None = Query(None, ge=1, le=GUESSING[1], description="Größte Stufe der Bewertung"),
+) -> tuple | None:
+    """Bereich der Bewertung (siehe grading.TECHNIQUES) aus den Query-Parametern; None, wenn keiner gesetzt ist."""
+    if min_rating is None and max_rating is None:
+        return None
+    low, high = min_rating or 1, max_rating or GUESSING[1]
+    if low > high:
+        raise HTTPException(status_code=422, detail="min_rating must not exceed max_rating")
+    return low, high
+
+async def run_job(fn, *args):
+    """Führt einen Auftrag im Prozesspool aus und übersetzt Überlast und Zeitüberschreitung in HTTP-Fehler."""
+    try:
+        return await app.state.job_pool.run(fn, *args)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many pending requests")
+    except JobTimeout:
+        raise HTTPException(status_code=504, detail="Request timed out")
+    except SolverTimeLimit as error:
+        raise HTTPException(status_code=504, detail=str(error))
+    except MemoryError:
+        raise HTTPException(status_code=507, detail="Memory limit exceeded")
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+
+def check_request_dimension(dimension: int):
+    """422, wenn der Service Sudokus dieser Dimension nicht annimmt (siehe limits.MAX_DIMENSION)."""
+    try:
+        check_dimension(dimension)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+
+def format_puzzle(puzzle: dict, dimension: int, format: str) -> dict:
+    """Kodiert die Gitter eines generierten Rätsels bei format='compact' als Zeichenketten."""
+    if format != "compact":
+        return puzzle
+    return {
+        **puzzle,
+        "unsolved_sudoku": encode_grid(grid_from_rows(puzzle["unsolved_sudoku"], dimension)),
+        "complete_sudoku": encode_grid(grid_from_rows(puzzle["complete_sudoku"], dimension)),
+    }
+
+async def pop_or_generate(variant: str, dimension: int, difficulty: str, options=None, rating=None) -> dict:
+    """Entnimmt ein Rätsel aus dem Vorrat oder erzeugt es im Prozesspool, wenn der Vorrat leer ist (oder keines passt)."""
+    puzzle_pool = app.state.puzzle_pool
+    puzzle = puzzle_pool.pop(variant, dimension, difficulty, rating) if puzzle_pool is not None else None
+    if puzzle is None:
+        puzzle = await run_job(generate_puzzle, variant, dimension, difficulty, options, rating)
+    return puzzle
+
+def json_response(content, job: str) -> JSONResponse:
+    """JSONResponse, deren Aufbau als Abschnitt 'serialize' des Auftrags job gemessen wird."""
+    with app.state.metrics.timer("phase_duration_seconds", job, "serialize"):
+        return JSONResponse(content=content)
+
+def error_line(key, error: Exception) -> str:
+    if isinstance(error, JobTimeout):
+        detail = "Request timed out"
+    elif isinstance(error, MemoryError):
+        detail = "Memory limit exceeded"
+    else:
+        detail = str(error)
+    return json.dumps({"id": key, "error": detail}) + "\n"
+
+async def stream_results(results, no_solution_detail: str):
+    """Wandelt die Ergebnisse von JobPool.run_many in NDJSON-Zeilen um."""
+    async for key, result, error in results:
+        if error is not None:
+            yield error_line(key, error)
+            continue
+        if result is None:
+            line = {"id": key, "error": no_solution_detail}
+        else:
+            line = {"id": key, "solution": result}
+        yield json.dumps(line) + "\n"
+
+async def stream_puzzles(variant: str, dimension: int, difficulty: str, count: int, format: str, options=None,
+                         rating=None):
+    """Liefert count Rätsel als NDJSON, zuerst aus dem Vorrat, den Rest im Prozesspool erzeugt."""
+    index = 0
+    puzzle_pool = app.state.puzzle_pool
+    while puzzle_pool is not None and index < count:
+        puzzle = puzzle_pool.pop(variant, dimension, difficulty, rating)
+        if puzzle is None:
+            break
+        yield json.dumps({"id": index, **format_puzzle(puzzle, dimension, format)}) + "\n"
+        index += 1
+    jobs = ((key, (variant, dimension, difficulty, options, rating)) for key in range(index, count))
+    async for key, puzzle, error in app.state.job_pool.run_many(generate_puzzle, jobs):
+        if error is not None:
+            yield error_line(key, error)
+        else:
+            yield json.dumps({"id": key, **format_puzzle(puzzle, dimension, format)}) + "\n"
+
 @app.get("/")
-def read_root():
+async def read_root():
     return {"Hello": "World"}
 
+@app.get("/health/live")
+async def get_liveness():
+    """Der Serverprozess läuft und nimmt Anfragen an."""
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def get_readiness():
+    """Bereit, sobald alle Worker des Prozesspools gestartet und vorgewärmt sind; vorher 503."""
+    if not app.state.job_pool.ready():
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready"}
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Kennzahlen im Textformat von Prometheus: Dauer der Anfragen je Endpunkt, Rechen- und
+    Wartezeit der Aufträge, ihre Abschnitte (cages, presolve, build, solve, extract, encode, serialize)
+    und die HiGHS-Kennzahlen (Knoten, Iterationen, Rechenzeit).
+    """
+    return Response(content=app.state.metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/jobs/stats")
+async def get_job_stats():
+    """Auslastung des Prozesspools."""
+    return app.state.job_pool.stats()
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Trefferquote und Speicherbedarf des Lösungscaches."""
+    stats = app.state.job_pool.cache_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Solution cache is disabled")
+    return stats
+
+@app.get("/cache/cages/stats")
+async def get_cage_cache_stats():
+    """Trefferquote, Verdrängungen und Speicherbedarf des Caches der Käfiglayouts (Killer-Sudokus)."""
+    stats = app.state.job_pool.cage_cache_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Cage cache is disabled")
+    return stats
+
+@app.get("/pool/stats")
+async def get_pool_stats():
+    """Vorratstiefe, Treffer/Fehlgriffe und Auffüllrate des Rätselvorrats."""
+    if app.state.puzzle_pool is None:
+        raise HTTPException(status_code=404, detail="Puzzle pool is disabled")
+    return app.state.puzzle_pool.stats()
+
 @app.get("/sudoku/{dimension}")
-def get_sudoku(dimension: int, difficulty: str = "normal"):
+async def get_sudoku(dimension: int, difficulty: str = "normal", format: str = "json",
+                     options: SolverOptions | None = Depends(solver_options), rating: tuple | None = Depends(rating_range)):
     """
     Erzeugt ein Sudoku-Rätsel mit der angegebenen Dimension und Schwierigkeitsgrad.
     
     Parameter:
-    - dimension: Die Dimension des Sudokus (2 für 4x4, 3 für 9x9)
+    - dimension: Die Dimension des Sudokus (2 für 4x4, 3 für 9x9 bis 5 für 25x25, siehe limits.MAX_DIMENSION)
     - difficulty: Der Schwierigkeitsgrad des Sudokus ('easy', 'normal', 'hard')
+    - format: 'json' (verschachtelte Listen) oder 'compact' (ein Zeichen pro Zelle, '.' für leer)
+    - threads, time_limit, mip_gap, presolve, warm_start: Solver-Einstellungen, siehe SolverOptions
+      (time_limit gilt je Eindeutigkeitsprüfung)
+    - min_rating, max_rating: Bereich der Bewertung (1 nur Singles ... 7 Ausprobieren) statt des
+      Bereichs, den der Schwierigkeitsgrad vorgibt
     
     Rückgabe:
-    - Das unvollständige Sudoku-Rätsel und die vollständige Lösung
+    - Das unvollständige Sudoku-Rätsel, die vollständige Lösung und die Bewertung
+      (rating: Stufe, technique: schwierigste nötige Technik)
     """
     # Überprüfung des Schwierigkeitsgrads
     if difficulty not in ["easy", "normal", "hard"]:
         difficulty = "normal"
+    check_request_dimension(dimension)
         
-    sudoku_generator = SudokuGenerator(dimension)
-    unsolved_sudoku, complete_sudoku = sudoku_generator.get_incomplete_and_complete_sudoku(difficulty)
-    return JSONResponse(content={"unsolved_sudoku": unsolved_sudoku, "complete_sudoku": complete_sudoku})
+    puzzle = await pop_or_generate("sudoku", dimension, difficulty, options, rating)
+    return json_response(format_puzzle(puzzle, dimension, format), "generate_puzzle")
+
+@app.get("/sudoku/{dimension}/batch")
+async def get_sudoku_batch(dimension: int, count: int = Query(10, ge=1, le=1000), difficulty: str = "normal", format: str = "json",
+                           options: SolverOptions | None = Depends(solver_options), rating: tuple | None = Depends(rating_range)):
+    """
+    Erzeugt mehrere Sudoku-Rätsel und streamt sie als NDJSON, sobald sie fertig sind.
+    
+    Parameter:
+    - dimension: Die Dimension des Sudokus (2 für 4x4, 3 für 9x9 bis 5 für 25x25, siehe limits.MAX_DIMENSION)
+    - count: Anzahl der Rätsel
+    - difficulty: Der Schwierigkeitsgrad des Sudokus ('easy', 'normal', 'hard')
+    - format: 'json' (verschachtelte Listen) oder 'compact' (ein Zeichen pro Zelle, '.' für leer)
+    - min_rating, max_rating: Bereich der Bewertung, siehe get_sudoku
+    
+    Rückgabe:
+    - Eine Zeile je Rätsel mit id, unsolved_sudoku, complete_sudoku, rating und technique (oder error)
+    """
+    if difficulty not in ["easy", "normal", "hard"]:
+        difficulty = "normal"
+    check_request_dimension(dimension)
+
+    return StreamingResponse(stream_puzzles("sudoku", dimension, difficulty, count, format, options, rating), media_type="application/x-ndjson")
+
+@app.post("/sudoku/solve/batch")
+async def post_sudoku_solution_batch(batch: SudokuBatch, options: SolverOptions | None = Depends(solver_options)):
+    """
+    Löst mehrere Sudokus parallel und streamt die Lösungen als NDJSON in der Reihenfolge,
+    in der sie fertig werden.
+    
+    Rückgabe:
+    - Eine Zeile je Sudoku mit id und solution (oder error)
+    """
+    jobs = (
+        (index if sudoku.id is None else sudoku.id, (sudoku.dimension, sudoku.sudoku, options))
+        for index, sudoku in enumerate(batch.puzzles)
+    )
+    results = app.state.job_pool.run_many(solve_sudoku, jobs)
+    return StreamingResponse(stream_results(results, "Sudoku has no solution"), media_type="application/x-ndjson")
+
+@app.post("/sudoku/solve/raw")
+async def post_sudoku_solution_raw(request: Request, dimension: int | None = None,
+                                   options: SolverOptions | None = Depends(solver_options)):
+    """
+    Löst ein oder mehrere Sudokus im Binärformat (application/octet-stream).
+    
+    Parameter:
+    - Body: Hintereinander liegende Gitter, ein Byte pro Zelle zeilenweise, 0 für leere Zellen
+    - dimension: Die Dimension des Sudokus (nur bei mehreren Gittern nötig)
+    
+    Rückgabe:
+    - Die Lösungen im selben Format und in derselben Reihenfolge; Gitter ohne Lösung (oder mit
+      Zeitüberschreitung oder überschrittenem Speicherlimit) bestehen aus Nullen
+    """
+    if dimension is not None:
+        check_request_dimension(dimension)
+    try:
+        grids = decode_grids(await request.body(), dimension)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+    s = dimension_from_cells(grids[0].size)
+    check_request_dimension(s)
+
+    solutions = bytearray(grids.nbytes)
+    cells = grids[0].size
+    jobs = ((index, (s, grid, options)) for index, grid in enumerate(grids))
+    async for index, solution, error in app.state.job_pool.run_many(solve_sudoku, jobs):
+        if isinstance(error, ValueError):
+            raise HTTPException(status_code=422, detail=f"Grid {index}: {error}")
+        if error is not None and not isinstance(error, (JobTimeout, SolverTimeLimit, MemoryError)):
+            logger.error("Solving grid %d failed: %r", index, error)
+            raise HTTPException(status_code=500, detail=f"Grid {index}: solver failed")
+        if solution is not None:
+            solutions[index * cells:(index + 1) * cells] = solution.tobytes()
+    return Response(content=bytes(solutions), media_type="application/octet-stream")
 
 @app.post("/sudoku/solve")
-def post_sudoku_solution(sudoku: UnsolvedSudoku):
-    sudoku_solver = SudokuSolver(sudoku.dimension, sudoku.sudoku)
-    solution = sudoku_solver.solve_sudoku()
-    print(solution)
-    return JSONResponse(content=solution)
+async def post_sudoku_solution(sudoku: UnsolvedSudoku, options: SolverOptions | None = Depends(solver_options)):
+    solution = await run_job(solve_sudoku, sudoku.dimension, sudoku.sudoku, options)
+    logger.debug("Solution: %s", solution)
+    if solution is None:
+        raise HTTPException(status_code=422, detail="Sudoku has no solution")
+    return json_response(solution, "solve_sudoku")
 
 @app.get("/killer-sudoku/{dimension}")
-def get_killer_sudoku(dimension: int, difficulty: str = "normal"):
+async def get_killer_sudoku(dimension: int, difficulty: str = "normal", format: str = "json",
+                            options: SolverOptions | None = Depends(solver_options)):
     """
     Erzeugt ein Killer-Sudoku-Rätsel mit der angegebenen Dimension und Schwierigkeitsgrad.
     
     Parameter:
-    - dimension: Die Dimension des Sudokus (2 für 4x4, 3 für 9x9)
+    - dimension: Die Dimension des Sudokus (2 für 4x4, 3 für 9x9 bis 5 für 25x25, siehe limits.MAX_DIMENSION)
     - difficulty: Der Schwierigkeitsgrad des Sudokus ('easy', 'normal', 'hard')
+    - format: 'json' (verschachtelte Listen) oder 'compact' (ein Zeichen pro Zelle, '.' für leer)
     
     Rückgabe:
     - Das Killer-Sudoku-Rätsel mit Käfigen und Summen
@@ -79,31 +380,49 @@ def get_killer_sudoku(dimension: int, difficulty: str = "normal"):
     # Überprüfung des Schwierigkeitsgrads
     if difficulty not in ["easy", "normal", "hard"]:
         difficulty = "normal"
+    check_request_dimension(dimension)
         
-    killer_sudoku_generator = KillerSudokuGenerator(dimension)
-    unsolved_sudoku, complete_sudoku, cages = killer_sudoku_generator.get_killer_sudoku(difficulty)
+    puzzle = await pop_or_generate("killer-sudoku", dimension, difficulty, options)
+    return json_response(format_puzzle(puzzle, dimension, format), "generate_puzzle")
+
+@app.get("/killer-sudoku/{dimension}/batch")
+async def get_killer_sudoku_batch(dimension: int, count: int = Query(10, ge=1, le=1000), difficulty: str = "normal", format: str = "json",
+                                  options: SolverOptions | None = Depends(solver_options)):
+    """
+    Erzeugt mehrere Killer-Sudoku-Rätsel und streamt sie als NDJSON, sobald sie fertig sind.
     
-    # Käfige für die JSON-Serialisierung vorbereiten
-    serializable_cages = []
-    for cage_cells, cage_sum in cages:
-        serializable_cages.append({
-            "cells": cage_cells,
-            "sum": cage_sum
-        })
+    Rückgabe:
+    - Eine Zeile je Rätsel mit id, unsolved_sudoku, complete_sudoku und cages (oder error)
+    """
+    if difficulty not in ["easy", "normal", "hard"]:
+        difficulty = "normal"
+    check_request_dimension(dimension)
+
+    return StreamingResponse(stream_puzzles("killer-sudoku", dimension, difficulty, count, format, options), media_type="application/x-ndjson")
+
+@app.post("/killer-sudoku/solve/batch")
+async def post_killer_sudoku_solution_batch(batch: KillerSudokuBatch, options: SolverOptions | None = Depends(solver_options)):
+    """
+    Löst mehrere Killer-Sudokus parallel und streamt die Lösungen als NDJSON in der Reihenfolge,
+    in der sie fertig werden.
     
-    return JSONResponse(content={
-        "unsolved_sudoku": unsolved_sudoku, 
-        "complete_sudoku": complete_sudoku,
-        "cages": serializable_cages
-    })
+    Rückgabe:
+    - Eine Zeile je Killer-Sudoku mit id und solution (oder error)
+    """
+    jobs = (
+        (index if sudoku.id is None else sudoku.id, (sudoku.dimension, sudoku.sudoku, sudoku.cages, sudoku.cageSums, options))
+        for index, sudoku in enumerate(batch.puzzles)
+    )
+    results = app.state.job_pool.run_many(solve_killer_sudoku, jobs)
+    return StreamingResponse(stream_results(results, "Killer sudoku has no solution"), media_type="application/x-ndjson")
 
 @app.post("/killer-sudoku/solve")
-def post_killer_sudoku_solution(sudoku: UnsolvedKillerSudoku):
+async def post_killer_sudoku_solution(sudoku: UnsolvedKillerSudoku, options: SolverOptions | None = Depends(solver_options)):
     """
     Löst ein Killer-Sudoku mit den angegebenen Käfigen und Summen.
     
     Parameter:
-    - dimension: Die Dimension des Sudokus (2 für 4x4, 3 für 9x9)
+    - dimension: Die Dimension des Sudokus (2 für 4x4, 3 für 9x9 bis 5 für 25x25, siehe limits.MAX_DIMENSION)
     - sudoku: Das teilweise gefüllte Sudoku
     - cages: 2D-Array mit Käfig-Indizes für jede Zelle
     - cageSums: Liste mit den Summen für jeden Käfig
@@ -111,14 +430,17 @@ def post_killer_sudoku_solution(sudoku: UnsolvedKillerSudoku):
     Rückgabe:
     - Die Lösung des Killer-Sudokus
     """
-    killer_sudoku_solver = KillerSudokuSolver(
+    solution = await run_job(
+        solve_killer_sudoku,
         sudoku.dimension, 
         sudoku.sudoku, 
-        np.array(sudoku.cages), 
-        sudoku.cageSums
+        sudoku.cages, 
+        sudoku.cageSums,
+        options,
     )
-    solution = killer_sudoku_solver.solve_sudoku()
-    return JSONResponse(content=solution)
+    if solution is None:
+        raise HTTPException(status_code=422, detail="Killer sudoku has no solution")
+    return json_response(solution, "solve_killer_sudoku")
 
 if __name__ == "__main__":
     # Starte Uvicorn auf Port 8081
@@ -0,0 +1,277 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from grading import grade
+from jobs import warm_up
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = ("sudoku", "killer-sudoku")
+DIFFICULTIES = ("easy", "normal", "hard")
+# Schlägt das Auffüllen eines Vorrats wiederholt fehl, wartet der Thread vor dem nächsten Versuch
+# 2, 4, 8, ... Sekunden, höchstens REFILL_MAX_BACKOFF
+REFILL_MAX_BACKOFF = 300.0
+
+
+def generate_puzzle(variant: str, dimension: int, difficulty: str, options=None, rating=None) -> dict:
+    """
+    Erzeugt ein Rätsel und gibt es in der Form zurück, in der es die API ausliefert.
+
+    Parameter:
+    - variant: 'sudoku' oder 'killer-sudoku'
+    - dimension: Die Dimension des Sudokus
+    - difficulty: 'easy', 'normal' oder 'hard'
+    - options: Optionale SolverOptions für HiGHS
+    - rating: Optionaler Bereich (kleinste, größte Stufe) der Bewertung statt des Schwierigkeitsgrads
+
+    Rückgabe:
+    - Beim normalen Sudoku mit Bewertung (rating: Stufe, technique: schwierigste Technik),
+      siehe grading.grade; Killer-Sudokus werden nicht bewertet
+    """
+    from sudoku import KillerSudokuGenerator, SudokuGenerator
+
+    if variant == "sudoku":
+        generator = SudokuGenerator(dimension, options)
+        unsolved_sudoku, complete_sudoku = generator.get_incomplete_and_complete_sudoku(difficulty, rating)
+        level, technique = generator.rating
+        return {"unsolved_sudoku": unsolved_sudoku, "complete_sudoku": complete_sudoku,
+                "rating": level, "technique": technique}
+
+    unsolved_sudoku, complete_sudoku, cages = KillerSudokuGenerator(dimension, options).get_killer_sudoku(difficulty)
+    # Käfige für die JSON-Serialisierung vorbereiten
+    serializable_cages = [{"cells": cage_cells, "sum": cage_sum} for cage_cells, cage_sum in cages]
+    return {
+        "unsolved_sudoku": unsolved_sudoku,
+        "complete_sudoku": complete_sudoku,
+        "cages": serializable_cages,
+    }
+
+
+class PuzzlePool:
+    """
+    Vorrat an fertig generierten Rätseln je (Variante, Dimension, Schwierigkeit).
+
+    Rätsel werden aus einer In-Memory-Queue in O(1) entnommen und zusätzlich in SQLite
+    gespeichert, damit der Vorrat einen Neustart übersteht. Ein Hintergrund-Thread füllt
+    jeden Vorrat, der unter low_watermark fällt, über einen Prozesspool bis high_watermark auf.
+    Entnommene Rätsel löscht derselbe Thread gesammelt aus SQLite, damit pop auf der Event-Loop
+    nicht auf die Festplatte wartet; schlägt das Erzeugen für einen Vorrat fehl, setzt er ihn mit
+    wachsender Pause aus.
+
+    Die Bewertung (grading.grade) wird mit jedem Rätsel gespeichert, sodass pop nach ihr filtern
+    kann, ohne Rätsel erneut zu lösen; Einträge aus älteren Datenbanken werden beim Laden einmal
+    bewertet.
+    """
+
+    def __init__(self, path: str, keys, low_watermark: int = 5, high_watermark: int = 20, workers: int = 2):
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.workers = workers
+        self._lock = threading.Lock()  # Queues und Zähler; pop wartet nie auf SQLite
+        self._db_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._refilled = set(keys)  # Nur diese Vorräte werden im Hintergrund aufgefüllt
+        self._queues = {}
+        self._pending = {}
+        self._stats = {}
+        self._failures = {}  # Fehlgeschlagene Auffüllrunden in Folge je Vorrat
+        self._retry_at = {}  # Frühester nächster Auffüllversuch (time.monotonic) je Vorrat
+        self._taken = []  # Entnommene, noch nicht aus SQLite gelöschte Zeilen
+        self._started_at = time.monotonic()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS puzzles ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, variant TEXT, dimension INTEGER, difficulty TEXT, payload TEXT, "
+            "rating INTEGER)"
+        )
+        if "rating" not in [column[1] for column in self._db.execute("PRAGMA table_info(puzzles)")]:
+            self._db.execute("ALTER TABLE puzzles ADD COLUMN rating INTEGER")
+        self._db.commit()
+        for key in keys:
+            self._register(key)
+        for row_id, variant, dimension, difficulty, payload, rating in self._db.execute(
+            "SELECT id, variant, dimension, difficulty, payload, rating FROM puzzles ORDER BY id"
+        ).fetchall():
+            if rating is None and variant == "sudoku":
+                rating, payload = self._grade_stored(row_id, dimension, payload)
+            self._register((variant, dimension, difficulty))
+            self._queues[(variant, dimension, difficulty)].append((row_id, payload, rating))
+        self._db.commit()
+
+        self._executor = None
+        self._thread = None
+
+    def _grade_stored(self, row_id: int, dimension: int, payload: str):
+        """Bewertet ein gespeichertes Rätsel ohne Bewertung; Rückgabe: (Stufe, neue Payload)."""
+        puzzle = json.loads(payload)
+        puzzle["rating"], puzzle["technique"] = grade(puzzle["unsolved_sudoku"], dimension)
+        payload = json.dumps(puzzle)
+        self._db.execute("UPDATE puzzles SET rating = ?, payload = ? WHERE id = ?", (puzzle["rating"], payload, row_id))
+        return puzzle["rating"], payload
+
+    def _register(self, key):
+        if key not in self._queues:
+            self._queues[key] = deque()
+            self._pending[key] = 0
+            self._failures[key] = 0
+            self._retry_at[key] = 0.0
+            self._stats[key] = {"hits": 0, "misses": 0, "generated": 0, "failed": 0}
+
+    def start(self):
+        """Startet den Prozesspool und den Thread, der die Vorräte auffüllt."""
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up)
+        self._thread = threading.Thread(target=self._refill_loop, name="puzzle-pool-refill", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._delete_taken()
+        with self._db_lock:
+            self._db.close()
+
+    def pop(self, variant: str, dimension: int, difficulty: str, rating=None):
+        """
+        Entnimmt ein Rätsel aus dem Vorrat.
+
+        Parameter:
+        - rating: Optionaler Bereich (kleinste, größte Stufe); dann das älteste Rätsel, dessen
+          gespeicherte Bewertung darin liegt (unbewertete Rätsel passen nie)
+
+        Rückgabe:
+        - Das Rätsel (wie generate_puzzle) oder None, wenn der Vorrat leer ist oder keines passt
+        """
+        key = (variant, dimension, difficulty)
+        with self._lock:
+            self._register(key)
+            queue = self._queues[key]
+            position = 0
+            if rating is not None:
+                low, high = rating
+                position = next((i for i, entry in enumerate(queue)
+                                 if entry[2] is not None and low <= entry[2] <= high), len(queue))
+            if position == len(queue):
+                self._stats[key]["misses"] += 1
+                return None
+            row_id, payload, _ = queue[position]
+            del queue[position]
+            self._stats[key]["hits"] += 1
+            self._taken.append(row_id)
+            if len(queue) < self.low_watermark:
+                self._wakeup.set()
+        return json.loads(payload)
+
+    def stats(self) -> dict:
+        """Vorratstiefe, Verteilung der Bewertungen, Treffer/Fehlgriffe und Auffüllrate je Vorrat."""
+        uptime = time.monotonic() - self._started_at
+        with self._lock:
+            pools = [
+                {
+                    "variant": variant,
+                    "dimension": dimension,
+                    "difficulty": difficulty,
+                    "depth": len(self._queues[(variant, dimension, difficulty)]),
+                    "pending": self._pending[(variant, dimension, difficulty)],
+                    "ratings": dict(sorted(Counter(rating for _, _, rating in self._queues[(variant, dimension, difficulty)]
+                                                   if rating is not None).items())),
+                    **stats,
+                }
+                for (variant, dimension, difficulty), stats in self._stats.items()
+            ]
+        generated = sum(pool["generated"] for pool in pools)
+        return {
+            "low_watermark": self.low_watermark,
+            "high_watermark": self.high_watermark,
+            "workers": self.workers,
+            "uptime_seconds": uptime,
+            "refill_rate_per_second": generated / uptime if uptime > 0 else 0.0,
+            "pools": pools,
+        }
+
+    def _delete_taken(self):
+        """Löscht die seit dem letzten Aufruf entnommenen Rätsel in einer Transaktion aus SQLite."""
+        with self._lock:
+            taken, self._taken = self._taken, []
+        if taken:
+            with self._db_lock:
+                self._db.executemany("DELETE FROM puzzles WHERE id = ?", [(row_id,) for row_id in taken])
+                self._db.commit()
+
+    def _refill_loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=1.0)
+            self._wakeup.clear()
+            self._delete_taken()
+            now = time.monotonic()
+            with self._lock:
+                jobs = []
+                for key, queue in self._queues.items():
+                    if key not in self._refilled or now < self._retry_at[key]:
+                        continue
+                    depth = len(queue) + self._pending[key]
+                    if len(queue) < self.low_watermark and depth < self.high_watermark:
+                        jobs.extend([key] * (self.high_watermark - depth))
+                        self._pending[key] = self.high_watermark - len(queue)
+            for key in jobs:
+                future = self._executor.submit(generate_puzzle, *key)
+                future.add_done_callback(lambda f, key=key: self._store(key, f))
+
+    def _store(self, key, future):
+        with self._lock:
+            self._pending[key] -= 1
+            if future.cancelled() or self._stopped.is_set():
+                return
+            if future.exception() is not None:
+                self._stats[key]["failed"] += 1
+                # Die Aufträge einer Runde scheitern meist gemeinsam: nur der erste verlängert die Pause
+                if time.monotonic() >= self._retry_at[key]:
+                    self._failures[key] += 1
+                    backoff = min(2.0 ** self._failures[key], REFILL_MAX_BACKOFF)
+                    self._retry_at[key] = time.monotonic() + backoff
+                    logger.error("Error generating puzzle %s: %s (next attempt in %.0f s)",
+                                 key, future.exception(), backoff)
+                return
+            self._failures[key] = 0
+        puzzle = future.result()
+        payload = json.dumps(puzzle)
+        with self._db_lock:
+            if self._stopped.is_set():
+                return
+            cursor = self._db.execute(
+                "INSERT INTO puzzles (variant, dimension, difficulty, payload, rating) VALUES (?, ?, ?, ?, ?)",
+                (*key, payload, puzzle.get("rating")),
+            )
+            self._db.commit()
+        with self._lock:
+            self._queues[key].append((cursor.lastrowid, payload, puzzle.get("rating")))
+            self._stats[key]["generated"] += 1
+
+
+def pool_from_environment() -> PuzzlePool:
+    """
+    Erzeugt den Rätselvorrat aus Umgebungsvariablen:
+    PUZZLE_POOL_PATH, PUZZLE_POOL_LOW, PUZZLE_POOL_HIGH, PUZZLE_POOL_WORKERS und
+    PUZZLE_POOL_DIMENSIONS (kommagetrennt, vorab gefüllte Dimensionen).
+    """
+    dimensions = [int(d) for d in os.environ.get("PUZZLE_POOL_DIMENSIONS", "2,3").split(",") if d]
+    keys = [(variant, dimension, difficulty)
+            for variant in VARIANTS for dimension in dimensions for difficulty in DIFFICULTIES]
+    return PuzzlePool(
+        os.environ.get("PUZZLE_POOL_PATH", "puzzle_pool.sqlite3"),
+        keys,
+        low_watermark=int(os.environ.get("PUZZLE_POOL_LOW", "5")),
+        high_watermark=int(os.environ.get("PUZZLE_POOL_HIGH", "20")),
+        workers=int(os.environ.get("PUZZLE_POOL_WORKERS", "2")),
+    )
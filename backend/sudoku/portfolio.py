@@ -0,0 +1,133 @@
+import logging
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+
+from solver_options import SolverTimeLimit
+
+logger = logging.getLogger(__name__)
+
+# Versuche des Portfolios: (Name, Engine, zusätzliche HiGHS-Parameter). Die Laufzeit von HiGHS auf
+# schweren 16x16- und Killer-Rätseln hängt stark vom Zufall ab (Reihenfolge im Branch-and-Bound,
+# Heuristiken); "cp" ist auf normalen Sudokus fast immer schneller, auf Killer-Sudokus ab 16x16
+# meist langsamer. Der erste Versuch ist immer die Engine, die "auto" wählen würde.
+PORTFOLIO = (
+    ("cp", "cp", {}),
+    ("mip", "mip", {}),
+    ("mip-seed-1", "mip", {"random_seed": 1, "mip_heuristic_effort": 0.3}),
+    ("mip-seed-2", "mip", {"random_seed": 2}),
+    ("mip-seed-3", "mip", {"random_seed": 3, "mip_heuristic_effort": 0.1}),
+)
+
+
+def _usable_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Gleichzeitige Versuche je Anfrage (Standard: die nutzbaren CPUs). Auf einem Kern teilen sich die
+# Versuche die Rechenzeit, jeder wird entsprechend langsamer; mit 1 läuft nur der erste Versuch,
+# ohne eigenen Prozess. Bei mehreren Workern im JobPool entsprechend kleiner wählen.
+PORTFOLIO_SIZE = int(os.environ.get("PORTFOLIO_SIZE", "0")) or _usable_cpus()
+
+# Sekunden, die nach dem Zeitlimit noch auf Versuche gewartet wird (Aufbau des Modells, Prozessstart)
+GRACE_SECONDS = 1.0
+
+
+def portfolio_members(primary: str, options=None, size: int = PORTFOLIO_SIZE) -> list:
+    """
+    Die Versuche für eine Anfrage: zuerst die Engine primary ohne weitere Parameter, dann die
+    übrigen aus PORTFOLIO, insgesamt höchstens size. Laufen mehrere Versuche, rechnet jeder
+    Versuch von HiGHS mit einem Thread, sofern die SolverOptions keine Anzahl vorgeben.
+
+    Rückgabe:
+    - Liste von (Name, Engine, HiGHS-Parameter)
+    """
+    candidates = [(primary, primary, {})] + [member for member in PORTFOLIO if member[0] != primary]
+    members = []
+    for name, engine, parameters in candidates[:max(size, 1)]:
+        if engine == "mip" and size > 1 and (options is None or options.threads is None):
+            parameters = {"threads": 1, **parameters}
+        members.append((name, engine, parameters))
+    return members
+
+
+def solve_portfolio(solver, members: list, time_limit: float | None = None):
+    """
+    Startet die Versuche gleichzeitig in eigenen Prozessen (fork des Workers, der Zustand des
+    Solvers nach der Propagation wird übernommen) und liefert das erste bewiesene Ergebnis: eine
+    Lösung oder den Nachweis, dass es keine gibt. Die übrigen Versuche werden beendet.
+
+    Parameter:
+    - solver: Ein SudokuSolver ohne Modell (siehe SudokuSolver.solve_with)
+    - members: Versuche aus portfolio_members
+    - time_limit: Sekunden, die jeder Versuch rechnen darf (None: unbegrenzt)
+
+    Rückgabe:
+    - Die Lösung als uint8-Array der Form (s^2, s^2) oder None, wenn das Sudoku keine Lösung hat;
+      SolverTimeLimit, wenn kein Versuch innerhalb des Zeitlimits fertig wird. Scheitern alle
+      Versuche mit einem Fehler, wird der erste Fehler ausgelöst.
+    """
+    if len(members) == 1:
+        _, engine, parameters = members[0]
+        return solver.solve_with(engine, parameters)
+    context = multiprocessing.get_context("fork")
+    deadline = None if time_limit is None else time.monotonic() + time_limit + GRACE_SECONDS
+    attempts = {}
+    try:
+        for name, engine, parameters in members:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_attempt, args=(solver, engine, parameters, sender), daemon=True)
+            process.start()
+            sender.close()
+            attempts[receiver] = (name, process)
+
+        errors, timed_out = [], False
+        pending = list(attempts)
+        while pending:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            ready = wait(pending, timeout=remaining)
+            if not ready:
+                timed_out = True
+                break
+            for receiver in ready:
+                pending.remove(receiver)
+                name = attempts[receiver][0]
+                try:
+                    status, value = receiver.recv()
+                except EOFError:
+                    status, value = "error", RuntimeError(f"Portfolio attempt {name} exited without a result")
+                if status == "solved":
+                    logger.debug("Portfolio attempt %s won", name)
+                    return value
+                if status == "timeout":
+                    timed_out = True
+                else:
+                    logger.warning("Portfolio attempt %s failed: %r", name, value)
+                    errors.append(value)
+        if errors and not timed_out:
+            raise errors[0]
+        raise SolverTimeLimit(time_limit)
+    finally:
+        for receiver, (_, process) in attempts.items():
+            if process.is_alive():
+                process.kill()
+            process.join()
+            receiver.close()
+
+
+def _attempt(solver, engine: str, parameters: dict, connection):
+    """Ein Versuch im Kindprozess; sendet ('solved', Lösung oder None), ('timeout', None) oder ('error', Exception)."""
+    try:
+        result = solver.solve_with(engine, parameters)
+    except SolverTimeLimit:
+        connection.send(("timeout", None))
+    except Exception as error:
+        connection.send(("error", error))
+    else:
+        connection.send(("solved", result))
+    finally:
+        connection.close()
@@ -0,0 +1,121 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def base_constraint_matrix(s: int) -> np.ndarray:
+    """
+    Liefert die Grundbedingungen eines Sudokus der Dimension s als dünn besetzte Matrix.
+
+    Jede Bedingung hat die Form "Summe von genau s^2 Variablen = 1" mit Koeffizient 1,
+    daher wird die Matrix als Array der Spaltenindizes pro Zeile gespeichert
+    (Variable (i, j, k) hat den Index (i*s^2 + j)*s^2 + k). Die Matrix wird pro Dimension
+    einmal je Prozess berechnet und danach wiederverwendet.
+
+    Parameter:
+    - s: Die Dimension des Sudokus
+
+    Rückgabe:
+    - Ein schreibgeschütztes int32-Array der Form (4*s^4, s^2): Zeilen, Spalten, Zellen, Blöcke
+    """
+    n = s**2
+    idx = np.arange(n**3, dtype=np.int32).reshape(n, n, n)
+    rows = idx.transpose(0, 2, 1).reshape(n * n, n)     # Zeile i, Ziffer k
+    columns = idx.transpose(1, 2, 0).reshape(n * n, n)  # Spalte j, Ziffer k
+    cells = idx.reshape(n * n, n)                       # Zelle (i, j)
+    boxes = idx.reshape(s, s, s, s, n).transpose(0, 2, 4, 1, 3).reshape(n * n, n)  # Block (g, h), Ziffer k
+    matrix = np.concatenate([rows, columns, cells, boxes])
+    matrix.setflags(write=False)
+    return matrix
+
+
+@lru_cache(maxsize=None)
+def variable_constraints(s: int) -> np.ndarray:
+    """
+    Umkehrung der Grundbedingungsmatrix: für jede Variable (i, j, k) die vier Bedingungen
+    (Zeile, Spalte, Zelle, Block), in denen sie vorkommt.
+
+    Rückgabe:
+    - Ein schreibgeschütztes int32-Array der Form (s^6, 4)
+    """
+    matrix = base_constraint_matrix(s)
+    order = np.argsort(matrix.ravel(), kind="stable")
+    constraints = (order // matrix.shape[1]).astype(np.int32).reshape(s**6, 4)
+    constraints.setflags(write=False)
+    return constraints
+
+
+def candidates_from_grid(sudoku, s: int) -> np.ndarray:
+    """
+    Erzeugt das Kandidatengitter für ein (teilweise) gefülltes Sudoku.
+
+    Parameter:
+    - sudoku: s^2 x s^2 Gitter mit Ziffern 1..s^2 und None (oder 0) für leere Zellen,
+      als verschachtelte Liste oder NumPy-Array
+    - s: Die Dimension des Sudokus
+
+    Rückgabe:
+    - Bool-Array der Form (s^2, s^2, s^2); Eintrag [i, j, k] ist True, wenn Ziffer k+1 in Zelle (i, j) möglich ist
+    """
+    n = s**2
+    if isinstance(sudoku, np.ndarray):
+        grid = sudoku.astype(np.int64)
+    else:
+        grid = np.array([[value or 0 for value in row] for row in sudoku], dtype=np.int64)
+    candidates = np.ones((n, n, n), dtype=bool)
+    i, j = np.nonzero(grid)
+    candidates[i, j, :] = False
+    candidates[i, j, grid[i, j] - 1] = True
+    return candidates
+
+
+def propagate(candidates: np.ndarray, s: int):
+    """
+    Reduziert das Kandidatengitter mit Naked und Hidden Singles bis zum Fixpunkt.
+
+    Jede Grundbedingung (Zeile/Spalte/Block je Ziffer und jede Zelle) verlangt genau eine
+    gesetzte Variable. Bleibt in einer Bedingung nur ein Kandidat übrig, ist er festgelegt
+    (Zelle: Naked Single, Einheit: Hidden Single), und alle anderen Kandidaten in seinen
+    Bedingungen werden gestrichen.
+
+    Parameter:
+    - candidates: Bool-Array der Form (s^2, s^2, s^2), siehe candidates_from_grid
+    - s: Die Dimension des Sudokus
+
+    Rückgabe:
+    - (candidates, fixed, consistent): reduziertes Kandidatengitter, Bool-Array der
+      festgelegten Variablen und ob kein Widerspruch gefunden wurde
+    """
+    matrix = base_constraint_matrix(s)
+    var_constraints = variable_constraints(s)
+    shape = candidates.shape
+    candidates = candidates.ravel().copy()
+    fixed = np.zeros_like(candidates)
+    satisfied = np.zeros(matrix.shape[0], dtype=bool)
+
+    while True:
+        open_rows = matrix[~satisfied]
+        counts = candidates[open_rows].sum(axis=1)
+        if (counts == 0).any():
+            return candidates.reshape(shape), fixed.reshape(shape), False
+
+        singles = open_rows[counts == 1]
+        if len(singles) == 0:
+            return candidates.reshape(shape), fixed.reshape(shape), True
+
+        new = np.unique(singles[candidates[singles]])
+        rows = var_constraints[new].ravel()
+        # Zwei neue Festlegungen in derselben Bedingung sind ein Widerspruch
+        if len(np.unique(rows)) != len(rows):
+            return candidates.reshape(shape), fixed.reshape(shape), False
+
+        fixed[new] = True
+        satisfied[rows] = True
+        candidates[matrix[rows].ravel()] = False
+        candidates[new] = True
+
+
+def grid_from_fixed(fixed: np.ndarray) -> np.ndarray:
+    """Liest die festgelegten Ziffern als uint8-Gitter (0 für offene Zellen)."""
+    return np.where(fixed.any(axis=2), fixed.argmax(axis=2) + 1, 0).astype(np.uint8)
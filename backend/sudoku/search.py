@@ -0,0 +1,228 @@
+import math
+import random
+import time
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+from cages import MAX_COMBINATIONS
+from solver_options import SolverTimeLimit
+from uniqueness import SearchLimitExceeded, cell_units, initial_masks, propagate_singles, units
+
+# Knoten des ersten Versuchs; jeder Neustart erhält RESTART_GROWTH-mal so viele. Zufällige
+# 25x25-Rätsel mit 20-40 % Vorgaben hängen sonst in einem frühen Fehlzweig fest (über 20 s), mit
+# Neustarts und zufälliger Reihenfolge sind sie nach wenigen Versuchen gelöst (unter 0,5 s).
+# Eindeutige 16x16-Rätsel brauchen oft einige hundert Knoten; mit 100 statt 1000 verlieren sie
+# bei jedem Neustart den Fortschritt (bis zu 0,5 s statt 0,1 s).
+RESTART_NODES = 1000
+RESTART_GROWTH = 1.5
+
+
+class _Restart(Exception):
+    """Der aktuelle Versuch hat sein Knotenlimit erreicht."""
+
+
+@lru_cache(maxsize=None)
+def sum_combinations(n: int, size: int, total: int):
+    """
+    Alle Mengen von size verschiedenen Ziffern aus 1..n mit Summe total als Bitmasken
+    (Bit k = Ziffer k+1); None, wenn es mehr als MAX_COMBINATIONS Mengen der Größe size gibt.
+    """
+    if math.comb(n, size) > MAX_COMBINATIONS:
+        return None
+    return tuple(sum(1 << (digit - 1) for digit in digits)
+                 for digits in combinations(range(1, n + 1), size) if sum(digits) == total)
+
+
+def digit_sum(mask: int) -> int:
+    """Summe der Ziffern einer Bitmaske."""
+    total = 0
+    while mask:
+        bit = mask & -mask
+        total += bit.bit_length()
+        mask ^= bit
+    return total
+
+
+def cage_structure(cages, s: int):
+    """
+    Bereitet die Käfige eines CageIndex für die Suche auf; search_solution legt das Ergebnis im
+    CageIndex ab (CageIndex.search_structure), Rätsel mit demselben Layout bauen es nicht neu auf.
+
+    Rückgabe:
+    - (Käfige, Nachbarn): je Käfig (Zellen, Summe, Kombinationen aus sum_combinations) und die
+      Nachbarn jeder Zelle aus units(s), ergänzt um die Zellen ihres Käfigs (jede Ziffer höchstens
+      einmal je Käfig, Käfige innerhalb einer Einheit brauchen das nicht)
+    """
+    n = s**2
+    peers = list(units(s)[1])
+    structure = []
+    for cage, (cells, total) in enumerate(zip(cages.cells, cages.sums)):
+        cells = tuple(int(cell) for cell in cells)
+        structure.append((cells, int(total), sum_combinations(n, len(cells), int(total))))
+        if len(cells) > 1 and not cages.in_unit(cage):
+            for cell in cells:
+                peers[cell] = tuple(sorted(set(peers[cell]).union(cells) - {cell}))
+    return structure, peers
+
+
+def prune_cages(masks, queue, dirty, cages, unit_ids) -> bool:
+    """
+    Streicht in jedem Käfig die Kandidaten, die in keiner passenden Ziffernmenge vorkommen (wie
+    cages.CageIndex.prune auf Bitmasken); False bei Widerspruch.
+
+    Eine Ziffernmenge passt, wenn sie die festgelegten Ziffern des Käfigs enthält und jede offene
+    Zelle eine der übrigen Ziffern tragen kann. Geänderte Zellen kommen wie in propagate_singles
+    nach dirty (ihre Einheiten) und, wenn nur ein Kandidat bleibt, nach queue.
+    """
+    for cells, total, table in cages:
+        fixed = union = 0
+        open_cells = []
+        for cell in cells:
+            mask = masks[cell]
+            if mask & (mask - 1):
+                open_cells.append(cell)
+                union |= mask
+            elif fixed & mask:
+                return False  # Dieselbe Ziffer zweimal im Käfig
+            else:
+                fixed |= mask
+        if not open_cells:
+            if digit_sum(fixed) != total:
+                return False
+            continue
+        if table is None:
+            continue
+        allowed = 0
+        for combination in table:
+            if combination & fixed != fixed:
+                continue
+            rest = combination ^ fixed
+            if rest & ~union or not all(masks[cell] & rest for cell in open_cells):
+                continue
+            allowed |= rest
+        if not allowed:
+            return False
+        for cell in open_cells:
+            mask = masks[cell]
+            if mask & ~allowed:
+                mask &= allowed
+                if not mask:
+                    return False
+                masks[cell] = mask
+                dirty.update(unit_ids[cell])
+                if not mask & (mask - 1):
+                    queue.append(cell)
+    return True
+
+
+def search_solution(sudoku, s: int, cages=None, node_limit: int | None = None,
+                    time_limit: float | None = None) -> np.ndarray | None:
+    """
+    Löst ein (Killer-)Sudoku per Backtracking auf Bitmasken, ohne MIP-Modell.
+
+    In jedem Knoten werden Naked und Hidden Singles (uniqueness.propagate_singles) und die
+    Kombinationen der Käfige (prune_cages) bis zum Fixpunkt propagiert, verzweigt wird auf der
+    Zelle mit den wenigsten Kandidaten. Der erste Versuch probiert die Ziffern aufsteigend; nach
+    RESTART_NODES Knoten beginnt die Suche neu, mit zufälliger Wahl unter den Zellen mit den
+    wenigsten Kandidaten und zufälliger Reihenfolge der Ziffern. Der Zufallsgenerator ist fest
+    initialisiert: Dasselbe Rätsel ergibt immer dieselbe Lösung, bei eindeutigen Rätseln
+    dieselbe wie das MIP-Modell.
+
+    Parameter:
+    - sudoku: s^2 x s^2 Gitter mit Ziffern 1..s^2 und None (oder 0) für leere Zellen
+    - s: Die Dimension des Sudokus
+    - cages: Optionaler CageIndex für Killer-Sudokus
+    - node_limit: Maximale Anzahl Suchknoten über alle Versuche; bei Überschreitung wird
+      SearchLimitExceeded ausgelöst
+    - time_limit: Sekunden; bei Überschreitung wird SolverTimeLimit ausgelöst
+
+    Rückgabe:
+    - Die Lösung als uint8-Array der Form (s^2, s^2) oder None, wenn das Sudoku keine Lösung hat
+    """
+    n = s**2
+    full = (1 << n) - 1
+    root = initial_masks(sudoku, s)
+    if root is None:
+        return None
+    masks, queue = root
+
+    all_units, peers = units(s)
+    cage_list = ()
+    if cages is not None:
+        if cages.search_structure is None:
+            cages.search_structure = cage_structure(cages, s)
+        cage_list, peers = cages.search_structure
+        # Vorgaben auch in ihrem Käfig streichen (initial_masks berücksichtigt nur die Einheiten)
+        queue.extend(cell for cell, mask in enumerate(masks) if not mask & (mask - 1))
+    structure = (all_units, peers, cell_units(s))
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    state = {"nodes": 0, "solution": None, "node_limit": node_limit, "deadline": deadline,
+             "time_limit": time_limit, "rng": None}
+    budget = RESTART_NODES
+    while True:
+        state["attempt_limit"] = state["nodes"] + budget
+        try:
+            found = _search(masks.copy(), list(queue), set(range(len(all_units))), structure, cage_list,
+                            full, state)
+            break
+        except _Restart:
+            state["rng"] = state["rng"] or random.Random(0)
+            budget = int(budget * RESTART_GROWTH)
+    if not found:
+        return None
+    solution = np.array([mask.bit_length() for mask in state["solution"]], dtype=np.uint8)
+    return solution.reshape(n, n)
+
+
+def _search(masks, queue, dirty, structure, cages, full, state):
+    state["nodes"] += 1
+    if state["node_limit"] is not None and state["nodes"] > state["node_limit"]:
+        raise SearchLimitExceeded()
+    if state["deadline"] is not None and time.monotonic() > state["deadline"]:
+        raise SolverTimeLimit(state["time_limit"])
+    if state["nodes"] > state["attempt_limit"]:
+        raise _Restart()
+    while True:
+        if not propagate_singles(masks, queue, dirty, structure, full):
+            return False
+        dirty = set()
+        if not prune_cages(masks, queue, dirty, cages, structure[2]):
+            return False
+        if not queue and not dirty:
+            break
+
+    rng = state["rng"]
+    best, best_count, ties = -1, 0, []
+    for cell, mask in enumerate(masks):
+        if mask & (mask - 1):
+            count = mask.bit_count()
+            if best < 0 or count < best_count:
+                best, best_count, ties = cell, count, [cell]
+                if count == 2 and rng is None:
+                    break
+            elif count == best_count:
+                ties.append(cell)
+    if best < 0:
+        # Alle Zellen festgelegt; die Käfigsummen hat prune_cages im letzten Durchlauf geprüft
+        state["solution"] = masks
+        return True
+
+    mask = masks[best]
+    bits = []
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        bits.append(bit)
+    if rng is not None:
+        best = rng.choice(ties)
+        bits = [1 << (digit - 1) for digit in range(1, masks[best].bit_length() + 1)
+                if masks[best] >> (digit - 1) & 1]
+        rng.shuffle(bits)
+    for bit in bits:
+        branch = masks.copy()
+        branch[best] = bit
+        if _search(branch, [best], set(structure[2][best]), structure, cages, full, state):
+            return True
+    return False
@@ -0,0 +1,130 @@
+import logging
+import multiprocessing
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from canonical import canonicalize
+
+logger = logging.getLogger(__name__)
+
+HITS, MISSES, SKIPPED, ENTRIES, MEMORY = range(5)
+NO_SOLUTION = b""
+
+
+def shared_counters():
+    """Zähler, die sich alle Worker-Prozesse eines Pools teilen (Treffer, Fehlgriffe, Speicher)."""
+    return multiprocessing.Array("q", 5)
+
+
+class SolutionCache:
+    """
+    Lösungscache für Sudokus, geschlüsselt über die Normalform unter den Sudoku-Symmetrien
+    (siehe canonical.canonicalize). Ein umbenanntes, transponiertes oder in Bändern vertauschtes
+    Rätsel trifft damit denselben Eintrag; die gespeicherte Lösung der Normalform wird über die
+    inverse Transformation zurückgerechnet.
+
+    Die Einträge liegen in einem LRU-Speicher mit höchstens max_entries Einträgen, optional
+    zusätzlich in einer SQLite-Datei, die sich mehrere Prozesse teilen können.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: str | None = None, counters=None):
+        self.max_entries = max_entries
+        self.counters = counters if counters is not None else shared_counters()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS solutions (key BLOB PRIMARY KEY, solution BLOB)")
+            self._db.commit()
+
+    def _count(self, index: int, delta: int = 1):
+        with self.counters.get_lock():
+            self.counters[index] += delta
+
+    def solve(self, grid: np.ndarray, s: int, solve):
+        """
+        Liefert die Lösung von grid aus dem Cache oder berechnet sie mit solve() und speichert sie.
+
+        Parameter:
+        - grid: uint8-Gitter (0 für leere Zellen)
+        - s: Die Dimension des Sudokus
+        - solve: Funktion ohne Argumente, die die Lösung als uint8-Gitter oder None liefert
+
+        Rückgabe:
+        - Die Lösung als uint8-Gitter oder None, wenn das Sudoku keine Lösung hat
+        """
+        canonical = canonicalize(grid, s)
+        if canonical is None:
+            self._count(SKIPPED)
+            return solve()
+        canonical_grid, transform = canonical
+        key = bytes([s]) + canonical_grid.tobytes()
+
+        cached = self._get(key)
+        if cached is not None:
+            self._count(HITS)
+            if cached == NO_SOLUTION:
+                return None
+            solution = np.frombuffer(cached, dtype=np.uint8).reshape(grid.shape)
+            return transform.invert(solution).astype(np.uint8)
+
+        self._count(MISSES)
+        solution = solve()
+        self._put(key, NO_SOLUTION if solution is None else transform.apply(solution).astype(np.uint8).tobytes())
+        return solution
+
+    def _get(self, key: bytes) -> bytes | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+        if self._db is not None:
+            row = self._db.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                return row[0]
+        return None
+
+    def _put(self, key: bytes, value: bytes):
+        self._remember(key, value)
+        if self._db is not None:
+            try:
+                self._db.execute("INSERT OR REPLACE INTO solutions (key, solution) VALUES (?, ?)", (key, value))
+                self._db.commit()
+            except sqlite3.OperationalError as error:
+                logger.warning("Error storing solution: %s", error)
+
+    def _remember(self, key: bytes, value: bytes):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = value
+            memory, entries = sys.getsizeof(key) + sys.getsizeof(value), 1
+            while len(self._entries) > self.max_entries:
+                old_key, old_value = self._entries.popitem(last=False)
+                memory -= sys.getsizeof(old_key) + sys.getsizeof(old_value)
+                entries -= 1
+        self._count(ENTRIES, entries)
+        self._count(MEMORY, memory)
+
+
+def cache_stats(counters) -> dict:
+    """Trefferquote und Speicherbedarf aus den (geteilten) Zählern."""
+    with counters.get_lock():
+        hits, misses, skipped, entries, memory = counters[:]
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "skipped": skipped,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "entries": entries,
+        "memory_bytes": memory,
+    }
@@ -0,0 +1,67 @@
+PRESOLVE_MODES = ("choose", "on", "off")
+ENGINES = ("auto", "mip", "cp", "portfolio")
+
+
+class SolverTimeLimit(Exception):
+    """HiGHS hat das Zeitlimit erreicht, ohne das Modell zu lösen."""
+
+    def __init__(self, time_limit: float):
+        # Nur time_limit in args, damit die Exception aus dem Worker-Prozess zurückkommt (Pickle)
+        super().__init__(time_limit)
+        self.time_limit = time_limit
+
+    def __str__(self):
+        return f"Solver time limit of {self.time_limit:g} s reached"
+
+
+class SolverOptions:
+    """
+    Einstellungen für HiGHS und die Wahl der Engine, je Anfrage wählbar.
+
+    Parameter:
+    - threads: Anzahl Threads von HiGHS (Standard: HiGHS entscheidet)
+    - time_limit: Sekunden je Solveraufruf; beim Lösen führt eine Überschreitung zu
+      SolverTimeLimit, beim Generieren gilt sie je Eindeutigkeitsprüfung (die Zelle bleibt dann stehen)
+    - mip_gap: Relative MIP-Lücke, bei der HiGHS abbricht
+    - presolve: 'choose', 'on' oder 'off'
+    - warm_start: Beim Generieren die bekannte Lösung vor jeder Eindeutigkeitsprüfung als
+      Startlösung übergeben
+    - engine: 'mip' (HiGHS), 'cp' (Backtracking mit Propagation, siehe search), 'portfolio'
+      (mehrere Versuche gleichzeitig, der erste gewinnt, siehe portfolio) oder 'auto' (Standard,
+      siehe SudokuSolver.choose_engine); gilt beim Lösen, time_limit für alle Engines
+    """
+
+    def __init__(self, threads: int | None = None, time_limit: float | None = None,
+                 mip_gap: float | None = None, presolve: str | None = None, warm_start: bool = False,
+                 engine: str = "auto"):
+        if threads is not None and threads < 1:
+            raise ValueError("threads must be at least 1")
+        if time_limit is not None and time_limit <= 0:
+            raise ValueError("time_limit must be positive")
+        if mip_gap is not None and mip_gap < 0:
+            raise ValueError("mip_gap must not be negative")
+        if presolve is not None and presolve not in PRESOLVE_MODES:
+            raise ValueError(f"presolve must be one of {', '.join(PRESOLVE_MODES)}")
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {', '.join(ENGINES)}")
+        self.threads = threads
+        self.time_limit = time_limit
+        self.mip_gap = mip_gap
+        self.presolve = presolve
+        self.warm_start = warm_start
+        self.engine = engine
+
+    def apply(self, model):
+        """Überträgt die gesetzten Einstellungen auf ein HiGHS-Modell von pyoptinterface."""
+        if self.threads is not None:
+            model.set_raw_parameter("threads", self.threads)
+        if self.time_limit is not None:
+            model.set_raw_parameter("time_limit", float(self.time_limit))
+        if self.mip_gap is not None:
+            model.set_raw_parameter("mip_rel_gap", float(self.mip_gap))
+        if self.presolve is not None:
+            model.set_raw_parameter("presolve", self.presolve)
+
+    def __repr__(self):
+        return (f"SolverOptions(threads={self.threads}, time_limit={self.time_limit}, mip_gap={self.mip_gap}, "
+                f"presolve={self.presolve}, warm_start={self.warm_start}, engine={self.engine})")
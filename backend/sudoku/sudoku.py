@@ -1,112 +1,408 @@
+import logging
 import numpy as np
 import pyoptinterface as poi
 import random as rnd
+import time
 from pyoptinterface import highs
 
+from cages import CageIndex, propagate_cages
+from grading import GUESSING, RATING_LEVELS, grade
+from highs_bulk import add_binary_variables, add_sum_constraints, get_column_values, run
+from instrumentation import phase, record_highs
+from limits import check_dimension, default_time_limit
+from portfolio import portfolio_members, solve_portfolio
+from propagation import base_constraint_matrix, candidates_from_grid, grid_from_fixed, propagate
+from search import search_solution
+from solver_options import SolverTimeLimit
+from uniqueness import SearchLimitExceeded, count_solutions
+
+logger = logging.getLogger(__name__)
+
+
 class Sudoku:
-    def __init__(self, s: int):
+    options = None  # SolverOptions für jedes neu gebaute Modell (None: Standard von HiGHS)
+
+    def __init__(self, s: int, candidates=None, fixed=None):
         self.dimension = s
+        self.fixed = fixed  # Durch Propagation festgelegte Variablen (None = vollständiges Modell)
         
-        model, x = self.create_model()
-        self.model = model
-        self.x = x
+        with phase("build"):
+            self.model = self.create_model(candidates)
         
-    def create_model(self):
+    def create_model(self, candidates=None):
+        """
+        Baut das MIP-Modell auf.
+
+        Variablen werden nur über ihren Index angesprochen: self.var_index bildet jedes
+        (Zelle, Ziffer)-Paar flach auf den Index ab (-1 für entfallene Paare), self.variables
+        enthält die Indizes in Spaltenreihenfolge. Handles für einzelne Bedingungen liefert var;
+        Objekt-Arrays mit s^6 Handles (15.625 bei 25x25) werden nicht angelegt.
+
+        Parameter:
+        - candidates: Optionales Kandidatengitter (siehe propagation.propagate). Dann werden nur
+          Variablen für offene (Zelle, Ziffer)-Paare angelegt und nur Bedingungen, die noch
+          nicht durch eine festgelegte Ziffer erfüllt sind. Dieses Modell wird nur noch gelöst;
+          Spalten und Zeilen gehen deshalb je in einem Aufruf an HiGHS (highs_bulk, registered=False).
+          Das vollständige Modell des Generators bleibt über var und self.con veränderbar.
+
+        Rückgabe:
+        - Das Modell
+        """
         s = self.dimension
+        matrix = base_constraint_matrix(s)
+        if candidates is None:
+            free = np.ones(s**6, dtype=bool)
+        else:
+            fixed = self.fixed.ravel()
+            free = candidates.ravel() & ~fixed
+            matrix = matrix[~fixed[matrix].any(axis=1)]
+
         model = highs.Model()
-        x = np.empty((s**2, s**2, s**2), dtype=object)
-        
-        for i in range(s**2):
-            for j in range(s**2):
-                for k in range(s**2):
-                    x[i, j, k] = model.add_variable(domain=poi.VariableDomain.Binary)
-                    
-        for i in range(s**2):
-            for k in range(s**2):
-                model.add_linear_constraint(poi.quicksum(x[i, :, k]), poi.Eq, 1.0)
-   
-        for j in range(s**2):
-            for k in range(s**2):
-                model.add_linear_constraint(poi.quicksum(x[:, j, k]), poi.Eq, 1.0)
-        for i in range(s**2):
-            for j in range(s**2):
-                model.add_linear_constraint(poi.quicksum(x[i, j, :]), poi.Eq, 1.0)
-        for g in range(s):
-            for h in range(s):
-                for k in range(s**2):
-                    model.add_linear_constraint(poi.quicksum(x[g*s:g*s+s, h*s:h*s+s, k].flatten()), poi.Eq, 1.0)
-                    
-        return model, x
+        # Die Konsolenausgabe von HiGHS nur mit LOG_LEVEL=DEBUG
+        model.set_raw_parameter("log_to_console", logger.isEnabledFor(logging.DEBUG))
+        if self.options is not None:
+            self.options.apply(model)
+        self.time_limit = default_time_limit(s, self.options)
+        if self.time_limit is not None:
+            model.set_raw_parameter("time_limit", float(self.time_limit))
+
+        self.registered = candidates is None
+        self.variables = add_binary_variables(model, int(free.sum()), registered=self.registered)
+
+        # Zwischengespeicherte Struktur auf die Variablenindizes dieses Modells abbilden
+        self.var_index = np.full(s**6, -1, dtype=np.int32)
+        self.var_index[free] = self.variables
+        rows = self.var_index[matrix]
+        if candidates is None:
+            add_sum_constraints(model, rows, 1.0)
+        else:
+            add_sum_constraints(model, (row[row >= 0] for row in rows), 1.0, registered=False)
+
+        return model
+
+    def var(self, row: int, col: int, digit: int) -> poi.VariableIndex:
+        """Handle der Variablen für Ziffer digit+1 in Zelle (row, col)."""
+        n = self.dimension**2
+        return poi.VariableIndex(int(self.var_index[(row * n + col) * n + digit]))
         
     def solve(self):
-        self.model.optimize()
-        print("Termination status:", self.model.get_model_attribute(poi.ModelAttribute.TerminationStatus))
-        
-    def get_solution(self):
-        get_v = np.vectorize(lambda x: self.model.get_value(x))
-        solution = get_v(self.x)
+        """Löst das Modell; das Ergebnis steht in self.status (TerminationStatusCode)."""
+        with phase("solve"):
+            if self.registered:
+                self.model.optimize()
+                self.status = self.model.get_model_attribute(poi.ModelAttribute.TerminationStatus)
+            else:
+                self.status = run(self.model)
+        record_highs(self.model)
+        logger.debug("Termination status: %s", self.status)
+        
+    def get_solution_grid(self):
+        """
+        Liest die Lösung aus: alle Spaltenwerte in einem Aufruf, die Ziffer je Zelle per argmax.
+
+        Rückgabe:
+        - uint8-Array der Form (s^2, s^2) mit den Ziffern 1..s^2
+        """
         s = self.dimension
-        
-        sudoku = [[0 for _ in range(s**2)] for _ in range(s**2)]
-        for i in range(s**2):
-            for j in range(s**2):
-                for k in range(s**2):
-                    if solution[i, j, k] == 1:
-                        sudoku[i][j] = k+1
-        return sudoku
+        with phase("extract"):
+            solution = np.zeros(s**6)
+            if self.model is not None:
+                present = self.var_index >= 0
+                solution[present] = get_column_values(self.model, self.variables)[self.var_index[present]]
+            if self.fixed is not None:
+                solution[self.fixed.ravel()] = 1
+            return (solution.reshape((s**2, s**2, s**2)).argmax(axis=2) + 1).astype(np.uint8)
+
+    def get_solution(self):
+        return self.get_solution_grid().tolist()
     
         
 class SudokuSolver(Sudoku):
-    def __init__(self, s: int, sudoku: list):
-        super().__init__(s)
-        self.con = np.empty((s**2, s**2), dtype=object)
-        for i in range(s**2):
-            for j in range(s**2):
-                if sudoku[i][j] is not None:
-                    self.con[i][j] = self.model.add_linear_constraint(self.x[i, j, sudoku[i][j]-1], poi.Eq, 1.0)
+    # Engine -> Methode, die das propagierte Rätsel löst
+    engines = {
+        "mip": "_solve_mip",
+        "cp": "_solve_cp",
+        "portfolio": "_solve_portfolio",
+    }
+    # Ab dieser Dimension löst "auto" Killer-Sudokus mit dem MIP-Modell: Die Summenbedingungen
+    # stärken die LP-Relaxierung, 16x16 ohne Vorgaben braucht mit beiden Engines ~0,1 s, 25x25 mit
+    # 30 % Vorgaben mit MIP die Hälfte der Zeit. Normale Sudokus löst "auto" unabhängig von der
+    # Anzahl der Vorgaben mit "cp" (benchmark.py engines): generierte 9x9 in ~1 ms statt ~3 ms,
+    # generierte 16x16 in ~40 ms statt ~430 ms (p95 0,15 s statt 2,3 s), zufällige 16x16 mit 20-65 %
+    # Vorgaben nie langsamer, und zufällige 25x25 mit 30 % Vorgaben in 0,1-0,3 s, an denen HiGHS am
+    # Zeitlimit scheitert.
+    killer_mip_min_dimension = 4
+    # Ab dieser Dimension wird der Lösungscache auch für "cp" befragt. Die Normalform
+    # (SolutionCache.canonicalize) kostet bei 9x9 etwa 1,7 ms, "cp" löst dort in etwa 0,7 ms;
+    # ab 16x16 und mit HiGHS ist das Nachschlagen billiger als das Lösen.
+    cache_min_dimension = 4
+
+    def __init__(self, s: int, sudoku: list, presolve: bool = True, cache=None, options=None):
+        """
+        Parameter:
+        - s: Die Dimension des Sudokus
+        - sudoku: Das teilweise gefüllte Sudoku als verschachtelte Liste (None für leere Zellen)
+          oder als uint8-Array (0 für leere Zellen)
+        - presolve: Vorgaben vorab mit Naked/Hidden Singles propagieren und nur die offenen
+          (Zelle, Ziffer)-Paare ins Modell aufnehmen. Ohne presolve wird das vollständige Modell
+          gebaut und jede Vorgabe als Bedingung in self.con gespeichert (für den Generator).
+        - cache: Optionaler SolutionCache; wird nur befragt, wenn nach der Propagation noch
+          ein Solveraufruf nötig wäre und sich das Nachschlagen lohnt (siehe use_cache). Das
+          Modell wird dann erst bei einem Fehlgriff gebaut.
+        - options: Optionale SolverOptions für HiGHS und die Engine (siehe choose_engine)
+        """
+        check_dimension(s)
+        self.options = options
+        self.cache = cache
+        self.time_limit = default_time_limit(s, options)
+        self.candidates = None  # Offene Kandidaten nach der Propagation (None: nichts mehr offen)
+        if not presolve:
+            super().__init__(s)
+            self.consistent = True
+            self.con = np.empty((s**2, s**2), dtype=object)
+            for i in range(s**2):
+                for j in range(s**2):
+                    if sudoku[i][j] is not None:
+                        self.con[i][j] = self.model.add_linear_constraint(self.var(i, j, sudoku[i][j]-1), poi.Eq, 1.0)
+            return
+
+        with phase("presolve"):
+            candidates, fixed, self.consistent = self.presolve(candidates_from_grid(sudoku, s), s)
+        self.engine = self.choose_engine(s)
+        if not self.use_cache(s):
+            self.cache = cache = None
+        if not self.consistent or fixed.sum() == s**4 or cache is not None or self.engine != "mip":
+            # Widerspruch, bereits vollständig gelöst oder ohne Modell gelöst: kein Modell nötig
+            self.dimension = s
+            self.fixed = fixed
+            self.model = None
+            if self.consistent and fixed.sum() < s**4:
+                self.candidates = candidates
+            return
+        self.candidates = candidates
+        self.dimension = s
+        self.fixed = fixed
+        self.build_model()
                     
-    def solve_sudoku(self):
+    def presolve(self, candidates, s: int):
+        """Reduziert das Kandidatengitter vor dem Modellaufbau, siehe propagation.propagate."""
+        return propagate(candidates, s)
+
+    def choose_engine(self, s: int) -> str:
+        """Die Engine aus den SolverOptions, bei 'auto' die von auto_engine."""
+        engine = self.options.engine if self.options is not None else "auto"
+        return self.auto_engine(s) if engine == "auto" else engine
+
+    def auto_engine(self, s: int) -> str:
+        """Die Engine für 'auto', siehe killer_mip_min_dimension."""
+        return "cp"
+
+    def use_cache(self, s: int) -> bool:
+        """Lohnt der Lösungscache für die gewählte Engine? Mit HiGHS immer, sonst ab cache_min_dimension."""
+        return self.engine in ("mip", "portfolio") or s >= self.cache_min_dimension
+
+    def search(self, grid):
+        """Löst das propagierte Gitter mit der Engine "cp", siehe search.search_solution."""
+        return search_solution(grid, self.dimension, time_limit=self.time_limit)
+
+    def solve_grid(self):
+        """
+        Löst das Sudoku mit der gewählten Engine (self.engine, siehe engines).
+
+        Rückgabe:
+        - Die Lösung als uint8-Array der Form (s^2, s^2) oder None, wenn das Sudoku keine Lösung hat;
+          SolverTimeLimit, wenn die Engine das Zeitlimit (siehe limits.default_time_limit) erreicht
+        """
+        if not self.consistent:
+            return None
+        if self.model is None and self.candidates is None:
+            return self.get_solution_grid()
+        solve = getattr(self, self.engines[self.engine])
+        if self.cache is not None:
+            # Das propagierte Gitter hat dieselbe Lösung und trifft auch andere Rätsel mit demselben Rest
+            return self.cache.solve(grid_from_fixed(self.fixed), self.dimension, solve)
+        return solve()
+
+    def _solve_cp(self):
+        with phase("solve"):
+            return self.search(grid_from_fixed(self.fixed))
+
+    def _solve_portfolio(self):
+        with phase("solve"):
+            return solve_portfolio(self, portfolio_members(self.auto_engine(self.dimension), self.options),
+                                   self.time_limit)
+
+    def solve_with(self, engine: str, parameters: dict | None = None):
+        """
+        Löst das propagierte Rätsel mit einer bestimmten Engine, für einen Versuch des Portfolios
+        (siehe portfolio.solve_portfolio).
+
+        Parameter:
+        - engine: 'mip' oder 'cp'
+        - parameters: Zusätzliche HiGHS-Parameter für 'mip' (z.B. random_seed), nach den SolverOptions gesetzt
+        """
+        if engine == "mip":
+            if self.model is None:
+                self.build_model()
+            for name, value in (parameters or {}).items():
+                self.model.set_raw_parameter(name, value)
+        return getattr(self, self.engines[engine])()
+
+    def build_model(self):
+        """Baut das MIP-Modell für die propagierten Kandidaten (self.candidates, self.fixed)."""
+        Sudoku.__init__(self, self.dimension, self.candidates, self.fixed)
+
+    def _solve_mip(self):
+        if self.model is None:
+            self.build_model()
         self.solve()
-        return self.get_solution()
+        if self.status == poi.TerminationStatusCode.TIME_LIMIT:
+            raise SolverTimeLimit(self.time_limit)
+        if self.status != poi.TerminationStatusCode.OPTIMAL:
+            return None
+        return self.get_solution_grid()
+
+    def solve_sudoku(self):
+        """
+        Löst das Sudoku.
+
+        Rückgabe:
+        - Die Lösung als verschachtelte Liste oder None, wenn das Sudoku keine Lösung hat
+        """
+        grid = self.solve_grid()
+        return None if grid is None else grid.tolist()
                     
                     
 class SudokuGenerator(SudokuSolver):
-    def __init__(self, s: int):
-        complete_sudoku = Sudoku(s)
-        
-        objective = 0
-        for i in range(s**2):
-            for j in range(s**2):
-                rnd_value = rnd.randint(1,1000)  # Generate random value between 1 and 1000
-                objective += poi.quicksum(complete_sudoku.x[i, j, :]) * rnd_value  # Add the product to the objective#
-
-        complete_sudoku.model.set_objective(objective, poi.ObjectiveSense.Minimize)
-        complete_sudoku.solve()
-        complete_sudoku_solution = complete_sudoku.get_solution()
+    time_budget = 10.0  # Sekunden für das Entfernen von Vorgaben; danach bleiben die übrigen stehen
+    check_time_limit = 1.0  # Sekunden je Eindeutigkeitsprüfung mit dem Modell (SolverOptions.time_limit ersetzt sie)
+    rating_attempts = 8  # Versuche mit neuer Lösung, bis die Zielbewertung erreicht ist (4x4 erreicht nur Stufe 1)
+    # Größte Dimension, bis zu der nach Bewertung entfernt wird. Darüber kostet jede Bewertung
+    # 25 ms (16x16) bis 150 ms (25x25), und schon der Anteil von "normal" braucht Ausprobieren;
+    # dort wird nur nach dem Anteil entfernt und das Ergebnis einmal bewertet.
+    rating_max_dimension = 3
+
+    def __init__(self, s: int, options=None):
+        self.reset(s, options)
+
+    def reset(self, s: int, options=None):
+        """Würfelt eine neue vollständige Lösung und baut das Modell dafür auf."""
+        # Die Blöcke auf der Diagonalen sind voneinander unabhängig und werden zufällig befüllt,
+        # den Rest ergänzt der Solver. (Eine Zielfunktion mit Zufallsgewichten je Zelle ist
+        # wirkungslos, da jede Zelle genau eine Ziffer hat, und führt immer zur selben Lösung.)
+        # Bei 4x4 sind nicht alle Belegungen ergänzbar, dann wird neu gewürfelt.
+        complete_sudoku_solution = None
+        while complete_sudoku_solution is None:
+            seed_grid = [[None] * s**2 for _ in range(s**2)]
+            for g in range(s):
+                digits = rnd.sample(range(1, s**2 + 1), s**2)
+                for a in range(s):
+                    for b in range(s):
+                        seed_grid[g*s + a][g*s + b] = digits[a*s + b]
+            complete_sudoku_solution = SudokuSolver(s, seed_grid, options=options).solve_sudoku()
         
         
         self.solution = complete_sudoku_solution
-        
-        super().__init__(s, complete_sudoku_solution)
-        solver_objective = poi.quicksum([self.x[i][j][k] for i in range(s**2)
-                                                         for j in range(s**2)
-                                                         for k in range(s**2)
-                                                         if k+1 == complete_sudoku_solution[i][j]
-                                ])
-
-        self.model.set_objective(solver_objective, poi.ObjectiveSense.Minimize)
+        self.complete_solution = [row[:] for row in complete_sudoku_solution]
+        
+        super().__init__(s, complete_sudoku_solution, presolve=False, options=options)
+        # Zielfunktion: Summe der Variablen, die der ursprünglichen Lösung entsprechen
+        cells = np.arange(s**4)
+        matching = self.var_index[cells * s**2 + np.array(complete_sudoku_solution).ravel() - 1]
+        self.model.set_objective(poi.ScalarAffineFunction.from_numpy(np.ones(s**4), matching),
+                                 poi.ObjectiveSense.Minimize)
        
-    def remove_cell(self, difficulty="normal", max_attempts=None):
+    def set_check_time_limit(self, deadline: float | None = None):
+        """Begrenzt den nächsten Solveraufruf auf check_time_limit Sekunden und die Restzeit bis deadline."""
+        time_limit = self.check_time_limit
+        if self.options is not None and self.options.time_limit is not None:
+            time_limit = self.options.time_limit
+        if deadline is not None:
+            time_limit = min(time_limit, max(deadline - time.monotonic(), 0.01))
+        self.model.set_raw_parameter("time_limit", time_limit)
+
+    def is_unique_mip(self, removed=None, deadline: float | None = None):
+        """
+        Prüft die Eindeutigkeit mit dem MIP-Modell: Die Zielfunktion zählt die Zellen, die mit
+        der ursprünglichen Lösung übereinstimmen. Ist das Minimum kleiner als s^4, existiert
+        eine weitere Lösung.
+
+        Entschieden wird über die duale Schranke: Die Zielfunktion ist ganzzahlig, eindeutig ist
+        das Rätsel also erst, wenn die Schranke über s^4 - 1 liegt. Bricht HiGHS wegen des
+        Zeitlimits oder einer MIP-Lücke vorher ab, gilt das Rätsel als nicht eindeutig.
+        Mit SolverOptions.warm_start erhält HiGHS die ursprüngliche Lösung als Startlösung
+        (pyoptinterface verwirft sie nach jedem Aufruf, daher vor jeder Prüfung).
+        """
+        self.set_check_time_limit(deadline)
+        if self.options is not None and self.options.warm_start:
+            self.model.set_primal_start([poi.VariableIndex(int(i)) for i in self.variables], self.start_values)
+        self.solve()
+        return self.model.get_raw_info_double("mip_dual_bound") > self.dimension**4 - 1
+
+    @property
+    def start_values(self) -> list:
+        """Die ursprüngliche Lösung als Werte aller Variablen des vollständigen Modells."""
+        s = self.dimension
+        solution = np.array(self.complete_solution)
+        return (solution[:, :, None] == np.arange(1, s**2 + 1)).astype(float).ravel().tolist()
+
+    def is_unique_backtracking(self, removed=None, deadline: float | None = None):
+        """
+        Prüft die Eindeutigkeit per Bitmasken-Backtracking. Wurde gerade die Zelle
+        removed = (Zeile, Spalte, Ziffer) entfernt, genügt die Suche nach einer Lösung, in der
+        diese Zelle eine andere Ziffer trägt. Überschreitet die Suche ihr Knotenlimit, wird auf
+        das MIP-Modell ausgewichen, ab 16x16 gilt das Rätsel dann als nicht eindeutig
+        (siehe large_node_limits).
+        """
+        node_limit = self.large_node_limits.get(self.dimension, self.backtracking_node_limit)
+        try:
+            if removed is None:
+                return count_solutions(self.solution, self.dimension, limit=2, node_limit=node_limit) == 1
+            return count_solutions(self.solution, self.dimension, limit=1, node_limit=node_limit,
+                                   exclude=[removed]) == 0
+        except SearchLimitExceeded:
+            if self.dimension in self.large_node_limits:
+                return False
+            return self.is_unique_mip(removed, deadline)
+
+    # Name der Eindeutigkeitsprüfung -> Methode
+    uniqueness_oracles = {
+        "backtracking": "is_unique_backtracking",
+        "mip": "is_unique_mip",
+    }
+    backtracking_node_limit = 5000  # Danach Rückfall auf das MIP-Modell
+    # Ab 16x16 kostet ein Suchknoten ~0,3 ms und das MIP-Modell beweist die Eindeutigkeit selten
+    # innerhalb von check_time_limit. Nach so vielen Knoten bleibt die Zelle daher stehen: Das
+    # Rätsel bleibt eindeutig und behält nur wenige Vorgaben mehr (25x25, "normal": ~348 statt
+    # ~350 Lücken, 5 s statt 27 s)
+    large_node_limits = {4: 300, 5: 50}
+
+    def remove_cell(self, difficulty="normal", max_attempts=None, oracle="backtracking", time_budget=None,
+                    rating=None):
         """
         Entfernt Zellen aus dem Sudoku basierend auf dem gewählten Schwierigkeitsgrad.
+
+        Eine Zelle, deren Entfernen die Eindeutigkeit zerstört, bleibt das auch nach jedem weiteren
+        Entfernen (es kommen nur Lösungen hinzu); sie wird daher kein zweites Mal geprüft.
+        Ist das Zeitbudget aufgebraucht, bleiben die übrigen Vorgaben stehen.
+
+        Mit rating = (kleinste, größte Stufe) bewertet grading.grade das Rätsel nach jedem
+        Entfernen: Eine Zelle, die es über die größte Stufe hebt, bleibt stehen (ebenfalls nur
+        einmal geprüft, mit weniger Vorgaben wird es nicht leichter), und ist der Anteil des
+        Schwierigkeitsgrads erreicht, wird weiter entfernt, bis die kleinste Stufe erreicht ist.
         
         Parameter:
         - difficulty: 'easy', 'normal' oder 'hard'
         - max_attempts: Maximale Anzahl von Versuchen, Zellen zu entfernen
+        - oracle: Eindeutigkeitsprüfung, 'backtracking' (Standard) oder 'mip'
+        - time_budget: Sekunden (Standard: self.time_budget)
+        - rating: Optionaler Bereich der Bewertung, siehe grading.RATING_LEVELS
         """
-        # Prüfen, ob das Sudoku nach dem letzten Entfernen einer Zelle noch eine eindeutige Lösung hat
-        self.solve()
-        if self.model.get_model_attribute(poi.ModelAttribute.ObjectiveValue) < self.dimension**4:
+        is_unique = getattr(self, self.uniqueness_oracles[oracle])
+        deadline = time.monotonic() + (time_budget or self.time_budget)
+
+        # Prüfen, ob das Sudoku eine eindeutige Lösung hat
+        if not is_unique(None, deadline):
             return
         
         # Schwierigkeitsgrade bestimmen den Prozentsatz der Zellen, die gelöscht werden sollen
@@ -123,71 +419,132 @@ class SudokuGenerator(SudokuSolver):
         
         # Maximale Anzahl von Zellen, die basierend auf dem Schwierigkeitsgrad entfernt werden sollten
         max_cells_to_remove = int(total_cells * difficulty_levels.get(difficulty, 0.5))
-        
-        # Wenn wir bereits das Maximum für den Schwierigkeitsgrad erreicht haben, beenden wir
-        if removed_cells >= max_cells_to_remove:
-            return
-            
-        # Versuche, eine neue Zelle zu finden, die entfernt werden kann
-        attempts = 0
         max_try = max_attempts or total_cells  # Falls kein max_attempts angegeben ist, alle Zellen probieren
         
-        while attempts < max_try:
-            row, col = rnd.randint(0, self.dimension**2-1), rnd.randint(0, self.dimension**2-1)
-            if self.solution[row][col] is not None:
-                # Zelle temporär entfernen
-                temp_value = self.solution[row][col]
-                self.solution[row][col] = None
-                self.model.delete_constraint(self.con[row][col])
-                
-                # Prüfen, ob noch eine eindeutige Lösung existiert
-                self.solve()
-                if self.model.get_model_attribute(poi.ModelAttribute.ObjectiveValue) < self.dimension**4:
-                    # Wenn keine eindeutige Lösung existiert, Zelle wiederherstellen
-                    self.solution[row][col] = temp_value
-                    self.con[row][col] = self.model.add_linear_constraint(self.x[row, col, temp_value-1], poi.Eq, 1.0)
-                else:
-                    # Wenn eine eindeutige Lösung existiert, weiter Zellen entfernen
-                    self.remove_cell(difficulty, max_attempts)
+        required = set()  # Zellen, ohne die das Rätsel nicht mehr eindeutig (oder zu schwer) ist
+        low, high = rating or (None, None)
+        level = 0 if rating else None
+
+        # Solange das Maximum für den Schwierigkeitsgrad (oder die kleinste Stufe) nicht erreicht
+        # ist, weitere Zellen entfernen
+        while removed_cells < max_cells_to_remove or (level is not None and level < low):
+            attempts = 0
+            while attempts < max_try:
+                if time.monotonic() >= deadline:
                     return
+                row, col = rnd.randint(0, self.dimension**2-1), rnd.randint(0, self.dimension**2-1)
+                if self.solution[row][col] is not None and (row, col) not in required:
+                    # Zelle temporär entfernen
+                    temp_value = self.solution[row][col]
+                    self.solution[row][col] = None
+                    self.model.delete_constraint(self.con[row][col])
                     
-            attempts += 1
-            
-        # Wenn keine weitere Zelle entfernt werden kann, beenden wir
-        return
+                    # Prüfen, ob noch eine eindeutige Lösung existiert
+                    if is_unique((row, col, temp_value), deadline):
+                        # Bewerten, wenn die Zelle das Rätsel zu schwer machen könnte oder der Anteil erreicht ist
+                        new_level = level
+                        if rating is not None and (high < GUESSING[1] or removed_cells + 1 >= max_cells_to_remove):
+                            new_level = grade(self.solution, self.dimension)[0]
+                        if rating is None or new_level <= high:
+                            level = new_level
+                            removed_cells += 1
+                            break
+                    # Wenn keine eindeutige Lösung existiert (oder das Rätsel zu schwer wird), Zelle wiederherstellen
+                    required.add((row, col))
+                    self.solution[row][col] = temp_value
+                    self.con[row][col] = self.model.add_linear_constraint(self.var(row, col, temp_value-1), poi.Eq, 1.0)
+                    
+                attempts += 1
+            else:
+                # Wenn keine weitere Zelle entfernt werden kann, beenden wir
+                return
         
-    def get_incomplete_and_complete_sudoku(self, difficulty="normal"):
+    def get_incomplete_and_complete_sudoku(self, difficulty="normal", rating=None, time_budget=None):
         """
-        Erzeugt ein Sudoku mit dem angegebenen Schwierigkeitsgrad.
+        Erzeugt ein Sudoku mit dem angegebenen Schwierigkeitsgrad. Maßgeblich ist die Bewertung
+        durch grading.grade (self.rating = (Stufe, Technik)): Erreicht ein Versuch die kleinste
+        Stufe nicht, wird mit einer neuen Lösung neu begonnen, höchstens rating_attempts Mal und
+        solange das Zeitbudget reicht; dann bleibt der schwerste Versuch. Oberhalb von
+        rating_max_dimension zählt nur der Anteil entfernter Zellen.
         
         Parameter:
         - difficulty: 'easy', 'normal' oder 'hard'
+        - rating: Optionaler Bereich (kleinste, größte Stufe) statt grading.RATING_LEVELS[difficulty]
+        - time_budget: Sekunden für alle Versuche (Standard: self.time_budget)
         
         Rückgabe:
         - Das unvollständige Sudoku und die vollständige Lösung
         """
-        self.remove_cell(difficulty)
-        return self.solution, self.get_solution()
+        if self.dimension > self.rating_max_dimension:
+            self.remove_cell(difficulty, time_budget=time_budget)
+            self.rating = grade(self.solution, self.dimension)
+            return self.solution, self.complete_solution
+        low, high = rating or RATING_LEVELS.get(difficulty, RATING_LEVELS["normal"])
+        deadline = time.monotonic() + (time_budget or self.time_budget)
+        best = None
+        for attempt in range(self.rating_attempts):
+            self.remove_cell(difficulty, time_budget=max(deadline - time.monotonic(), 0.01), rating=(low, high))
+            self.rating = grade(self.solution, self.dimension)
+            if best is None or self.rating[0] > best[0][0]:
+                best = (self.rating, self.solution, self.complete_solution)
+            if self.rating[0] >= low or time.monotonic() >= deadline or attempt == self.rating_attempts - 1:
+                break
+            self.reset(self.dimension, self.options)
+        self.rating, self.solution, self.complete_solution = best
+        return self.solution, self.complete_solution
         
 class KillerSudokuSolver(SudokuSolver):
-    def __init__(self, s: int, sudoku: list, cages: list, S: list):
-        super().__init__(s, sudoku)
-        for cage in range(len(S)):
-            self.model.add_linear_constraint(poi.quicksum([self.x[i,j,k]*(k+1) for i in range(s**2) for j in range(s**2) for k in range(s**2) if cages[i, j] == cage]), poi.Eq, S[cage])
-            for k in range(s**2):
-                self.model.add_linear_constraint(poi.quicksum([self.x[i,j,k] for i in range(s**2) for j in range(s**2) if cages[i, j] == cage]), poi.Leq, 1.0)
-        
-        
-        
-        
+    def __init__(self, s: int, sudoku: list, cages: list, S: list, options=None, cage_cache=None):
+        """
+        Parameter:
+        - s: Die Dimension des Sudokus
+        - sudoku: Das teilweise gefüllte Sudoku, siehe SudokuSolver
+        - cages: Gitter der Form (s^2, s^2) mit dem Käfigindex jeder Zelle
+        - S: Summe je Käfig
+        - options: Optionale SolverOptions für HiGHS und die Engine
+        - cage_cache: Optionaler CageCache; Rätsel mit demselben Käfiglayout teilen sich den CageIndex
+        """
+        with phase("cages"):
+            self.cages = CageIndex(cages, S, s) if cage_cache is None else cage_cache.get(cages, S, s)
+        super().__init__(s, sudoku, options=options)
+
+    def build_model(self):
+        super().build_model()
+        with phase("build"):
+            self.cages.add_constraints(self.model, self.var_index, self.fixed, registered=False)
+
+    def presolve(self, candidates, s: int):
+        """
+        Streicht die Ziffern, die Größe und Summe des Käfigs ausschließen (CageIndex.candidate_masks),
+        und wechselt dann zwischen Singles und den Kombinationstabellen der Käfige bis zum Fixpunkt.
+        """
+        candidates = candidates & self.cages.candidate_masks.reshape(candidates.shape)
+        return propagate_cages(candidates, s, self.cages)
+
+    def auto_engine(self, s: int) -> str:
+        return "mip" if s >= self.killer_mip_min_dimension else "cp"
+
+    def search(self, grid):
+        return search_solution(grid, self.dimension, self.cages, time_limit=self.time_limit)
+
+
 class KillerSudokuGenerator(SudokuGenerator):
-    def __init__(self, s: int):
-        super().__init__(s)
+    # Anteil der Vorgaben, die nach dem Aufbau der Käfige entfernt werden (Modus "cages-first")
+    killer_difficulty_levels = {
+        "easy": 0.7,
+        "normal": 0.85,
+        "hard": 1.0,     # Reines Killer-Sudoku, sofern die Käfige die Lösung festlegen
+    }
+
+    def __init__(self, s: int, options=None):
+        super().__init__(s, options)
         self.cages = []  # Liste der Käfige [(Zellen), Summe]
+        self.cage_index = None  # CageIndex der Käfige, sobald sie ins Modell aufgenommen sind
         
     def generate_cages(self, min_cage_size=1, max_cage_size=4):
         """
-        Generiert Käfige für ein Killer-Sudoku.
+        Generiert Käfige für ein Killer-Sudoku. Ein Käfig wird nur um Zellen erweitert, deren
+        Ziffer er noch nicht enthält, da jede Ziffer in einem Käfig höchstens einmal vorkommt.
         
         Parameter:
         - min_cage_size: Minimale Anzahl von Zellen in einem Käfig
@@ -197,6 +554,7 @@ class KillerSudokuGenerator(SudokuGenerator):
         - Eine Liste von Käfigen, wobei jeder Käfig als Tupel (Liste von Zellen, Summe) dargestellt wird
         """
         s = self.dimension
+        solution = self.complete_solution
         # Liste aller Zellen im Sudoku
         all_cells = [(i, j) for i in range(s**2) for j in range(s**2)]
         # Zufällig mischen, um verschiedene Käfige zu erhalten
@@ -212,6 +570,7 @@ class KillerSudokuGenerator(SudokuGenerator):
             
             # Cage erstellen mit der Startzelle
             current_cage = [start_cell]
+            digits = {solution[start_cell[0]][start_cell[1]]}
             cage_size = rnd.randint(min_cage_size, min(max_cage_size, len(remaining_cells) + 1))
             
             # Weitere Zellen hinzufügen, die mit den bereits hinzugefügten Zellen verbunden sind
@@ -225,7 +584,8 @@ class KillerSudokuGenerator(SudokuGenerator):
                     for neighbor in possible_neighbors:
                         if (0 <= neighbor[0] < s**2 and 
                             0 <= neighbor[1] < s**2 and 
-                            neighbor in remaining_cells):
+                            neighbor in remaining_cells and
+                            solution[neighbor[0]][neighbor[1]] not in digits):
                             neighbors.add(neighbor)
                 
                 if not neighbors:
@@ -234,30 +594,115 @@ class KillerSudokuGenerator(SudokuGenerator):
                 # Zufälligen Nachbar hinzufügen
                 next_cell = rnd.choice(list(neighbors))
                 current_cage.append(next_cell)
+                digits.add(solution[next_cell[0]][next_cell[1]])
                 remaining_cells.remove(next_cell)
             
             # Summe des Käfigs berechnen basierend auf der Lösung
-            cage_sum = sum(self.get_solution()[i][j] for i, j in current_cage)
+            cage_sum = sum(digits)
             
             # Käfig zur Liste hinzufügen
             cages.append((current_cage, cage_sum))
         
         self.cages = cages
         return cages
+
+    def cage_grid(self) -> np.ndarray:
+        """Die Käfige als Gitter der Form (s^2, s^2) mit dem Käfigindex jeder Zelle."""
+        grid = np.zeros((self.dimension**2, self.dimension**2), dtype=np.int64)
+        for index, (cells, _) in enumerate(self.cages):
+            rows, columns = zip(*cells)
+            grid[list(rows), list(columns)] = index
+        return grid
+
+    def add_cages_to_model(self):
+        """
+        Nimmt die Käfige dauerhaft in das Modell des Generators auf. Die Zielfunktion entfällt,
+        is_unique_killer braucht nur die Zulässigkeit.
+        """
+        s = self.dimension
+        self.cage_index = CageIndex(self.cage_grid(), [cage_sum for _, cage_sum in self.cages], s)
+        self.cage_index.add_constraints(self.model, self.var_index)
+        self.model.set_objective(poi.ScalarAffineFunction(), poi.ObjectiveSense.Minimize)
+
+    def is_unique_killer(self, removed, deadline: float | None = None):
+        """
+        Prüft die Eindeutigkeit unter den Käfigbedingungen, nachdem die Zelle
+        removed = (Zeile, Spalte, Ziffer) entfernt wurde: Das Rätsel war vorher eindeutig, also
+        gibt es genau dann eine zweite Lösung, wenn diese Zelle eine andere Ziffer tragen kann.
+
+        Zuerst wird das mit Singles und den Käfigtabellen geprüft. Bleibt die Frage offen, wird
+        das persistente Modell mit einer vorübergehenden Bedingung x[Zelle, Ziffer] = 0 gelöst;
+        findet HiGHS innerhalb des Zeitlimits (siehe set_check_time_limit) keine Antwort, gilt
+        das Rätsel als nicht eindeutig.
+        """
+        row, col, value = removed
+        s = self.dimension
+        candidates = candidates_from_grid(self.solution, s)
+        candidates[row, col, value - 1] = False
+        _, fixed, consistent = propagate_cages(candidates, s, self.cage_index)
+        if not consistent:
+            return True
+        if fixed.any(axis=2).all():
+            return False  # Die Propagation hat eine zweite Lösung gefunden
+
+        exclusion = self.model.add_linear_constraint(self.var(row, col, value - 1), poi.Eq, 0.0)
+        try:
+            self.set_check_time_limit(deadline)
+            self.solve()
+        finally:
+            self.model.delete_constraint(exclusion)
+        return self.status == poi.TerminationStatusCode.INFEASIBLE
+
+    def remove_givens(self, difficulty="normal", time_budget=None):
+        """
+        Entfernt Vorgaben, solange das Killer-Sudoku mit seinen Käfigen eindeutig bleibt. Jede
+        Zelle wird in zufälliger Reihenfolge einmal versucht, bis der Anteil des Schwierigkeitsgrads
+        erreicht oder das Zeitbudget aufgebraucht ist.
+
+        Parameter:
+        - difficulty: 'easy', 'normal' oder 'hard'
+        - time_budget: Sekunden (Standard: self.time_budget)
+        """
+        s = self.dimension
+        deadline = time.monotonic() + (time_budget or self.time_budget)
+        target = int(s**4 * self.killer_difficulty_levels.get(difficulty, 0.85))
+        cells = [(i, j) for i in range(s**2) for j in range(s**2)]
+        rnd.shuffle(cells)
+        removed = 0
+        for row, col in cells:
+            if removed >= target or time.monotonic() >= deadline:
+                return
+            value = self.solution[row][col]
+            self.solution[row][col] = None
+            self.model.delete_constraint(self.con[row][col])
+            if self.is_unique_killer((row, col, value), deadline):
+                removed += 1
+                continue
+            # Nicht eindeutig: Vorgabe wiederherstellen
+            self.solution[row][col] = value
+            self.con[row][col] = self.model.add_linear_constraint(self.var(row, col, value - 1), poi.Eq, 1.0)
     
-    def get_killer_sudoku(self, difficulty="normal"):
+    def get_killer_sudoku(self, difficulty="normal", mode="cages-first", time_budget=None):
         """
         Erzeugt ein Killer-Sudoku mit dem angegebenen Schwierigkeitsgrad.
         
         Parameter:
         - difficulty: 'easy', 'normal' oder 'hard'
+        - mode: 'cages-first' (Standard) erzeugt zuerst die Käfige und entfernt dann Vorgaben,
+          solange das Rätsel mit den Käfigen eindeutig bleibt; 'givens-first' entfernt die Vorgaben
+          wie beim normalen Sudoku und legt die Käfige danach nur darüber
+        - time_budget: Sekunden für das Entfernen der Vorgaben im Modus 'cages-first'
         
         Rückgabe:
         - Das unvollständige Sudoku, die vollständige Lösung und die Käfige mit Summen
         """
-        self.remove_cell(difficulty)
-        self.generate_cages()
-        return self.solution, self.get_solution(), self.cages
-        
-        
-        
\ No newline at end of file
+        if mode == "givens-first":
+            self.remove_cell(difficulty)
+            self.generate_cages()
+        elif mode == "cages-first":
+            self.generate_cages()
+            self.add_cages_to_model()
+            self.remove_givens(difficulty, time_budget)
+        else:
+            raise ValueError(f"Unknown generation mode: {mode}")
+        return self.solution, self.complete_solution, self.cages
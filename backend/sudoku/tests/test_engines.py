@@ -0,0 +1,47 @@
+"""
+Alle Engines müssen auf demselben Korpus dasselbe Ergebnis liefern: normale und Killer-Sudokus,
+eindeutig lösbar und unlösbar (siehe corpus.engine_corpus, auch als "benchmark.py engines").
+
+Aufruf (im Verzeichnis backend/sudoku):
+    python -m pytest -q
+"""
+import random
+
+import pytest
+
+import portfolio
+import sudoku
+from corpus import engine_corpus
+from solver_options import SolverOptions
+from sudoku import KillerSudokuSolver, SudokuSolver
+
+ENGINES = ("mip", "cp", "auto", "portfolio")
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    random.seed(1)
+    return engine_corpus(dimensions=[2, 3], killer_dimensions=[2, 3], count=3)
+
+
+@pytest.fixture(autouse=True)
+def racing_portfolio(monkeypatch):
+    """Mehrere Versuche je Portfolio, auch auf einem Rechner mit einer CPU (sonst läuft nur der erste)."""
+    monkeypatch.setattr(sudoku, "portfolio_members",
+                        lambda primary, options=None: portfolio.portfolio_members(primary, options, size=3))
+
+
+def test_corpus_covers_all_cases(corpus):
+    names = {name for name, *_ in corpus}
+    assert {"4x4", "9x9", "9x9 unlösbar", "9x9 Killer", "9x9 Killer unlösbar"} <= names
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engine_matches_expected(corpus, engine):
+    options = SolverOptions(engine=engine)
+    for name, s, puzzle, cage_data, expected in corpus:
+        if cage_data is None:
+            solver = SudokuSolver(s, puzzle, options=options)
+        else:
+            solver = KillerSudokuSolver(s, puzzle, *cage_data, options)
+        assert solver.solve_sudoku() == expected, f"{engine}: {name}"
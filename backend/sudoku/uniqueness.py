@@ -0,0 +1,188 @@
+from functools import lru_cache
+
+
+class SearchLimitExceeded(Exception):
+    """Die Suche hat das Knotenlimit überschritten, ohne ein Ergebnis zu liefern."""
+
+
+@lru_cache(maxsize=None)
+def units(s: int):
+    """
+    Liefert die Einheiten (Zeilen, Spalten, Blöcke) eines Sudokus als Listen flacher Zellindizes
+    sowie für jede Zelle die Menge ihrer Nachbarzellen.
+    """
+    n = s**2
+    rows = [[i * n + j for j in range(n)] for i in range(n)]
+    columns = [[i * n + j for i in range(n)] for j in range(n)]
+    boxes = [[(g * s + a) * n + h * s + b for a in range(s) for b in range(s)]
+             for g in range(s) for h in range(s)]
+    all_units = rows + columns + boxes
+    peers = [set() for _ in range(n * n)]
+    for unit in all_units:
+        for cell in unit:
+            peers[cell].update(unit)
+    peers = [tuple(sorted(p - {cell})) for cell, p in enumerate(peers)]
+    return all_units, peers
+
+
+@lru_cache(maxsize=None)
+def cell_units(s: int):
+    """Für jede Zelle die Indizes ihrer drei Einheiten in units(s)[0] (Zeile, Spalte, Block)."""
+    n = s**2
+    return [(i, n + j, 2 * n + (i // s) * s + j // s) for i in range(n) for j in range(n)]
+
+
+def initial_masks(sudoku, s: int, exclude=()):
+    """
+    Kandidaten-Bitmasken (Bit k = Ziffer k+1) je Zelle für die Suche auf Bitmasken.
+
+    Parameter:
+    - sudoku: s^2 x s^2 Gitter mit Ziffern 1..s^2 und None (oder 0) für leere Zellen
+    - s: Die Dimension des Sudokus
+    - exclude: Folge von (Zeile, Spalte, Ziffer), die als Kandidaten gestrichen werden
+
+    Rückgabe:
+    - (masks, queue): die Masken und die leeren Zellen mit nur einem Kandidaten (für
+      propagate_singles); None, wenn eine Ziffer doppelt vorgegeben ist oder eine Zelle keinen
+      Kandidaten mehr hat
+    """
+    n = s**2
+    full = (1 << n) - 1
+    unit_ids = cell_units(s)
+
+    # Kandidaten der leeren Zellen aus den je Einheit vorgegebenen Ziffern statt die Vorgaben
+    # einzeln bei ihren Nachbarn zu streichen (bei 25x25 sind das ~600 x 72 Schritte je Prüfung)
+    masks = [0] * (n * n)
+    used = [0] * (3 * n)
+    for i, row in enumerate(sudoku):
+        for j, value in enumerate(row):
+            if value:
+                cell, bit = i * n + j, 1 << (int(value) - 1)
+                for unit in unit_ids[cell]:
+                    if used[unit] & bit:
+                        return None  # Dieselbe Ziffer zweimal in einer Einheit
+                    used[unit] |= bit
+                masks[cell] = bit
+    given = [bool(mask) for mask in masks]
+    for cell, (row, column, box) in enumerate(unit_ids):
+        if not given[cell]:
+            masks[cell] = full & ~(used[row] | used[column] | used[box])
+
+    for i, j, value in exclude:
+        masks[i * n + j] &= ~(1 << (value - 1))
+    queue = []
+    for cell, mask in enumerate(masks):
+        if not mask:
+            return None
+        if not given[cell] and not mask & (mask - 1):
+            queue.append(cell)
+
+    return masks, queue
+
+
+def count_solutions(sudoku, s: int, limit: int = 2, node_limit: int | None = None, exclude=()) -> int:
+    """
+    Zählt die Lösungen eines Sudokus per Backtracking auf Bitmasken, höchstens bis limit.
+
+    Jede Zelle hält ihre Kandidaten als Bitmaske (Bit k = Ziffer k+1). In jedem Knoten werden
+    Naked und Hidden Singles propagiert, verzweigt wird auf der Zelle mit den wenigsten Kandidaten.
+
+    Parameter:
+    - sudoku: s^2 x s^2 Gitter mit Ziffern 1..s^2 und None (oder 0) für leere Zellen
+    - s: Die Dimension des Sudokus
+    - limit: Abbruch, sobald so viele Lösungen gefunden wurden (2 genügt für Eindeutigkeit)
+    - node_limit: Maximale Anzahl Suchknoten; bei Überschreitung wird SearchLimitExceeded ausgelöst
+    - exclude: Folge von (Zeile, Spalte, Ziffer), die vor der Suche als Kandidaten gestrichen werden
+
+    Rückgabe:
+    - Anzahl der gefundenen Lösungen (0 bis limit)
+    """
+    n = s**2
+    full = (1 << n) - 1
+    root = initial_masks(sudoku, s, exclude)
+    if root is None:
+        return 0
+    masks, queue = root
+
+    all_units, peers = units(s)
+    counter = {"solutions": 0, "nodes": 0}
+    _search(masks, queue, set(range(len(all_units))), (all_units, peers, cell_units(s)), full, limit, node_limit, counter)
+    return counter["solutions"]
+
+
+def propagate_singles(masks, queue, dirty, structure, full) -> bool:
+    """
+    Propagiert Naked und Hidden Singles bis zum Fixpunkt; False bei Widerspruch.
+
+    queue enthält die Zellen, deren Ziffer neu festgelegt wurde und noch aus den
+    Nachbarzellen gestrichen werden muss. dirty enthält die Einheiten, in denen sich seit dem
+    letzten Fixpunkt Kandidaten geändert haben; nur sie werden nach Hidden Singles durchsucht
+    (bei 25x25 sind das meist einige wenige der 75 Einheiten).
+    """
+    all_units, peers, unit_ids = structure
+    while True:
+        while queue:
+            cell = queue.pop()
+            bit = masks[cell]
+            for peer in peers[cell]:
+                mask = masks[peer]
+                if mask & bit:
+                    mask &= ~bit
+                    if not mask:
+                        return False
+                    masks[peer] = mask
+                    dirty.update(unit_ids[peer])
+                    if not mask & (mask - 1):
+                        queue.append(peer)
+
+        scan, dirty = dirty, set()
+        for unit in (all_units[index] for index in scan):
+            once = twice = 0
+            for cell in unit:
+                mask = masks[cell]
+                twice |= once & mask
+                once |= mask
+            if once != full:
+                return False  # Eine Ziffer hat in dieser Einheit keinen Platz mehr
+            hidden = once & ~twice
+            if not hidden:
+                continue
+            for cell in unit:
+                mask = masks[cell]
+                single = mask & hidden
+                if single and single != mask:
+                    if single & (single - 1):
+                        return False  # Zwei Ziffern müssten in dieselbe Zelle
+                    masks[cell] = single
+                    dirty.update(unit_ids[cell])
+                    queue.append(cell)
+        if not queue:
+            return True
+
+
+def _search(masks, queue, dirty, structure, full, limit, node_limit, counter):
+    counter["nodes"] += 1
+    if node_limit is not None and counter["nodes"] > node_limit:
+        raise SearchLimitExceeded()
+    if not propagate_singles(masks, queue, dirty, structure, full):
+        return
+
+    best, best_count = -1, 0
+    for cell, mask in enumerate(masks):
+        if mask & (mask - 1):
+            count = mask.bit_count()
+            if best < 0 or count < best_count:
+                best, best_count = cell, count
+                if count == 2:
+                    break
+    if best < 0:
+        counter["solutions"] += 1
+        return
+
+    mask = masks[best]
+    while mask and counter["solutions"] < limit:
+        bit = mask & -mask
+        mask ^= bit
+        branch = masks.copy()
+        branch[best] = bit
+        _search(branch, [best], set(structure[2][best]), structure, full, limit, node_limit, counter)
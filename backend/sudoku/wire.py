@@ -0,0 +1,111 @@
+import math
+
+import numpy as np
+
+# Ziffer v wird als ALPHABET[v] kodiert (1-9, dann A-Z für 10-35), leere Zellen als "." oder "0"
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+EMPTY = "."
+MAX_DIGIT = len(ALPHABET) - 1
+
+_DECODE = np.full(256, 255, dtype=np.uint8)
+for _value, _char in enumerate(ALPHABET):
+    _DECODE[ord(_char)] = _value
+    _DECODE[ord(_char.lower())] = _value
+_DECODE[ord(EMPTY)] = 0
+_ENCODE = np.frombuffer((EMPTY + ALPHABET[1:]).encode("ascii"), dtype=np.uint8)
+
+
+def dimension_from_cells(cells: int) -> int:
+    """Liefert die Dimension s eines Sudokus mit cells = s^4 Zellen oder löst ValueError aus."""
+    s = math.isqrt(math.isqrt(cells))
+    if s < 1 or s**4 != cells:
+        raise ValueError(f"{cells} cells do not form a sudoku grid")
+    return s
+
+
+def _check(grid: np.ndarray, s: int) -> np.ndarray:
+    if grid.shape != (s**2, s**2):
+        raise ValueError(f"Expected a {s**2}x{s**2} grid")
+    if (grid > s**2).any():
+        raise ValueError(f"Digits must be between 1 and {s**2}")
+    return grid
+
+
+def decode_grid(text: str, s: int | None = None) -> np.ndarray:
+    """
+    Dekodiert die kompakte Zeichenkettenform (Zeile für Zeile ein Zeichen pro Zelle,
+    z.B. die übliche 81-Zeichen-Form für 9x9).
+
+    Parameter:
+    - text: Die Zeichenkette
+    - s: Die Dimension des Sudokus (sonst aus der Länge bestimmt)
+
+    Rückgabe:
+    - uint8-Array der Form (s^2, s^2), 0 für leere Zellen
+    """
+    try:
+        raw = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    except UnicodeEncodeError:
+        raise ValueError("Compact sudoku must be ASCII")
+    if s is None:
+        s = dimension_from_cells(len(raw))
+    if len(raw) != s**4:
+        raise ValueError(f"Compact sudoku must have {s**4} characters")
+    grid = _DECODE[raw]
+    if (grid == 255).any():
+        raise ValueError("Compact sudoku contains invalid characters")
+    return _check(grid.reshape(s**2, s**2), s)
+
+
+def encode_grid(grid: np.ndarray) -> str:
+    """Kodiert ein Gitter (0 für leere Zellen) in die kompakte Zeichenkettenform."""
+    return _ENCODE[np.asarray(grid, dtype=np.uint8).ravel()].tobytes().decode("ascii")
+
+
+def decode_grids(data: bytes, s: int | None = None) -> np.ndarray:
+    """
+    Dekodiert ein oder mehrere hintereinander liegende Gitter aus rohen Bytes (ein Byte pro Zelle).
+
+    Parameter:
+    - data: Die Bytes, Länge ein Vielfaches von s^4
+    - s: Die Dimension des Sudokus (sonst aus der Länge bestimmt, dann genau ein Gitter)
+
+    Rückgabe:
+    - uint8-Array der Form (Anzahl, s^2, s^2), 0 für leere Zellen
+    """
+    if s is None:
+        s = dimension_from_cells(len(data))
+    if len(data) == 0 or len(data) % s**4 != 0:
+        raise ValueError(f"Body length must be a multiple of {s**4} bytes")
+    grids = np.frombuffer(data, dtype=np.uint8).reshape(-1, s**2, s**2)
+    if (grids > s**2).any():
+        raise ValueError(f"Digits must be between 1 and {s**2}")
+    return grids
+
+
+def grid_from_rows(rows, s: int) -> np.ndarray:
+    """Wandelt eine verschachtelte Liste (None für leere Zellen) in ein uint8-Gitter um."""
+    if len(rows) != s**2 or any(len(row) != s**2 for row in rows):
+        raise ValueError(f"Expected a {s**2}x{s**2} grid")
+    grid = np.array([[value or 0 for value in row] for row in rows], dtype=np.int64)
+    if (grid < 0).any() or (grid > s**2).any():
+        raise ValueError(f"Digits must be between 1 and {s**2}")
+    return grid.astype(np.uint8)
+
+
+def to_grid(sudoku, s: int) -> np.ndarray:
+    """Akzeptiert ein Sudoku als verschachtelte Liste, kompakte Zeichenkette oder Array."""
+    if isinstance(sudoku, str):
+        return decode_grid(sudoku, s)
+    if isinstance(sudoku, np.ndarray):
+        return _check(sudoku.astype(np.uint8, copy=False), s)
+    return grid_from_rows(sudoku, s)
+
+
+def encode_like(grid: np.ndarray, template):
+    """Kodiert grid in derselben Form, in der template übergeben wurde."""
+    if isinstance(template, str):
+        return encode_grid(grid)
+    if isinstance(template, np.ndarray):
+        return grid
+    return grid.tolist()